@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Check both `gh_wrapper.py` backends against an offline mock of GitHub.
+
+Starts `mock_github.MockGitHub` on a local port and points the wrapper at it:
+the http backend through `LAZY_GH_API_URL`, the cli backend through
+`LAZY_GH_BIN` running the gh stand-in from the same module. Each check runs
+the wrapper's real command line and compares what the two backends print, so
+a difference between them (or a traceback instead of a clean error) fails the
+check. The wall time of each wrapper call is printed alongside.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Final
+
+from mock_github import (
+    DEFAULT_REPO,
+    MOCK_CALLS_ENV,
+    MOCK_REPO_ENV,
+    MOCK_TOKEN_ENV,
+    Fault,
+    MockGitHub,
+)
+
+REPO_ROOT: Final[Path] = Path(__file__).resolve().parent.parent
+GH_WRAPPER: Final[Path] = REPO_ROOT / "scripts" / "gh_wrapper.py"
+MOCK_GH: Final[Path] = Path(__file__).resolve().parent / "mock_github.py"
+BACKENDS: Final[tuple[str, ...]] = ("cli", "http")
+# More than one page of `per_page=100`, so pagination is exercised.
+DEFAULT_SEED_ISSUES: Final[int] = 150
+# Longer than the first exponential backoff step (2-3s), so only a wait that
+# honours the server's value passes.
+RATE_LIMIT_WAIT_SECONDS: Final[int] = 4
+HTML_502: Final[Fault] = Fault(
+    502, "<html><body>Bad gateway</body></html>", "text/html"
+)
+
+
+class Check:
+    def __init__(self, workdir: Path, server: MockGitHub) -> None:
+        self.workdir = workdir
+        self.server = server
+        self.failures: list[str] = []
+        self.stand_in = workdir / "gh"
+        self.stand_in.write_text(
+            f'#!/bin/sh\nexec "{sys.executable}" "{MOCK_GH}" "$@"\n', encoding="utf-8"
+        )
+        self.stand_in.chmod(self.stand_in.stat().st_mode | stat.S_IXUSR)
+
+    def env(self, backend: str, **extra: str) -> dict[str, str]:
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in ("GH_TOKEN", "GITHUB_TOKEN")
+        }
+        env.update(
+            LAZY_GH_BACKEND=backend,
+            LAZY_GH_BIN=str(self.stand_in),
+            LAZY_GH_API_URL=self.server.url,
+            GH_TOKEN="mock-token",
+            **{MOCK_REPO_ENV: DEFAULT_REPO},
+        )
+        env.update(extra)
+        return env
+
+    def wrapper(
+        self, backend: str, *args: str, env: dict[str, str] | None = None
+    ) -> subprocess.CompletedProcess[str]:
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, str(GH_WRAPPER), *args],
+            cwd=self.workdir / backend,
+            env=env or self.env(backend),
+            capture_output=True,
+            text=True,
+            timeout=120,
+            check=False,
+        )
+        print(f"   {backend:<5}{time.perf_counter() - start:>7.3f}s  {args[0]}")
+        return result
+
+    def expect(self, ok: bool, message: str) -> None:
+        if not ok:
+            self.failures.append(message)
+            print(f"   ❌ {message}")
+
+    def both(self, *args: str) -> dict[str, subprocess.CompletedProcess[str]]:
+        return {backend: self.wrapper(backend, *args) for backend in BACKENDS}
+
+
+def check_list_issues(check: Check) -> None:
+    results = check.both("list-issues", "--repo", DEFAULT_REPO, "--state", "all")
+    outputs = {}
+    for backend, result in results.items():
+        check.expect(result.returncode == 0, f"{backend}: {result.stderr.strip()}")
+        outputs[backend] = json.loads(result.stdout or "[]")
+    seeded = len(check.server.issues.get(DEFAULT_REPO, []))
+    check.expect(len(outputs["http"]) == seeded, "http: pagination lost issues")
+    check.expect(outputs["cli"] == outputs["http"], "backends list different issues")
+
+
+def check_create_issue(check: Check) -> None:
+    for backend, result in check.both(
+        "create-issue", "--title", "Created", "--body", "b", "--repo", DEFAULT_REPO
+    ).items():
+        check.expect(
+            result.returncode == 0 and "/issues/" in result.stdout,
+            f"{backend}: create-issue failed: {result.stderr.strip()}",
+        )
+
+
+def check_create_issues(check: Check) -> None:
+    specs = check.workdir / "specs.jsonl"
+    specs.write_text(
+        "\n".join(
+            json.dumps({"key": f"batch-{index}", "title": f"Batch {index}"})
+            for index in range(3)
+        ),
+        encoding="utf-8",
+    )
+    for backend in BACKENDS:
+        statuses = []
+        for _ in range(2):
+            result = check.wrapper(
+                backend, "create-issues", "--from", str(specs), "--repo", DEFAULT_REPO
+            )
+            statuses.append(
+                sorted(item["status"] for item in json.loads(result.stdout or "[]"))
+            )
+        check.expect(
+            statuses[1] == ["exists"] * 3,
+            f"{backend}: re-running a batch gave {statuses[1]}",
+        )
+
+
+def check_html_error(check: Check) -> None:
+    for backend in BACKENDS:
+        check.server.fail(HTML_502, times=3)
+        result = check.wrapper(backend, "list-issues", "--repo", DEFAULT_REPO)
+        check.server.faults.clear()
+        check.expect(
+            result.returncode == 1
+            and "HTTP 502" in result.stderr
+            and "Traceback" not in result.stderr,
+            f"{backend}: HTML error page not reported cleanly: {result.stderr!r}",
+        )
+
+
+def check_rate_limit(check: Check) -> None:
+    """A rate-limited create waits as long as GitHub asked before retrying.
+
+    The http backend reads `Retry-After`; the cli backend sees no headers and
+    asks `gh api rate_limit` for the primary limit's reset time instead.
+    """
+    faults = {
+        "http": Fault(
+            429,
+            json.dumps({"message": "API rate limit exceeded"}),
+            headers={"Retry-After": str(RATE_LIMIT_WAIT_SECONDS)},
+            method="POST",
+        ),
+        "cli": Fault(
+            403, json.dumps({"message": "API rate limit exceeded"}), method="POST"
+        ),
+    }
+    for backend in BACKENDS:
+        specs = check.workdir / f"limited-{backend}.jsonl"
+        specs.write_text(json.dumps({"title": f"Limited {backend}"}), encoding="utf-8")
+        check.server.fail(faults[backend])
+        check.server.rate_limit_reset = time.time() + RATE_LIMIT_WAIT_SECONDS
+        start = time.perf_counter()
+        result = check.wrapper(
+            backend, "create-issues", "--from", str(specs), "--repo", DEFAULT_REPO
+        )
+        elapsed = time.perf_counter() - start
+        check.server.faults.clear()
+        statuses = [item["status"] for item in json.loads(result.stdout or "[]")]
+        check.expect(statuses == ["created"], f"{backend}: got {statuses}")
+        check.expect(
+            elapsed >= RATE_LIMIT_WAIT_SECONDS,
+            f"{backend}: retried after {elapsed:.1f}s, "
+            f"before the {RATE_LIMIT_WAIT_SECONDS}s GitHub asked for",
+        )
+
+
+def check_token_lookup(check: Check) -> None:
+    """Without any token the http backend asks `gh auth token` once, then the CLI."""
+    calls = check.workdir / "calls.txt"
+    env = check.env("http", **{MOCK_CALLS_ENV: str(calls)})
+    for name in ("GH_TOKEN", "LAZY_GH_API_URL", MOCK_TOKEN_ENV):
+        env.pop(name, None)
+    code = (
+        "import sys; sys.path.insert(0, sys.argv[1]); import gh_wrapper; "
+        "print(all(gh_wrapper.http_client() is None for _ in range(5)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(GH_WRAPPER.parent)],
+        cwd=check.workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+    lookups = calls.read_text(encoding="utf-8").count("auth token")
+    check.expect(result.stdout.strip() == "True", "http backend used without token")
+    check.expect(lookups == 1, f"`gh auth token` ran {lookups} times, expected 1")
+
+
+CHECKS: Final[dict[str, Callable[[Check], None]]] = {
+    "list-issues": check_list_issues,
+    "create-issue": check_create_issue,
+    "create-issues": check_create_issues,
+    "html-error": check_html_error,
+    "rate-limit": check_rate_limit,
+    "token-lookup": check_token_lookup,
+}
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check the gh_wrapper backends against a local mock of GitHub."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED_ISSUES,
+        help=f"Issues to pre-populate (default: {DEFAULT_SEED_ISSUES})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or sys.argv[1:])
+    with MockGitHub() as server, tempfile.TemporaryDirectory(prefix="gh-check-") as tmp:
+        workdir = Path(tmp)
+        for backend in BACKENDS:
+            (workdir / backend).mkdir()
+        for index in range(args.seed):
+            server.add_issue(DEFAULT_REPO, f"Seed {index}", f"body {index}")
+        check = Check(workdir, server)
+        for name, run in CHECKS.items():
+            print(f"🔍 {name}")
+            run(check)
+
+    if check.failures:
+        print(f"❌ {len(check.failures)} check(s) failed")
+        return 1
+    print(f"✅ Both backends agree ({server.requests} mock API requests)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
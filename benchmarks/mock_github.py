@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Offline stand-ins for the GitHub REST API and the gh CLI.
+
+`MockGitHub` serves the subset of the REST API that `scripts/gh_wrapper.py`
+uses (issues with Link pagination, milestones, pulls, labels) from memory on
+a local port. Faults queued with `MockGitHub.fail` are answered first, which
+is how proxy errors and rate limits are reproduced.
+
+Run as a script, this module is a gh stand-in for `LAZY_GH_BIN`: it answers
+`auth token`, `repo view`, `api` (with `--paginate` or a plain `--jq .a.b`),
+`issue create`, `issue list` (30 issues unless `--limit` says otherwise) and
+`pr create` by calling the API at `LAZY_GH_API_URL`, and reports failures on
+stderr the way gh does (`HTTP <status>: <message>`, exit code 1).
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Final, Self
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+DEFAULT_REPO: Final[str] = "octo/mock"
+MOCK_REPO_ENV: Final[str] = "MOCK_GH_REPO"
+# gh exits 1 for `auth token` when this is unset, as when nobody logged in.
+MOCK_TOKEN_ENV: Final[str] = "MOCK_GH_TOKEN"
+# Every stand-in invocation appends its arguments here when set.
+MOCK_CALLS_ENV: Final[str] = "MOCK_GH_CALLS"
+API_URL_ENV: Final[str] = "LAZY_GH_API_URL"
+MAX_PER_PAGE: Final[int] = 100
+# What `gh issue list` returns without `--limit`.
+GH_DEFAULT_LIMIT: Final[int] = 30
+# Issue n was last updated n seconds after this, so `since` filters stay ordered.
+EPOCH_SECONDS: Final[int] = 1_704_067_200
+
+
+@dataclass
+class Fault:
+    status: int
+    body: str
+    content_type: str = "application/json"
+    headers: dict[str, str] = field(default_factory=dict)
+    # Only requests with this method get the fault; None matches any.
+    method: str | None = None
+
+
+class MockGitHub(ThreadingHTTPServer):
+    """In-memory GitHub API on 127.0.0.1; use as a context manager."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.issues: dict[str, list[dict]] = {}
+        self.faults: deque[Fault] = deque()
+        self.requests = 0
+        # Epoch seconds `GET /rate_limit` reports for the primary limit.
+        self.rate_limit_reset = 0.0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> Self:
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def fail(self, fault: Fault, times: int = 1) -> None:
+        """Answer the next `times` matching requests with `fault`."""
+        with self.lock:
+            self.faults.extend([fault] * times)
+
+    def add_issue(self, repo: str, title: str, body: str = "", **fields: Any) -> dict:
+        with self.lock:
+            issues = self.issues.setdefault(repo, [])
+            number = len(issues) + 1
+            issue = {
+                "number": number,
+                "title": title,
+                "body": body,
+                "state": "open",
+                "labels": [],
+                "updated_at": time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ", time.gmtime(EPOCH_SECONDS + number)
+                ),
+                "html_url": f"https://github.com/{repo}/issues/{number}",
+                **fields,
+            }
+            issues.append(issue)
+            return issue
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server: MockGitHub
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.handle_api("GET")
+
+    def do_POST(self) -> None:
+        self.handle_api("POST")
+
+    def handle_api(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"null")
+        with self.server.lock:
+            self.server.requests += 1
+            fault = next(
+                (f for f in self.server.faults if f.method in (None, method)), None
+            )
+            if fault:
+                self.server.faults.remove(fault)
+        if fault:
+            self.respond(fault.status, fault.body, fault.content_type, fault.headers)
+            return
+
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if parts == ["rate_limit"]:
+            reset = math.ceil(self.server.rate_limit_reset)
+            self.respond_json(200, {"resources": {"core": {"reset": reset}}})
+            return
+        if len(parts) < 4 or parts[0] != "repos":
+            self.respond_json(404, {"message": "Not Found"})
+            return
+        repo, resource = f"{parts[1]}/{parts[2]}", parts[3:]
+        if method == "GET" and resource == ["issues"]:
+            self.list_issues(repo, query)
+        elif method == "POST" and resource == ["issues"]:
+            issue = self.server.add_issue(
+                repo,
+                payload["title"],
+                payload.get("body", ""),
+                labels=[{"name": name} for name in payload.get("labels", [])],
+            )
+            self.respond_json(201, issue)
+        elif method == "GET" and resource == ["milestones"]:
+            self.respond_json(200, [{"number": 1, "title": "v1"}])
+        elif method == "POST" and resource == ["pulls"]:
+            pull = self.server.add_issue(
+                repo, payload["title"], payload.get("body", ""), pull_request={}
+            )
+            self.respond_json(201, pull)
+        elif method == "POST" and len(resource) == 3 and resource[2] == "labels":
+            self.respond_json(200, [{"name": name} for name in payload["labels"]])
+        else:
+            self.respond_json(404, {"message": "Not Found"})
+
+    def list_issues(self, repo: str, query: dict[str, str]) -> None:
+        with self.server.lock:
+            issues = list(self.server.issues.get(repo, []))
+        state = query.get("state", "open")
+        if state != "all":
+            issues = [issue for issue in issues if issue["state"] == state]
+        if "since" in query:
+            issues = [
+                issue for issue in issues if issue["updated_at"] >= query["since"]
+            ]
+        if "labels" in query:
+            wanted = set(query["labels"].split(","))
+            issues = [
+                issue
+                for issue in issues
+                if wanted <= {label["name"] for label in issue["labels"]}
+            ]
+
+        per_page = min(int(query.get("per_page", 30)), MAX_PER_PAGE)
+        page = int(query.get("page", 1))
+        headers = {}
+        if page * per_page < len(issues):
+            next_query = urlencode({**query, "page": page + 1})
+            base = f"http://{self.headers['Host']}"
+            headers["Link"] = (
+                f'<{base}{urlsplit(self.path).path}?{next_query}>; rel="next"'
+            )
+        chunk = issues[(page - 1) * per_page : page * per_page]
+        self.respond_json(200, chunk, headers)
+
+    def respond_json(
+        self, status: int, body: Any, headers: dict[str, str] | None = None
+    ) -> None:
+        self.respond(status, json.dumps(body), "application/json", headers or {})
+
+    def respond(
+        self, status: int, body: str, content_type: str, headers: dict[str, str]
+    ) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# --- gh stand-in -----------------------------------------------------------
+
+
+class GhError(Exception):
+    pass
+
+
+def api_call(
+    method: str, path: str, payload: dict | None = None
+) -> tuple[Any, str | None]:
+    """One call to the mock API; the decoded body and the next page URL."""
+    base = os.environ[API_URL_ENV].rstrip("/")
+    url = path if path.startswith("http") else f"{base}/{path.lstrip('/')}"
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method)
+    request.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = json.loads(response.read() or b"null")
+            link = response.headers.get("Link") or ""
+    except urllib.error.HTTPError as exc:
+        raw = exc.read()
+        try:
+            message = json.loads(raw).get("message", "")
+        except ValueError:
+            message = ""
+        raise GhError(f"HTTP {exc.code}: {message or exc.reason}") from None
+    next_url = link[1 : link.index(">")] if 'rel="next"' in link else None
+    return body, next_url
+
+
+def option(args: list[str], name: str) -> str | None:
+    return args[args.index(name) + 1] if name in args else None
+
+
+def gh_api(args: list[str]) -> str:
+    method = option(args, "--method") or "GET"
+    path = next(arg for arg in args[1:] if arg.startswith(("repos/", "rate_limit")))
+    fields = dict(
+        args[index + 1].split("=", 1) for index, arg in enumerate(args) if arg == "-f"
+    )
+    jq = option(args, "--jq")
+    if jq:
+        # Only plain `.a.b` paths, which is all the wrapper asks for.
+        body, _ = api_call(method, path)
+        for key in jq.strip(".").split("."):
+            body = body[key]
+        return str(body)
+    if method != "GET":
+        body, _ = api_call(method, path, fields)
+        return json.dumps(body)
+    pages = []
+    body, next_url = api_call("GET", f"{path}?{urlencode(fields)}")
+    pages.append(json.dumps(body))
+    while next_url and "--paginate" in args:
+        body, next_url = api_call("GET", next_url)
+        pages.append(json.dumps(body))
+    return "".join(pages)
+
+
+def gh_issue_list(args: list[str]) -> str:
+    repo = option(args, "--repo") or os.environ.get(MOCK_REPO_ENV, DEFAULT_REPO)
+    query = {"state": option(args, "--state") or "open", "per_page": MAX_PER_PAGE}
+    if option(args, "--label"):
+        query["labels"] = option(args, "--label")
+    issues: list[dict] = []
+    body, next_url = api_call("GET", f"repos/{repo}/issues?{urlencode(query)}")
+    issues.extend(body)
+    while next_url:
+        body, next_url = api_call("GET", next_url)
+        issues.extend(body)
+    needle = (option(args, "--search") or "").lower()
+    limit = int(option(args, "--limit") or GH_DEFAULT_LIMIT)
+    return json.dumps(
+        [
+            {
+                "number": issue["number"],
+                "title": issue["title"],
+                "body": issue["body"],
+                "url": issue["html_url"],
+            }
+            for issue in issues
+            if "pull_request" not in issue
+            and needle in f"{issue['title']}\n{issue['body']}".lower()
+        ][:limit]
+    )
+
+
+def gh_create(args: list[str], kind: str) -> str:
+    repo = option(args, "--repo") or os.environ.get(MOCK_REPO_ENV, DEFAULT_REPO)
+    payload: dict[str, Any] = {
+        "title": option(args, "--title"),
+        "body": option(args, "--body") or "",
+    }
+    labels = option(args, "--label")
+    if kind == "issues" and labels:
+        payload["labels"] = labels.split(",")
+    if kind == "pulls":
+        payload["base"] = option(args, "--base")
+    created, _ = api_call("POST", f"repos/{repo}/{kind}", payload)
+    return created["html_url"]
+
+
+def gh_main(args: list[str]) -> int:
+    calls = os.environ.get(MOCK_CALLS_ENV)
+    if calls:
+        with open(calls, "a", encoding="utf-8") as handle:
+            handle.write(" ".join(args) + "\n")
+    try:
+        if args[:2] == ["auth", "token"]:
+            token = os.environ.get(MOCK_TOKEN_ENV)
+            if not token:
+                raise GhError("no oauth token found for github.com")
+            output = token
+        elif args[:2] == ["repo", "view"]:
+            output = os.environ.get(MOCK_REPO_ENV, DEFAULT_REPO)
+        elif args[:1] == ["api"]:
+            output = gh_api(args)
+        elif args[:2] == ["issue", "list"]:
+            output = gh_issue_list(args)
+        elif args[:2] == ["issue", "create"]:
+            output = gh_create(args, "issues")
+        elif args[:2] == ["pr", "create"]:
+            output = gh_create(args, "pulls")
+        else:
+            raise GhError(f"unsupported command: {' '.join(args)}")
+    except GhError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(gh_main(sys.argv[1:]))
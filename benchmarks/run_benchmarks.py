@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""Benchmark the LAZY-DEV-FRAMEWORK quality scripts on synthetic repositories.
+
+Each benchmark gets a freshly generated repository (see `synthetic_repo.py`),
+runs its script once cold (no `.lazy_cache/`, unformatted sources, no
+daemon) and then `--repeat` times warm on the unchanged tree. Every run is
+measured with `os.wait4`, which reports the script's own and its waited-for
+children's CPU time and peak RSS, so tool subprocesses are included. The
+detached dmypy server is not a waited-for child; its CPU time and peak RSS
+are read from `/proc` (Linux only) and reported separately. A run that
+exceeds `--timeout` is killed with its process group and marked timed out.
+
+Results can be saved as a baseline JSON and later runs compared against it;
+any benchmark whose wall time grows beyond `--threshold` is reported as a
+regression. Everything runs offline with the locally installed tools.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final
+
+from synthetic_repo import RepoConfig, add_config_arguments, config_from_args, generate
+
+REPO_ROOT: Final[Path] = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR: Final[Path] = REPO_ROOT / "scripts"
+PRE_COMMIT_HOOK: Final[Path] = REPO_ROOT / ".githooks" / "pre-commit"
+BASELINE_FILE: Final[Path] = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_REPEAT: Final[int] = 3
+DEFAULT_THRESHOLD: Final[float] = 0.25
+# Differences below this are treated as noise, whatever the ratio.
+NOISE_FLOOR_SECONDS: Final[float] = 0.05
+SESSION_ID: Final[str] = "bench"
+DEFAULT_TIMEOUT_SECONDS: Final[float] = 600.0
+TIMEOUT_EXIT_CODE: Final[int] = 124
+# Where scripts/type_check.py keeps the dmypy server's pid, per repository.
+DMYPY_STATUS_FILE: Final[Path] = Path(".lazy_cache") / "dmypy" / "status.json"
+
+
+@dataclass
+class Measurement:
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_mb: float
+    exit_code: int
+    timed_out: bool = False
+    # A detached server the run talked to (dmypy), which wait4 cannot see.
+    daemon_cpu_seconds: float | None = None
+    daemon_peak_rss_mb: float | None = None
+
+    def as_dict(self) -> dict:
+        data = {
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "exit_code": self.exit_code,
+        }
+        if self.timed_out:
+            data["timed_out"] = True
+        if self.daemon_cpu_seconds is not None:
+            data["daemon_cpu_seconds"] = round(self.daemon_cpu_seconds, 4)
+        if self.daemon_peak_rss_mb is not None:
+            data["daemon_peak_rss_mb"] = round(self.daemon_peak_rss_mb, 1)
+        return data
+
+
+@dataclass
+class Benchmark:
+    name: str
+    command: list[str]
+    requires: tuple[str, ...] = ()
+    setup: Callable[[Path], None] | None = None
+    teardown: Callable[[Path], None] | None = None
+    # Status file (relative to the repo) naming a daemon's pid to measure.
+    daemon_status: Path | None = None
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    cold: Measurement | None = None
+    warm: list[Measurement] = field(default_factory=list)
+    skipped: str | None = None
+
+    def as_dict(self) -> dict:
+        if self.skipped:
+            return {"skipped": self.skipped}
+        assert self.cold is not None
+        return {
+            "cold": self.cold.as_dict(),
+            "warm": summarise(self.warm).as_dict(),
+            "warm_runs": len(self.warm),
+        }
+
+
+def summarise(runs: Sequence[Measurement]) -> Measurement:
+    """Median wall/CPU time and worst peak RSS over repeated runs."""
+    daemon_cpu = [
+        r.daemon_cpu_seconds for r in runs if r.daemon_cpu_seconds is not None
+    ]
+    daemon_rss = [
+        r.daemon_peak_rss_mb for r in runs if r.daemon_peak_rss_mb is not None
+    ]
+    return Measurement(
+        wall_seconds=statistics.median(run.wall_seconds for run in runs),
+        cpu_seconds=statistics.median(run.cpu_seconds for run in runs),
+        peak_rss_mb=max(run.peak_rss_mb for run in runs),
+        exit_code=max(run.exit_code for run in runs),
+        timed_out=any(run.timed_out for run in runs),
+        daemon_cpu_seconds=statistics.median(daemon_cpu) if daemon_cpu else None,
+        daemon_peak_rss_mb=max(daemon_rss) if daemon_rss else None,
+    )
+
+
+def process_usage(pid: int) -> tuple[float, float] | None:
+    """CPU seconds and peak RSS in MB of any process, from `/proc` (Linux)."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text(encoding="utf-8")
+        status = Path(f"/proc/{pid}/status").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    # Fields after the parenthesised command name; utime, stime, cutime and
+    # cstime are fields 14-17 of proc(5), in clock ticks.
+    fields = stat.rpartition(")")[2].split()
+    ticks = sum(int(value) for value in fields[11:15])
+    peak_kib = next(
+        (
+            int(line.split()[1])
+            for line in status.splitlines()
+            if line.startswith("VmHWM:")
+        ),
+        0,
+    )
+    return ticks / os.sysconf("SC_CLK_TCK"), peak_kib / 1024
+
+
+def daemon_usage(status_file: Path) -> tuple[float, float] | None:
+    """Usage of the daemon whose pid a status file records, if it is running."""
+    try:
+        pid = int(json.loads(status_file.read_text(encoding="utf-8"))["pid"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return process_usage(pid)
+
+
+def measure(
+    command: Sequence[str],
+    cwd: Path,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    daemon_status: Path | None = None,
+) -> Measurement:
+    """Run a command and collect wall time plus its rusage (children included).
+
+    The command runs in its own process group, which is killed once `timeout`
+    seconds pass. With `daemon_status`, the CPU time the daemon spent during
+    the run and its peak RSS so far are recorded as well.
+    """
+    status_file = cwd / daemon_status if daemon_status else None
+    before = daemon_usage(status_file) if status_file else None
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        list(command),
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    expired = threading.Event()
+
+    def kill_group() -> None:
+        expired.set()
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    watchdog = threading.Timer(timeout, kill_group)
+    watchdog.start()
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    finally:
+        watchdog.cancel()
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    measurement = Measurement(
+        wall_seconds=wall,
+        cpu_seconds=usage.ru_utime + usage.ru_stime,
+        # ru_maxrss is in KiB on Linux.
+        peak_rss_mb=usage.ru_maxrss / 1024,
+        exit_code=TIMEOUT_EXIT_CODE if expired.is_set() else process.returncode,
+        timed_out=expired.is_set(),
+    )
+    after = daemon_usage(status_file) if status_file else None
+    if after is not None:
+        # A server started by this run had not used any CPU before it.
+        measurement.daemon_cpu_seconds = after[0] - (before[0] if before else 0.0)
+        measurement.daemon_peak_rss_mb = after[1]
+    return measurement
+
+
+def script(name: str, *args: str) -> list[str]:
+    return [sys.executable, str(SCRIPTS_DIR / name), *args, "--session", SESSION_ID]
+
+
+def init_git(repo: Path) -> None:
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+    git("init", "-q")
+    git("config", "user.email", "bench@example.com")
+    git("config", "user.name", "bench")
+    git("add", "-A")
+
+
+def stop_daemon(repo: Path) -> None:
+    subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / "type_check.py"), "--stop-daemon"],
+        cwd=repo,
+        capture_output=True,
+        check=False,
+    )
+
+
+def default_benchmarks() -> list[Benchmark]:
+    return [
+        Benchmark("format", script("format.py", "src"), requires=("black", "ruff")),
+        Benchmark("lint", script("lint.py", "src"), requires=("ruff",)),
+        Benchmark("type_check", script("type_check.py", "src"), requires=("mypy",)),
+        Benchmark(
+            "type_check_daemon",
+            script("type_check.py", "src", "--daemon"),
+            requires=("dmypy",),
+            teardown=stop_daemon,
+            daemon_status=DMYPY_STATUS_FILE,
+        ),
+        Benchmark(
+            "test_runner", script("test_runner.py", "tests"), requires=("pytest",)
+        ),
+        Benchmark(
+            "test_runner_workers",
+            script("test_runner.py", "tests", "--workers", "auto"),
+            requires=("pytest",),
+        ),
+        Benchmark(
+            "pre_commit",
+            [sys.executable, str(PRE_COMMIT_HOOK)],
+            requires=("git", "black", "ruff"),
+            setup=init_git,
+        ),
+    ]
+
+
+def missing_requirement(benchmark: Benchmark) -> str | None:
+    for tool in benchmark.requires:
+        if shutil.which(tool) is None:
+            return f"{tool} not installed"
+    return None
+
+
+def run_benchmark(
+    benchmark: Benchmark,
+    config: RepoConfig,
+    repeat: int,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+) -> BenchmarkResult:
+    result = BenchmarkResult(benchmark.name)
+    result.skipped = missing_requirement(benchmark)
+    if result.skipped:
+        return result
+
+    with tempfile.TemporaryDirectory(prefix=f"bench-{benchmark.name}-") as tmp:
+        repo = generate(Path(tmp), config)
+        if benchmark.setup:
+            benchmark.setup(repo)
+
+        def run() -> Measurement:
+            return measure(benchmark.command, repo, timeout, benchmark.daemon_status)
+
+        try:
+            result.cold = run()
+            result.warm = [run() for _ in range(repeat)]
+        finally:
+            if benchmark.teardown:
+                benchmark.teardown(repo)
+    return result
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float
+) -> list[tuple[str, str, float, float]]:
+    """(benchmark, phase, baseline seconds, current seconds) for every regression."""
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or "skipped" in current or "skipped" in previous:
+            continue
+        for phase in ("cold", "warm"):
+            before = previous[phase]["wall_seconds"]
+            after = current[phase]["wall_seconds"]
+            if (
+                after > before * (1 + threshold)
+                and after - before > NOISE_FLOOR_SECONDS
+            ):
+                regressions.append((name, phase, before, after))
+    return regressions
+
+
+def print_table(results: dict) -> None:
+    print(f"{'benchmark':<22}{'phase':<6}{'wall s':>9}{'cpu s':>9}{'rss MB':>9}")
+    for name, result in results["results"].items():
+        if "skipped" in result:
+            print(f"{name:<22}skipped: {result['skipped']}")
+            continue
+        for phase in ("cold", "warm"):
+            m = result[phase]
+            print(
+                f"{name:<22}{phase:<6}{m['wall_seconds']:>9.3f}"
+                f"{m['cpu_seconds']:>9.3f}{m['peak_rss_mb']:>9.1f}"
+                + ("  timed out" if m.get("timed_out") else "")
+            )
+            if "daemon_cpu_seconds" in m:
+                print(
+                    f"{'  + daemon':<28}{'':>9}"
+                    f"{m['daemon_cpu_seconds']:>9.3f}{m['daemon_peak_rss_mb']:>9.1f}"
+                )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the quality scripts on a synthetic repository."
+    )
+    add_config_arguments(parser)
+    parser.add_argument(
+        "--only", help="Comma-separated benchmark names to run (default: all)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Warm runs per benchmark (default: {DEFAULT_REPEAT})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT_SECONDS,
+        help="Kill a run after this many seconds "
+        f"(default: {DEFAULT_TIMEOUT_SECONDS:g})",
+    )
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE_FILE,
+        help="Baseline JSON to compare against or save to",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store these results as baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Exit non-zero when a benchmark regressed against the baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed relative slowdown (default: {DEFAULT_THRESHOLD})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or sys.argv[1:])
+    config = config_from_args(args)
+    benchmarks = default_benchmarks()
+    if args.only:
+        wanted = set(args.only.split(","))
+        unknown = wanted - {benchmark.name for benchmark in benchmarks}
+        if unknown:
+            print(f"❌ Unknown benchmark(s): {', '.join(sorted(unknown))}")
+            return 2
+        benchmarks = [b for b in benchmarks if b.name in wanted]
+
+    results: dict = {
+        "config": config.as_dict(),
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": {},
+    }
+    for benchmark in benchmarks:
+        print(f"⏱️  {benchmark.name}...")
+        results["results"][benchmark.name] = run_benchmark(
+            benchmark, config, args.repeat, args.timeout
+        ).as_dict()
+
+    print_table(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"💾 Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"❌ No baseline at {args.baseline}")
+            return 2
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("config") != results["config"]:
+            print("⚠️ Baseline was recorded with a different repo configuration")
+        regressions = compare(results, baseline, args.threshold)
+        for name, phase, before, after in regressions:
+            print(f"❌ {name} ({phase}) regressed: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Generate synthetic Python repositories for benchmarking the quality scripts.
+
+The generated tree is deterministic for a given configuration and seed:
+
+    <root>/pyproject.toml
+    <root>/src/synth/mod_0000.py ...  strictly typed modules, each importing up
+                                      to `import_depth` earlier modules
+    <root>/tests/test_mod_0000.py ... `tests` test functions spread over the
+                                      modules
+
+A fraction of the modules is written in an unformatted style so formatters
+have real work to do on a cold run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+PACKAGE: Final[str] = "synth"
+UNFORMATTED_RATIO: Final[float] = 0.3
+PYPROJECT: Final[str] = """\
+[tool.pytest.ini_options]
+pythonpath = ["src"]
+
+[tool.mypy]
+mypy_path = "src"
+"""
+
+
+@dataclass(frozen=True)
+class RepoConfig:
+    files: int = 50
+    loc: int = 200
+    tests: int = 200
+    import_depth: int = 3
+    seed: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "files": self.files,
+            "loc": self.loc,
+            "tests": self.tests,
+            "import_depth": self.import_depth,
+            "seed": self.seed,
+        }
+
+
+def module_name(index: int) -> str:
+    return f"mod_{index:04d}"
+
+
+def function_block(module: int, function: int, formatted: bool) -> list[str]:
+    name = f"compute_{module}_{function}"
+    if formatted:
+        return [
+            f"def {name}(values: list[int], scale: int = {function + 1}) -> int:",
+            "    total = 0",
+            "    for value in values:",
+            "        if value % 2 == 0:",
+            "            total += value * scale",
+            "        else:",
+            "            total -= value",
+            "    return total",
+            "",
+            "",
+        ]
+    return [
+        f"def {name}( values:list[ int ],scale:int={function + 1} )->int :",
+        "    total=0",
+        "    for value in values :",
+        "        if value%2==0 : total+=value*scale",
+        "        else : total-=value",
+        "    return total",
+        "",
+        "",
+    ]
+
+
+def module_source(index: int, config: RepoConfig, rng: random.Random) -> str:
+    formatted = rng.random() >= UNFORMATTED_RATIO
+    dependencies = list(range(max(0, index - config.import_depth), index))
+    lines = [
+        f'"""Synthetic module {index}."""',
+        "",
+        "from __future__ import annotations",
+    ]
+    if dependencies:
+        lines.append("")
+        lines.extend(
+            f"from {PACKAGE}.{module_name(dep)} import compute_{dep}_0"
+            for dep in dependencies
+        )
+    lines.extend(["", ""])
+
+    functions = max(1, config.loc // 10)
+    for function in range(functions):
+        lines.extend(function_block(index, function, formatted))
+
+    calls = " + ".join(f"compute_{dep}_0(values)" for dep in dependencies) or "0"
+    lines.extend(
+        [
+            "def combined(values: list[int]) -> int:",
+            f"    return compute_{index}_0(values) + {calls}",
+            "",
+        ]
+    )
+    return "\n".join(lines)
+
+
+def tests_source(index: int, count: int) -> str:
+    lines = [
+        f"from {PACKAGE}.{module_name(index)} import combined, compute_{index}_0",
+        "",
+        "",
+    ]
+    for test in range(count):
+        values = [test, test + 1, test + 2]
+        lines.extend(
+            [
+                f"def test_compute_{index}_{test}() -> None:",
+                f"    assert isinstance(compute_{index}_0({values}), int)",
+                f"    assert isinstance(combined({values}), int)",
+                "",
+                "",
+            ]
+        )
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def generate(root: Path, config: RepoConfig) -> Path:
+    """Write a synthetic repository under `root` and return it."""
+    rng = random.Random(config.seed)
+    package = root / "src" / PACKAGE
+    tests = root / "tests"
+    package.mkdir(parents=True, exist_ok=True)
+    tests.mkdir(parents=True, exist_ok=True)
+    (root / "pyproject.toml").write_text(PYPROJECT, encoding="utf-8")
+    (package / "__init__.py").write_text("", encoding="utf-8")
+    (package / "py.typed").write_text("", encoding="utf-8")
+
+    for index in range(config.files):
+        (package / f"{module_name(index)}.py").write_text(
+            module_source(index, config, rng), encoding="utf-8"
+        )
+
+    per_file, extra = divmod(config.tests, max(1, config.files))
+    for index in range(config.files):
+        count = per_file + (1 if index < extra else 0)
+        if count:
+            (tests / f"test_{module_name(index)}.py").write_text(
+                tests_source(index, count), encoding="utf-8"
+            )
+    return root
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = RepoConfig()
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument(
+        "--loc", type=int, default=defaults.loc, help="Approximate lines per module"
+    )
+    parser.add_argument("--tests", type=int, default=defaults.tests)
+    parser.add_argument(
+        "--import-depth",
+        type=int,
+        default=defaults.import_depth,
+        help="How many preceding modules each module imports",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> RepoConfig:
+    return RepoConfig(
+        files=args.files,
+        loc=args.loc,
+        tests=args.tests,
+        import_depth=args.import_depth,
+        seed=args.seed,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Python repo.")
+    parser.add_argument("root", type=Path, help="Directory to create the repo in")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    generate(args.root, config_from_args(args))
+    print(f"✅ Generated synthetic repo in {args.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
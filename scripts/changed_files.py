@@ -0,0 +1,372 @@
+"""Git-based change detection shared by the LAZY-DEV-FRAMEWORK quality scripts.
+
+Resolves the Python files touched in the working tree (staged, unstaged and
+untracked, optionally everything since a ref) so `format.py`, `lint.py` and
+`type_check.py` can run on just those files via `--changed [--since <ref>]`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import re
+import subprocess
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Final
+
+from result_cache import KEY_SKIP_DIRS, iter_python_files
+
+PYTHON_SUFFIXES: Final[tuple[str, ...]] = (".py", ".pyi")
+GIT_TIMEOUT_SECONDS: Final[float] = 60.0
+# Line-based on purpose: a cache key needs this for every file on each run.
+IMPORT_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"^[ \t]*(?:from[ \t]+(\.*[\w.]*)[ \t]+import\b(.*)|import[ \t]+([\w., \t]+))",
+    re.MULTILINE,
+)
+
+
+class GitError(RuntimeError):
+    """Raised when git cannot report changed files."""
+
+
+def run_git(args: list[str]) -> list[str]:
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            capture_output=True,
+            text=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+            check=False,
+        )
+    except subprocess.TimeoutExpired as exc:
+        raise GitError(f"git {args[0]} timed out after {exc.timeout:g}s") from exc
+    if result.returncode != 0:
+        raise GitError(result.stderr.strip() or f"git {' '.join(args)} failed")
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def get_repo_root() -> Path:
+    return Path(run_git(["rev-parse", "--show-toplevel"])[0])
+
+
+def relative_to_cwd(path: Path) -> Path:
+    try:
+        return path.relative_to(Path.cwd().resolve())
+    except ValueError:
+        return path
+
+
+def get_changed_files(
+    since: str | None = None, suffixes: tuple[str, ...] = PYTHON_SUFFIXES
+) -> list[Path]:
+    """Return existing modified, staged and untracked files (plus `since..HEAD`)."""
+    root = get_repo_root()
+    diff_filter = "--diff-filter=ACMR"
+    names: set[str] = set()
+    names.update(run_git(["diff", "--name-only", diff_filter]))
+    names.update(run_git(["diff", "--cached", "--name-only", diff_filter]))
+    names.update(run_git(["ls-files", "--others", "--exclude-standard", "--full-name"]))
+    if since:
+        names.update(run_git(["diff", "--name-only", diff_filter, f"{since}...HEAD"]))
+
+    changed = []
+    for name in sorted(names):
+        path = root / name
+        if name.endswith(suffixes) and path.is_file():
+            changed.append(relative_to_cwd(path))
+    return changed
+
+
+def parse_hunk_lines(diff_lines: Iterable[str]) -> dict[str, set[int]]:
+    """New-side line numbers added or modified per file in `git diff -U0` output."""
+    changed: dict[str, set[int]] = {}
+    current: set[int] | None = None
+    for line in diff_lines:
+        if line.startswith("+++ "):
+            name = line[4:]
+            current = None if name == "/dev/null" else changed.setdefault(name, set())
+        elif line.startswith("@@") and current is not None:
+            # @@ -<old>[,<count>] +<start>[,<count>] @@
+            new_side = line.split()[2][1:]
+            start, _, count = new_side.partition(",")
+            length = int(count) if count else 1
+            current.update(range(int(start), int(start) + length))
+    return changed
+
+
+def get_changed_lines(
+    since: str | None = None, suffixes: tuple[str, ...] = PYTHON_SUFFIXES
+) -> dict[Path, set[int]]:
+    """Lines of existing files changed against HEAD (or the merge base with `since`).
+
+    Covers staged and unstaged edits; untracked files count as entirely changed.
+    """
+    root = get_repo_root()
+    base = run_git(["merge-base", since, "HEAD"])[0] if since else "HEAD"
+    diff = run_git(["diff", "-U0", "--no-color", "--no-ext-diff", "--no-prefix", base])
+    names = run_git(["ls-files", "--others", "--exclude-standard", "--full-name"])
+
+    changed: dict[Path, set[int]] = {}
+    for name, lines in parse_hunk_lines(diff).items():
+        path = root / name
+        if name.endswith(suffixes) and path.is_file() and lines:
+            changed[relative_to_cwd(path)] = lines
+    for name in names:
+        path = root / name
+        if name.endswith(suffixes) and path.is_file():
+            text = path.read_text(encoding="utf-8", errors="replace")
+            changed[relative_to_cwd(path)] = set(range(1, len(text.splitlines()) + 1))
+    return changed
+
+
+def module_names(path: Path, root: Path) -> set[str]:
+    """Possible dotted import names for a file (handles `src/` style layouts)."""
+    try:
+        parts = list(path.resolve().relative_to(root).with_suffix("").parts)
+    except ValueError:
+        parts = list(path.with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return {".".join(parts[index:]) for index in range(len(parts))}
+
+
+def imported_modules(path: Path, root: Path) -> set[str]:
+    """Dotted names imported by a file, with relative imports resolved."""
+    try:
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    except (SyntaxError, UnicodeDecodeError, OSError):
+        return set()
+
+    try:
+        package = list(path.resolve().relative_to(root).parent.parts)
+    except ValueError:
+        package = list(path.parent.parts)
+
+    found: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base_parts = package[: len(package) - node.level + 1] if node.level else []
+            if node.module:
+                base_parts = [*base_parts, *node.module.split(".")]
+            base = ".".join(base_parts)
+            if base:
+                found.add(base)
+            found.update(
+                f"{base}.{alias.name}" if base else alias.name for alias in node.names
+            )
+    return found
+
+
+def dotted_prefixes(name: str) -> set[str]:
+    """`a`, `a.b` and `a.b.c` for `a.b.c`: importing a module runs its parents."""
+    parts = name.split(".") if name else []
+    return {".".join(parts[: index + 1]) for index in range(len(parts))}
+
+
+def scanned_imports(path: Path, root: Path) -> set[str]:
+    """Dotted names a file may import, from a textual scan.
+
+    Errs towards too many names (imports in strings count too). `pkg.*`
+    stands for every direct submodule of `pkg`, used when a parenthesised or
+    star import may name submodules this line-based scan cannot see.
+    """
+    try:
+        source = path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return set()
+    try:
+        package = list(path.resolve().relative_to(root).parent.parts)
+    except ValueError:
+        package = list(path.parent.parts)
+
+    found: set[str] = set()
+    for module, names, plain in IMPORT_PATTERN.findall(source):
+        if plain:
+            for item in plain.split(","):
+                words = item.split()
+                if words:
+                    found.update(dotted_prefixes(words[0]))
+            continue
+        level = len(module) - len(module.lstrip("."))
+        base_parts = package[: len(package) - level + 1] if level else []
+        if module.lstrip("."):
+            base_parts = [*base_parts, *module.lstrip(".").split(".")]
+        base = ".".join(base_parts)
+        found.update(dotted_prefixes(base))
+        names = names.split("#")[0].strip()
+        if names.startswith("(") or names.endswith("\\") or names == "*":
+            found.add(f"{base}.*" if base else "*")
+        for item in names.strip("()\\").split(","):
+            words = item.split()
+            if words and words[0] != "*":
+                found.add(f"{base}.{words[0]}" if base else words[0])
+    return found
+
+
+def module_index(root: Path) -> dict[str, list[Path]]:
+    """Resolved Python files under `root` by each dotted name they may have.
+
+    `pkg.*` lists the direct submodules of `pkg`, and `*` the top-level ones.
+    """
+    resolved_root = root.resolve()
+    index: dict[str, list[Path]] = {}
+    for path in iter_python_files([root], KEY_SKIP_DIRS):
+        resolved = path.resolve()
+        for name in module_names(resolved, resolved_root):
+            if not name:
+                continue
+            parent = name.rpartition(".")[0]
+            index.setdefault(name, []).append(resolved)
+            index.setdefault(f"{parent}.*" if parent else "*", []).append(resolved)
+    return index
+
+
+class ImportIndex:
+    """`module_index` and per-file `scanned_imports` of a tree, kept between calls.
+
+    Long-lived callers such as watch mode pass changed paths to `invalidate`
+    so only those files are scanned again; the module index is only rebuilt
+    when a Python file appears or disappears.
+    """
+
+    def __init__(self, root: Path = Path(".")) -> None:
+        self.root = root
+        self.resolved_root = root.resolve()
+        self._modules: dict[str, list[Path]] | None = None
+        self._files: set[Path] = set()
+        self._imports: dict[Path, set[str]] = {}
+
+    def modules(self) -> dict[str, list[Path]]:
+        if self._modules is None:
+            self._modules = module_index(self.root)
+            self._files = {path for paths in self._modules.values() for path in paths}
+        return self._modules
+
+    def imports(self, path: Path) -> set[str]:
+        """Names the resolved `path` may import; callers must not mutate them."""
+        if path not in self._imports:
+            self._imports[path] = scanned_imports(path, self.resolved_root)
+        return self._imports[path]
+
+    def invalidate(self, paths: Iterable[Path]) -> None:
+        for path in paths:
+            resolved = path.resolve()
+            self._imports.pop(resolved, None)
+            if resolved.suffix in PYTHON_SUFFIXES:
+                added_or_removed = resolved.is_file() != (resolved in self._files)
+            else:
+                # A renamed or deleted folder changes the names below it.
+                added_or_removed = not resolved.is_file()
+            if added_or_removed:
+                self._modules = None
+
+
+def import_closure(
+    targets: Sequence[Path],
+    root: Path = Path("."),
+    index: ImportIndex | None = None,
+) -> list[Path]:
+    """The targets' Python files plus every file under `root` they import.
+
+    Imports are followed transitively, parent packages included. Every file
+    an import could refer to is followed, so the closure may hold more than
+    the interpreter would load, never less. Imports that resolve outside
+    `root` (installed packages) are not followed. Pass an `index` built for
+    the same `root` to reuse earlier scans.
+    """
+    index = index or ImportIndex(root)
+    resolved_root = index.resolved_root
+    modules = index.modules()
+    pending = [path.resolve() for path in iter_python_files(targets, KEY_SKIP_DIRS)]
+    seen = set(pending)
+    while pending:
+        path = pending.pop()
+        names = set(index.imports(path))
+        for name in module_names(path, resolved_root):
+            names.update(dotted_prefixes(name.rpartition(".")[0]))
+        for name in names:
+            for candidate in modules.get(name, ()):
+                if candidate not in seen:
+                    seen.add(candidate)
+                    pending.append(candidate)
+    return sorted(seen)
+
+
+def find_reverse_dependents(
+    changed: Sequence[Path], search_root: Path = Path(".")
+) -> list[Path]:
+    """Files under `search_root` that directly import any of the changed modules."""
+    root = search_root.resolve()
+    changed_resolved = {path.resolve() for path in changed}
+    targets: set[str] = set()
+    for path in changed:
+        targets.update(name for name in module_names(path, root) if name)
+    if not targets:
+        return []
+
+    leaf_names = {name.rsplit(".", 1)[-1] for name in targets}
+    dependents = []
+    for path in iter_python_files([search_root]):
+        if path.resolve() in changed_resolved:
+            continue
+        try:
+            source = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        # Cheap textual pre-filter before paying for a full parse.
+        if not any(leaf in source for leaf in leaf_names):
+            continue
+        if imported_modules(path, root) & targets:
+            dependents.append(path)
+    return dependents
+
+
+def add_changed_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register `--changed`/`--since` and make the positional path optional."""
+    parser.add_argument(
+        "--changed",
+        action="store_true",
+        help="Only process Python files that are modified, staged or untracked",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REF",
+        help="With --changed, also include files changed since REF (implies --changed)",
+    )
+
+
+def resolve_targets(
+    path: str | None,
+    changed: bool,
+    since: str | None,
+    *,
+    include_dependents: bool = False,
+) -> list[Path]:
+    """Turn CLI arguments into the list of paths a script should process."""
+    if not (changed or since):
+        if path is None:
+            raise ValueError("a path is required unless --changed is given")
+        return [Path(path)]
+
+    files = get_changed_files(since)
+    if path is not None:
+        scope = Path(path).resolve()
+        files = [
+            file
+            for file in files
+            if file.resolve() == scope or scope in file.resolve().parents
+        ]
+    if include_dependents and files:
+        search_root = Path(path) if path and Path(path).is_dir() else Path(".")
+        files = [*files, *find_reverse_dependents(files, search_root)]
+    return files
+
+
+def describe_targets(targets: Iterable[Path]) -> str:
+    targets = list(targets)
+    if len(targets) == 1:
+        return str(targets[0])
+    return f"{len(targets)} changed files"
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Compact per-session coverage storage for LAZY-DEV-FRAMEWORK.
+
+`coverage.json` repeats per-line data for every measured file on every run.
+Instead of copying it into each `test_runner.jsonl` entry, runs are stored
+under `logs/<session_id>/coverage/`:
+
+- `objects/<id>.json`: one file's covered and missing lines as `[start, end]`
+  ranges, plus the hash of the source it was measured against. Objects are
+  content-addressed, so a file whose coverage did not change between runs is
+  stored once.
+- `runs/<run_id>.json`: a manifest with totals and, per file, its object id
+  and summary numbers.
+- `LATEST`: the id of the most recent run.
+
+Log entries only record the run id, totals and the files whose coverage
+changed since the previous run. Percentages are answered from the manifest
+alone; line-level data is read from a single object on demand.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Final
+
+from impact_analysis import file_hash
+from session_log import LOG_ROOT
+from tracing import traced
+
+STORE_DIR_NAME: Final[str] = "coverage"
+LATEST_FILE_NAME: Final[str] = "LATEST"
+
+Ranges = list[list[int]]
+
+
+def to_ranges(lines: Iterable[int]) -> Ranges:
+    """`[1, 2, 3, 7, 9, 10]` -> `[[1, 3], [7, 7], [9, 10]]`."""
+    ranges: Ranges = []
+    for line in sorted(set(lines)):
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return ranges
+
+
+def from_ranges(ranges: Ranges) -> set[int]:
+    return {line for start, end in ranges for line in range(start, end + 1)}
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, separators=(",", ":"))
+    os.replace(tmp_name, path)
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def compact_file(path: str, file_data: dict) -> dict:
+    """Reduce one `coverage.json` file entry to line ranges and a summary."""
+    source = Path(path)
+    summary = file_data.get("summary", {})
+    return {
+        "source_hash": file_hash(source) if source.is_file() else None,
+        "covered": to_ranges(file_data.get("executed_lines", [])),
+        "missing": to_ranges(file_data.get("missing_lines", [])),
+        "summary": {
+            "num_statements": summary.get("num_statements", 0),
+            "covered_lines": summary.get("covered_lines", 0),
+            "percent_covered": summary.get("percent_covered"),
+        },
+    }
+
+
+class CoverageStore:
+    """Coverage runs of one session, stored as manifests plus shared objects."""
+
+    def __init__(self, session_id: str, root: Path = LOG_ROOT) -> None:
+        self.root = root / session_id / STORE_DIR_NAME
+
+    @property
+    def objects_dir(self) -> Path:
+        return self.root / "objects"
+
+    @property
+    def runs_dir(self) -> Path:
+        return self.root / "runs"
+
+    def latest_run_id(self) -> str | None:
+        try:
+            return (self.root / LATEST_FILE_NAME).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+
+    def load_run(self, run_id: str | None = None) -> dict | None:
+        """Manifest of a run (the latest one by default)."""
+        run_id = run_id or self.latest_run_id()
+        if not run_id:
+            return None
+        return _read_json(self.runs_dir / f"{run_id}.json")
+
+    def total_percent(self, run_id: str | None = None) -> float | None:
+        manifest = self.load_run(run_id)
+        if manifest is None:
+            return None
+        return manifest["totals"].get("percent_covered")
+
+    def file_percents(self, run_id: str | None = None) -> dict[str, float]:
+        manifest = self.load_run(run_id)
+        if manifest is None:
+            return {}
+        return {
+            path: info["percent_covered"] for path, info in manifest["files"].items()
+        }
+
+    def file_percent(self, path: str, run_id: str | None = None) -> float | None:
+        return self.file_percents(run_id).get(path)
+
+    def file_lines(
+        self, path: str, run_id: str | None = None
+    ) -> tuple[set[int], set[int]] | None:
+        """Covered and missing line numbers of one file, read from its object."""
+        manifest = self.load_run(run_id)
+        if manifest is None or path not in manifest["files"]:
+            return None
+        record = _read_json(
+            self.objects_dir / f"{manifest['files'][path]['object']}.json"
+        )
+        if record is None:
+            return None
+        return from_ranges(record["covered"]), from_ranges(record["missing"])
+
+    def _put_object(self, record: dict) -> str:
+        encoded = json.dumps(record, sort_keys=True, separators=(",", ":"))
+        object_id = hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+        path = self.objects_dir / f"{object_id}.json"
+        if not path.exists():
+            _write_json(path, record)
+        return object_id
+
+    @traced()
+    def save_run(self, coverage: dict) -> dict:
+        """Store a `coverage.json` payload and return its delta for the log."""
+        previous = self.load_run()
+        files = {}
+        for path, file_data in (coverage.get("files") or {}).items():
+            record = compact_file(path, file_data)
+            files[path] = {"object": self._put_object(record), **record["summary"]}
+
+        totals = coverage.get("totals", {})
+        run_id = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+        manifest = {
+            "run_id": run_id,
+            "totals": {
+                "num_statements": totals.get("num_statements", 0),
+                "covered_lines": totals.get("covered_lines", 0),
+                "percent_covered": totals.get("percent_covered"),
+            },
+            "files": files,
+        }
+        _write_json(self.runs_dir / f"{run_id}.json", manifest)
+        (self.root / LATEST_FILE_NAME).write_text(run_id, encoding="utf-8")
+
+        before = previous["files"] if previous else {}
+        return {
+            "run_id": run_id,
+            "base_run_id": previous["run_id"] if previous else None,
+            "total_coverage": manifest["totals"]["percent_covered"],
+            "changed": {
+                path: info["percent_covered"]
+                for path, info in files.items()
+                if before.get(path, {}).get("object") != info["object"]
+            },
+            "removed": sorted(set(before) - set(files)),
+        }
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Query coverage stored by test_runner.py for a session."
+    )
+    parser.add_argument("session_id", help="Session identifier")
+    parser.add_argument(
+        "paths", nargs="*", help="Files to report (default: every file)"
+    )
+    parser.add_argument("--run", dest="run_id", help="Run id (default: latest)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or sys.argv[1:])
+    store = CoverageStore(args.session_id)
+    total = store.total_percent(args.run_id)
+    if total is None:
+        print(f"❌ No coverage recorded for session '{args.session_id}'")
+        return 1
+
+    percents = store.file_percents(args.run_id)
+    for path in args.paths or sorted(percents):
+        percent = percents.get(path)
+        shown = f"{percent:6.2f}%" if percent is not None else "   n/a"
+        print(f"{shown}  {path}")
+    print(f"📊 Total coverage: {total:.2f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Diff coverage for `test_runner.py --coverage changed`.
+
+Full coverage traces every line of the whole source tree and reports on all of
+it, although a change only needs its own lines checked. In `changed` mode the
+runner asks this module for:
+
+- the lines changed against HEAD (or the merge base with `--since`), limited
+  to Python files under the coverage target;
+- a coverage config whose `include` names only those files, so coverage
+  ignores every other file;
+- on Python 3.12+, `COVERAGE_CORE=sysmon` for the pytest processes: coverage
+  then uses `sys.monitoring`, which switches off the events of code it does
+  not measure instead of tracing every call;
+- afterwards, the share of changed executable lines the tests ran, checked
+  against the 80% gate.
+
+Changed files the tests never imported are missing from the coverage report;
+their changed statements count as not covered.
+"""
+
+from __future__ import annotations
+
+import ast
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final
+
+from changed_files import get_changed_lines
+from coverage_store import to_ranges
+
+COVERAGE_MODES: Final[tuple[str, ...]] = ("off", "full", "changed")
+DEFAULT_COVERAGE_MODE: Final[str] = "full"
+DIFF_COVERAGE_GATE: Final[float] = 80.0
+RCFILE: Final[Path] = Path(".lazy_cache") / "coverage" / "changed.ini"
+CORE_ENV: Final[str] = "COVERAGE_CORE"
+
+
+@dataclass
+class DiffCoverage:
+    """Coverage of the changed executable lines."""
+
+    gate: float = DIFF_COVERAGE_GATE
+    covered_lines: int = 0
+    changed_lines: int = 0
+    # path -> changed executable lines the tests did not run
+    missing: dict[str, list[int]] = field(default_factory=dict)
+
+    @property
+    def percent(self) -> float | None:
+        if not self.changed_lines:
+            return None
+        return 100.0 * self.covered_lines / self.changed_lines
+
+    @property
+    def passed(self) -> bool:
+        percent = self.percent
+        return percent is None or percent >= self.gate
+
+    def as_dict(self) -> dict:
+        return {
+            "gate": self.gate,
+            "covered_lines": self.covered_lines,
+            "changed_lines": self.changed_lines,
+            "percent": self.percent,
+            "passed": self.passed,
+            "missing": {path: to_ranges(lines) for path, lines in self.missing.items()},
+        }
+
+
+def changed_source_lines(scope: Path, since: str | None = None) -> dict[Path, set[int]]:
+    """Changed lines of the Python files under `scope`; raises `GitError`."""
+    root = scope.resolve()
+    return {
+        path: lines
+        for path, lines in get_changed_lines(since, (".py",)).items()
+        if root == path.resolve() or root in path.resolve().parents
+    }
+
+
+def write_rcfile(paths: list[Path], rcfile: Path = RCFILE) -> Path:
+    """Coverage config that measures only `paths`."""
+    include = "".join(f"\n    {path.resolve()}" for path in sorted(paths))
+    rcfile.parent.mkdir(parents=True, exist_ok=True)
+    rcfile.write_text(f"[run]\ninclude ={include}\n", encoding="utf-8")
+    return rcfile.resolve()
+
+
+def coverage_core() -> str | None:
+    """Prefer the `sys.monitoring` core where it exists, unless one is chosen."""
+    if sys.version_info >= (3, 12) and CORE_ENV not in os.environ:
+        return "sysmon"
+    return None
+
+
+def statement_lines(path: Path) -> set[int]:
+    """First line of every statement, for files coverage never measured."""
+    try:
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return set()
+    lines = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.stmt):
+            continue
+        # Coverage does not count docstrings as executable.
+        if (
+            isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        ):
+            continue
+        lines.add(node.lineno)
+    return lines
+
+
+def compute_diff_coverage(
+    coverage: dict | None,
+    changed: dict[Path, set[int]],
+    gate: float = DIFF_COVERAGE_GATE,
+) -> DiffCoverage:
+    """Intersect the changed lines with a `coverage.json` payload."""
+    measured = {
+        Path(name).resolve(): data
+        for name, data in ((coverage or {}).get("files") or {}).items()
+    }
+    result = DiffCoverage(gate=gate)
+    for path, lines in sorted(changed.items()):
+        data = measured.get(path.resolve())
+        if data is not None:
+            executed = set(data.get("executed_lines", []))
+            executable = executed | set(data.get("missing_lines", []))
+        else:
+            executed = set()
+            executable = statement_lines(path)
+        relevant = lines & executable
+        result.changed_lines += len(relevant)
+        result.covered_lines += len(relevant & executed)
+        missing = sorted(relevant - executed)
+        if missing:
+            result.missing[path.as_posix()] = missing
+    return result
+
+
+def format_diff_coverage(diff: DiffCoverage) -> str:
+    if diff.percent is None:
+        return "no changed executable lines"
+    text = (
+        f"{diff.percent:.1f}% of {diff.changed_lines} changed line(s) covered "
+        f"(gate {diff.gate:g}%)"
+    )
+    for path, lines in diff.missing.items():
+        spans = ", ".join(
+            f"{start}" if start == end else f"{start}-{end}"
+            for start, end in to_ranges(lines)
+        )
+        text += f"\n  {path}: {spans}"
+    return text
@@ -10,16 +10,43 @@ other automation can consume.
 from __future__ import annotations
 
 import argparse
-import json
-import subprocess
 import sys
 import time
-from dataclasses import dataclass
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Final, Iterable, Optional
+from typing import Final
 
+from changed_files import (
+    GitError,
+    add_changed_arguments,
+    describe_targets,
+    resolve_targets,
+)
+from format_engine import (
+    SKIPPED_ERROR,
+    TOOL_NAME,
+    FileTiming,
+    black_available,
+    format_files,
+)
+from session_log import append_entry
+from stream_runner import (
+    TIMEOUT_EXIT_CODE,
+    ResourceUsage,
+    run_streaming,
+    spill_dir_for,
+    step_timeout,
+)
+from tracing import configure as configure_tracing
+from tracing import traced
 
-LOG_FILE_NAME: Final[str] = "format.json"
+LOG_FILE_NAME: Final[str] = "format.jsonl"
+# For the in-process engine and per subprocess of the fallback path; override
+# with LAZY_TIMEOUT_FORMAT_ENGINE, LAZY_TIMEOUT_BLACK and
+# LAZY_TIMEOUT_RUFF_FORMAT (seconds, 0 disables).
+FORMAT_TIMEOUT_SECONDS: Final[float] = 300.0
 
 
 @dataclass
@@ -31,6 +58,11 @@ class StepResult:
     exit_code: int
     stdout: str
     stderr: str
+    stdout_path: str | None = None
+    stderr_path: str | None = None
+    files: list[FileTiming] = field(default_factory=list)
+    slot_wait_seconds: float = 0.0
+    resources: ResourceUsage | None = None
 
     def as_dict(self) -> dict:
         return {
@@ -39,25 +71,45 @@ class StepResult:
             "exit_code": self.exit_code,
             "stdout": self.stdout,
             "stderr": self.stderr,
+            "stdout_path": self.stdout_path,
+            "stderr_path": self.stderr_path,
+            "files": [timing.as_dict() for timing in self.files],
+            "slot_wait_seconds": self.slot_wait_seconds,
+            "resources": self.resources.as_dict() if self.resources else None,
         }
 
 
-def run_subprocess(command: Iterable[str]) -> StepResult:
-    """Run a subprocess command and capture execution metadata."""
+def run_subprocess(
+    command: Iterable[str],
+    *,
+    name: str = "step",
+    echo: bool = True,
+    spill_dir: Path | None = None,
+    slots: int = 0,
+    timeout: float | None = None,
+) -> StepResult:
+    """Run a subprocess command, streaming its output, and capture metadata.
+
+    Only the head and tail of each stream are kept; oversized output is
+    spilled to a file referenced by `stdout_path`/`stderr_path`. `slots` and
+    `timeout` are passed on to `run_streaming`; slots stay 0 for stages whose
+    scripts take their own slots.
+    """
     cmd = list(command)
-    start = time.perf_counter()
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
+    tool = " ".join(cmd[:2]) if len(cmd) > 1 else cmd[0]
+    result = run_streaming(
+        cmd, name=name, echo=echo, spill_dir=spill_dir, slots=slots, timeout=timeout
     )
-    duration = time.perf_counter() - start
     return StepResult(
-        tool=" ".join(cmd[:2]) if len(cmd) > 1 else cmd[0],
-        duration_seconds=duration,
+        tool=tool,
+        duration_seconds=result.duration_seconds,
         exit_code=result.returncode,
-        stdout=result.stdout,
-        stderr=result.stderr,
+        stdout=result.stdout.text,
+        stderr=result.stderr.text,
+        stdout_path=result.stdout.log_path,
+        stderr_path=result.stderr.log_path,
+        slot_wait_seconds=result.slot_wait_seconds,
+        resources=result.resources,
     )
 
 
@@ -67,62 +119,128 @@ def ensure_path(path: Path) -> None:
         raise FileNotFoundError(f"Path does not exist: {path}")
 
 
+@traced()
 def write_log(
-    step_results: list[StepResult], target: Path, session_id: Optional[str]
+    step_results: list[StepResult],
+    targets: Sequence[Path],
+    session_id: str | None,
 ) -> None:
-    """Persist formatter run metadata into logs/<session_id>/format.json."""
+    """Persist formatter run metadata into logs/<session_id>/format.jsonl."""
     if not session_id:
         return
 
-    log_dir = Path("logs") / session_id
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / LOG_FILE_NAME
-
     entry = {
-        "path": str(target),
+        "path": describe_targets(targets),
         "session_id": session_id,
         "steps": [result.as_dict() for result in step_results],
     }
+    if len(targets) > 1:
+        entry["files"] = [str(target) for target in targets]
 
     if all(result.exit_code == 0 for result in step_results):
         entry["status"] = "success"
     else:
         entry["status"] = "failed"
 
-    existing: list[dict] = []
-    if log_file.exists():
-        try:
-            existing = json.loads(log_file.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            existing = []
+    append_entry(session_id, LOG_FILE_NAME, entry)
 
-    existing.append(entry)
-    log_file.write_text(json.dumps(existing, indent=2), encoding="utf-8")
 
-
-def format_path(target: Path, session_id: Optional[str]) -> int:
+def format_path(target: Path, session_id: str | None) -> int:
     """Run Black and Ruff format against the provided path."""
-    ensure_path(target)
+    return format_paths([target], session_id)
+
+
+def run_engine(targets: Sequence[Path]) -> StepResult:
+    """Format in-process with the parallel engine, which takes its own slots."""
+    start = time.perf_counter()
+    timeout = step_timeout("format-engine", FORMAT_TIMEOUT_SECONDS)
+    run = format_files(targets, timeout=timeout)
+    timings = run.timings
+    counts = Counter(timing.status for timing in timings)
+    summary = ", ".join(
+        f"{counts[status]} {status}"
+        for status in ("reformatted", "unchanged", "cached", "error")
+        if counts[status]
+    )
+    errors = "".join(
+        f"{timing.path}: {timing.error}\n"
+        for timing in timings
+        if timing.status == "error" and timing.error != SKIPPED_ERROR
+    )
+    if run.exit_code == TIMEOUT_EXIT_CODE:
+        skipped = sum(timing.error == SKIPPED_ERROR for timing in timings)
+        errors += (
+            f"⏱️ Formatting timed out after {timeout:g}s, {skipped} file(s) left\n"
+        )
+    if errors:
+        print(errors, end="", file=sys.stderr)
+    return StepResult(
+        tool=TOOL_NAME,
+        duration_seconds=time.perf_counter() - start,
+        exit_code=run.exit_code,
+        stdout=f"{summary or 'no Python files'}\n",
+        stderr=errors,
+        files=timings,
+        slot_wait_seconds=run.slot_wait_seconds,
+        resources=run.resources,
+    )
+
+
+def format_paths(targets: Sequence[Path], session_id: str | None) -> int:
+    """Run Black and Ruff format against one or more paths in a single pass."""
+    for target in targets:
+        ensure_path(target)
+    if black_available():
+        label = describe_targets(targets)
+        print(f"Formatting {label} with Black + Ruff format...")
+        result = run_engine(targets)
+        print(result.stdout, end="")
+        write_log([result], targets, session_id)
+        if result.exit_code != 0:
+            print("Formatting failed", file=sys.stderr)
+            return result.exit_code
+        print("Formatting complete")
+        return 0
+    return format_paths_subprocess(targets, session_id)
+
+
+def format_paths_subprocess(targets: Sequence[Path], session_id: str | None) -> int:
+    """Fallback when Black is not importable: run both tools as subprocesses."""
     step_results: list[StepResult] = []
+    label = describe_targets(targets)
+    paths = [str(target) for target in targets]
+    spill_dir = spill_dir_for(session_id)
 
-    print(f"Running Black on {target}...")
-    black_result = run_subprocess([sys.executable, "-m", "black", str(target)])
+    print(f"Running Black on {label}...")
+    black_result = run_subprocess(
+        [sys.executable, "-m", "black", *paths],
+        name="black",
+        spill_dir=spill_dir,
+        slots=1,
+        timeout=step_timeout("black", FORMAT_TIMEOUT_SECONDS),
+    )
     step_results.append(black_result)
     if black_result.exit_code != 0:
-        print(f"Black failed:\n{black_result.stderr}", file=sys.stderr)
-        write_log(step_results, target, session_id)
+        print("Black failed", file=sys.stderr)
+        write_log(step_results, targets, session_id)
         return black_result.exit_code
 
-    print(f"Running Ruff format on {target}...")
-    ruff_result = run_subprocess([sys.executable, "-m", "ruff", "format", str(target)])
+    print(f"Running Ruff format on {label}...")
+    ruff_result = run_subprocess(
+        [sys.executable, "-m", "ruff", "format", *paths],
+        name="ruff-format",
+        spill_dir=spill_dir,
+        slots=1,
+        timeout=step_timeout("ruff-format", FORMAT_TIMEOUT_SECONDS),
+    )
     step_results.append(ruff_result)
     if ruff_result.exit_code != 0:
-        print(f"Ruff format failed:\n{ruff_result.stderr}", file=sys.stderr)
-        write_log(step_results, target, session_id)
+        print("Ruff format failed", file=sys.stderr)
+        write_log(step_results, targets, session_id)
         return ruff_result.exit_code
 
     print("Formatting complete")
-    write_log(step_results, target, session_id)
+    write_log(step_results, targets, session_id)
     return 0
 
 
@@ -130,21 +248,33 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run Black and Ruff format.")
     parser.add_argument(
         "path",
-        help="File or directory to format",
+        nargs="?",
+        help="File or directory to format (scopes --changed when both are given)",
     )
     parser.add_argument(
         "--session",
         dest="session_id",
         help="Optional session identifier for logging",
     )
-    return parser.parse_args(argv)
+    add_changed_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.path is None and not (args.changed or args.since):
+        parser.error("a path is required unless --changed is given")
+    return args
 
 
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
-    target = Path(args.path)
+    configure_tracing(args.session_id, "format.py")
     try:
-        return format_path(target, args.session_id)
+        targets = resolve_targets(args.path, args.changed, args.since)
+        if not targets:
+            print("No changed Python files to format")
+            return 0
+        return format_paths(targets, args.session_id)
+    except GitError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
     except FileNotFoundError as exc:
         print(f"Error: {exc}", file=sys.stderr)
         return 1
@@ -0,0 +1,481 @@
+"""In-process parallel formatting engine for LAZY-DEV-FRAMEWORK.
+
+Instead of launching `python -m black` over the whole target, files are
+formatted through Black's library API, spread over a process pool when there
+are enough of them to pay for it. Black's output goes straight to the native
+`ruff format` binary on stdin (`--stdin-filename`, so Ruff still applies the
+config and excludes of the real path), and the file is replaced atomically
+only when the combined result differs: each file is written at most once.
+
+A run has an overall deadline, checked before each file and bounding every
+Ruff call. With a deadline, files are formatted in worker processes even when
+there are few of them, so a worker stuck inside Black can be killed: once the
+deadline (plus a short grace for workers to notice it) has passed, the pool is
+terminated, the files it had not reported are recorded as timed out and the
+run exits 124.
+CPU time and peak memory of the run, pool workers and Ruff included, are
+reported like those of the subprocess tools.
+
+Files are picked the way `black <targets>` picks them: Black's `include`,
+`exclude`, `extend-exclude` and `force-exclude` settings and `.gitignore`
+apply, and Ruff runs with `--force-exclude` so its own excludes apply too.
+
+Hashes of files known to be formatter-clean are remembered in
+`.lazy_cache/format/clean.json`, keyed by the Black/Ruff versions, the Black
+mode and the project config, so unchanged files are skipped without being
+parsed at all. Each hash also covers the file suffix (stubs format
+differently) and the configs from the file's folder upwards, since Ruff
+honours nested configs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Final
+
+from changed_files import relative_to_cwd
+from result_cache import (
+    CONFIG_FILES,
+    find_config_files,
+    iter_python_files,
+    tool_fingerprint,
+)
+from slot_scheduler import acquire_slots, usable_slots
+from stream_runner import TIMEOUT_EXIT_CODE, ResourceUsage, usage_since, usage_snapshot
+from tracing import span, traced
+
+CACHE_FILE: Final[Path] = Path(".lazy_cache") / "format" / "clean.json"
+MAX_CLEAN_HASHES: Final[int] = 8192
+# Below this many files a process pool costs more than it saves.
+MIN_PARALLEL_FILES: Final[int] = 8
+# How long after the deadline workers may take to wind down before the pool is
+# terminated; they check the deadline between files themselves.
+KILL_GRACE_SECONDS: Final[float] = 2.0
+BLACK_ERROR_EXIT_CODE: Final[int] = 123
+TOOL_NAME: Final[str] = "black+ruff format (in-process)"
+# Per `ruff format` call, i.e. per file.
+RUFF_FORMAT_TIMEOUT_SECONDS: Final[float] = 60.0
+PYTHON_SUFFIXES: Final[tuple[str, ...]] = (".py", ".pyi")
+SKIPPED_ERROR: Final[str] = "skipped: timed out"
+
+
+def black_available() -> bool:
+    try:
+        import black  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def ruff_command() -> list[str]:
+    """Prefer the native ruff binary; `python -m ruff` only as a last resort."""
+    try:
+        from ruff.__main__ import find_ruff_bin
+
+        return [str(find_ruff_bin())]
+    except (ImportError, FileNotFoundError):
+        pass
+    resolved = shutil.which("ruff")
+    if resolved:
+        return [resolved]
+    return [sys.executable, "-m", "ruff"]
+
+
+def black_config(targets: Sequence[Path]) -> dict[str, Any]:
+    """Black's settings from the nearest pyproject.toml, like the CLI reads them."""
+    import black
+
+    project = black.find_pyproject_toml(tuple(str(target) for target in targets))
+    return black.parse_pyproject_toml(project) if project else {}
+
+
+def black_mode(config: dict[str, Any]) -> Any:
+    """Build a `black.Mode` from the project's Black settings."""
+    import black
+
+    target_versions = {
+        black.TargetVersion[version.upper()]
+        for version in config.get("target_version", [])
+    }
+    return black.Mode(
+        target_versions=target_versions,
+        line_length=config.get("line_length", black.DEFAULT_LINE_LENGTH),
+        string_normalization=not config.get("skip_string_normalization", False),
+        magic_trailing_comma=not config.get("skip_magic_trailing_comma", False),
+        preview=config.get("preview", False),
+    )
+
+
+def discover_files(targets: Sequence[Path], config: dict[str, Any]) -> list[Path]:
+    """The Python files `black <targets>` would format.
+
+    Explicitly named files are kept unless `force-exclude` matches them;
+    directories are walked with Black's include/exclude settings and .gitignore.
+    """
+    import black
+
+    def pattern(key: str) -> Any:
+        value = config.get(key)
+        return black.re_compile_maybe_verbose(value) if value else None
+
+    sources = tuple(str(target) for target in targets)
+    root = black.find_project_root(sources)
+    try:
+        found = black.get_sources(
+            root=root[0] if isinstance(root, tuple) else root,
+            src=sources,
+            quiet=True,
+            verbose=False,
+            include=pattern("include")
+            or black.re_compile_maybe_verbose(black.DEFAULT_INCLUDES),
+            exclude=pattern("exclude"),
+            extend_exclude=pattern("extend_exclude"),
+            force_exclude=pattern("force_exclude"),
+            report=black.Report(quiet=True),
+            stdin_filename=None,
+        )
+    except TypeError:
+        # Black releases whose get_sources still takes a click context.
+        return list(iter_python_files(targets))
+    return sorted(
+        relative_to_cwd(path.resolve())
+        for path in found
+        if path.suffix in PYTHON_SUFFIXES
+    )
+
+
+def engine_fingerprint(targets: Sequence[Path], mode: Any) -> str:
+    """Changes whenever a formatter version, the Black mode or config changes."""
+    from importlib import metadata
+
+    digest = hashlib.sha256()
+    digest.update(metadata.version("black").encode())
+    digest.update(tool_fingerprint("ruff", "ruff").encode())
+    digest.update(repr(mode).encode())
+    for config in find_config_files(targets):
+        digest.update(str(config).encode())
+        digest.update(config.read_bytes())
+    return digest.hexdigest()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ConfigDigests:
+    """Per folder, a digest of the config files from that folder upwards."""
+
+    def __init__(self) -> None:
+        self.by_folder: dict[Path, str] = {}
+
+    def folder_digest(self, folder: Path) -> str:
+        if folder not in self.by_folder:
+            digest = hashlib.sha256()
+            if folder.parent != folder:
+                digest.update(self.folder_digest(folder.parent).encode())
+            for name in CONFIG_FILES:
+                config = folder / name
+                if config.is_file():
+                    digest.update(name.encode())
+                    digest.update(config.read_bytes())
+            self.by_folder[folder] = digest.hexdigest()
+        return self.by_folder[folder]
+
+    def clean_key(self, path: str, digest: str) -> str:
+        """Cache key of contents hashing to `digest`, formatted as `path`."""
+        folder = self.folder_digest(Path(path).resolve().parent)
+        return f"{digest}:{Path(path).suffix}:{folder[:16]}"
+
+
+@dataclass
+class FileTiming:
+    """Outcome of formatting one file."""
+
+    path: str
+    status: str  # "unchanged", "reformatted", "cached" or "error"
+    duration_seconds: float
+    error: str | None = None
+    formatter: str | None = None  # "black" or "ruff" when it caused the error
+
+    def as_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "status": self.status,
+            "duration_seconds": self.duration_seconds,
+            "error": self.error,
+            "formatter": self.formatter,
+        }
+
+
+@dataclass
+class FormatRun:
+    """Outcome of `format_files`."""
+
+    exit_code: int
+    timings: list[FileTiming]
+    # Summed over every chunk.
+    slot_wait_seconds: float = 0.0
+    resources: ResourceUsage | None = None
+
+
+class CleanHashCache:
+    """Hashes of file contents already known to be formatter-clean."""
+
+    def __init__(self, fingerprint: str, path: Path = CACHE_FILE) -> None:
+        self.path = path
+        self.fingerprint = fingerprint
+        self.hashes: dict[str, None] = {}
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("fingerprint") == fingerprint:
+            self.hashes = dict.fromkeys(data.get("hashes", []))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.hashes
+
+    def add(self, key: str) -> None:
+        self.hashes.pop(key, None)
+        self.hashes[key] = None
+
+    def save(self) -> None:
+        hashes = list(self.hashes)[-MAX_CLEAN_HASHES:]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump({"fingerprint": self.fingerprint, "hashes": hashes}, handle)
+        os.replace(tmp_name, self.path)
+
+
+class RuffFormatError(Exception):
+    """`ruff format` rejected a file or could not be run."""
+
+
+def ruff_format_source(
+    source: str, path: str, ruff: Sequence[str], deadline: float | None = None
+) -> str:
+    """Format `source` with `ruff format` as if it were the contents of `path`."""
+    timeout = RUFF_FORMAT_TIMEOUT_SECONDS
+    if deadline is not None:
+        timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+    try:
+        result = subprocess.run(
+            [*ruff, "format", "--force-exclude", "--stdin-filename", path],
+            input=source,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            timeout=timeout,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        raise RuffFormatError(f"ruff format timed out after {timeout:.0f}s") from None
+    except OSError as exc:
+        raise RuffFormatError(f"ruff format: {exc}") from None
+    if result.returncode != 0:
+        message = result.stderr.strip() or f"ruff format exit {result.returncode}"
+        raise RuffFormatError(message)
+    return result.stdout
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace `path` with `data` in one step, keeping its permissions."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        shutil.copymode(path, tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def format_file(
+    path: str, mode: Any, ruff: Sequence[str], deadline: float | None = None
+) -> tuple[FileTiming, str | None]:
+    """Format one file with Black, then Ruff, in memory; write it at most once.
+
+    Returns the timing record and the hash of the final contents (None on
+    error).
+    """
+    import black
+
+    start = time.perf_counter()
+    source_path = Path(path)
+
+    def done(
+        status: str, error: str | None = None, formatter: str | None = None
+    ) -> FileTiming:
+        return FileTiming(path, status, time.perf_counter() - start, error, formatter)
+
+    try:
+        raw = source_path.read_bytes()
+        newline = "\r\n" if b"\r\n" in raw.split(b"\n", 1)[0] + b"\n" else "\n"
+        source = raw.decode("utf-8").replace("\r\n", "\n")
+        file_mode = mode
+        if path.endswith(".pyi") and not mode.is_pyi:
+            file_mode = replace(mode, is_pyi=True)
+        formatted = black.format_file_contents(source, fast=False, mode=file_mode)
+    except black.NothingChanged:
+        formatted = source
+    except Exception as exc:  # noqa: BLE001 - Black raises plain exceptions too
+        return done("error", f"{type(exc).__name__}: {exc}", "black"), None
+
+    try:
+        formatted = ruff_format_source(formatted, path, ruff, deadline)
+    except RuffFormatError as exc:
+        return done("error", str(exc), "ruff"), None
+
+    data = formatted.replace("\r\n", "\n").replace("\n", newline).encode("utf-8")
+    if data == raw:
+        return done("unchanged"), content_hash(raw)
+    try:
+        write_atomic(source_path, data)
+    except OSError as exc:
+        return done("error", str(exc)), None
+    return done("reformatted"), content_hash(data)
+
+
+def timed_out(deadline: float | None) -> bool:
+    # time.monotonic() is system-wide, so pool workers share the deadline.
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def format_chunk(
+    paths: Sequence[str],
+    mode: Any,
+    ruff: Sequence[str],
+    deadline: float | None = None,
+) -> tuple[list[tuple[FileTiming, str | None]], float]:
+    """Format a chunk of files while holding one scheduler slot.
+
+    Files reached after `deadline` are skipped as errors. Returns the outcomes
+    and the time spent waiting for the slot.
+    """
+    with acquire_slots(1) as grant:
+        outcomes: list[tuple[FileTiming, str | None]] = []
+        for path in paths:
+            if timed_out(deadline):
+                outcomes.extend(skipped([path]))
+            else:
+                outcomes.append(format_file(path, mode, ruff, deadline))
+        return outcomes, grant.wait_seconds
+
+
+def skipped(paths: Sequence[str]) -> list[tuple[FileTiming, str | None]]:
+    return [
+        (FileTiming(path, "error", 0.0, SKIPPED_ERROR, "black"), None) for path in paths
+    ]
+
+
+def format_in_pool(
+    chunks: Sequence[Sequence[str]],
+    mode: Any,
+    ruff: Sequence[str],
+    deadline: float | None,
+    workers: int,
+) -> tuple[list[tuple[FileTiming, str | None]], float]:
+    """Format chunks in worker processes, terminating them at the deadline.
+
+    Chunks that have not finished by then are recorded as skipped.
+    """
+    outcomes: list[tuple[FileTiming, str | None]] = []
+    slot_wait = 0.0
+    # Leaving the block terminates the workers, finished or not.
+    with multiprocessing.Pool(processes=workers) as pool:
+        results = [
+            pool.apply_async(format_chunk, (chunk, mode, ruff, deadline))
+            for chunk in chunks
+        ]
+        for chunk, result in zip(chunks, results, strict=True):
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, deadline + KILL_GRACE_SECONDS - time.monotonic())
+            try:
+                chunk_outcomes, wait = result.get(timeout=timeout)
+            except multiprocessing.TimeoutError:
+                outcomes.extend(skipped(chunk))
+                continue
+            outcomes.extend(chunk_outcomes)
+            slot_wait += wait
+    return outcomes, slot_wait
+
+
+@traced()
+def format_files(
+    targets: Sequence[Path],
+    *,
+    workers: int | None = None,
+    timeout: float | None = None,
+) -> FormatRun:
+    """Format every Python file below the targets within `timeout` seconds.
+
+    Each chunk of files takes one slot from the machine-wide scheduler while
+    it is formatted, so the pool only grows as far as slots are free instead
+    of claiming a slot per CPU up front.
+    """
+    before = usage_snapshot()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with span("load_config"):
+        config = black_config(targets)
+        mode = black_mode(config)
+        cache = CleanHashCache(engine_fingerprint(targets, mode))
+        ruff = ruff_command()
+
+    timings: list[FileTiming] = []
+    pending: list[str] = []
+    digests = ConfigDigests()
+    for path in discover_files(targets, config):
+        start = time.perf_counter()
+        key = digests.clean_key(str(path), content_hash(path.read_bytes()))
+        if key in cache:
+            timings.append(FileTiming(str(path), "cached", time.perf_counter() - start))
+        else:
+            pending.append(str(path))
+
+    workers = usable_slots(min(workers or os.cpu_count() or 1, len(pending)))
+    outcomes: list[tuple[FileTiming, str | None]] = []
+    slot_wait = 0.0
+    if len(pending) < MIN_PARALLEL_FILES:
+        workers = 1
+    with span("format"):
+        if pending and (workers > 1 or deadline is not None):
+            size = max(1, len(pending) // (workers * 4))
+            chunks = [pending[i : i + size] for i in range(0, len(pending), size)]
+            outcomes, slot_wait = format_in_pool(chunks, mode, ruff, deadline, workers)
+        elif pending:
+            outcomes, slot_wait = format_chunk(pending, mode, ruff, deadline)
+    expired = timed_out(deadline)
+
+    for timing, final_hash in outcomes:
+        if final_hash is not None:
+            cache.add(digests.clean_key(timing.path, final_hash))
+        timings.append(timing)
+    cache.save()
+
+    failed = any(timing.status == "error" for timing in timings)
+    exit_code = BLACK_ERROR_EXIT_CODE if failed else 0
+    resources = usage_since(before)
+    if expired:
+        exit_code = TIMEOUT_EXIT_CODE
+        if resources is not None:
+            resources.timed_out = True
+    return FormatRun(
+        exit_code=exit_code,
+        timings=timings,
+        slot_wait_seconds=slot_wait,
+        resources=resources,
+    )
@@ -4,33 +4,187 @@
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
+import http.client
 import json
+import os
+import random
+import re
 import subprocess
 import sys
-from typing import Optional
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Final
+
+from github_http import (
+    DEFAULT_API_URL,
+    SECONDARY_LIMIT_SECONDS,
+    ApiRateLimitError,
+    GitHubApiError,
+    GitHubHttpClient,
+)
+from issue_store import DEFAULT_MAX_AGE_SECONDS, IssueStore, decode_pages
+
+# Points the wrapper at a stand-in for the gh binary (e.g. in tests).
+GH_BIN_ENV: Final[str] = "LAZY_GH_BIN"
+# "http" switches to the pooled REST backend; "cli" (default) spawns gh.
+BACKEND_ENV: Final[str] = "LAZY_GH_BACKEND"
+API_URL_ENV: Final[str] = "LAZY_GH_API_URL"
+ISSUES_PER_PAGE: Final[int] = 100
+# `gh issue list` stops at 30 unless told otherwise; the http backend reads
+# every page, so the CLI is asked for more than any repository holds.
+CLI_ISSUE_LIMIT: Final[int] = 1_000_000
+DEFAULT_BATCH_WORKERS: Final[int] = 4
+MAX_RATE_LIMIT_RETRIES: Final[int] = 5
+BACKOFF_BASE_SECONDS: Final[float] = 2.0
+BACKOFF_MAX_SECONDS: Final[float] = 120.0
+GH_TIMEOUT_SECONDS: Final[float] = 120.0
+RATE_LIMIT_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"rate limit|abuse detection|HTTP 429", re.IGNORECASE
+)
+PRIMARY_LIMIT_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"API rate limit exceeded", re.IGNORECASE
+)
+ISSUE_KEY_MARKER: Final[str] = "<!-- lazy-dev-issue-key: {key} -->"
+ISSUE_KEY_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"<!-- lazy-dev-issue-key: (\S+) -->"
+)
 
 
 class GitHubError(RuntimeError):
     """Base error for GitHub CLI failures."""
 
 
+class RateLimitError(GitHubError):
+    """GitHub rejected the call because of a primary or secondary rate limit.
+
+    `retry_after` is the wait in seconds GitHub asked for, when known.
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 def run_command(command: list[str]) -> str:
-    result = subprocess.run(command, capture_output=True, text=True)
+    try:
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            timeout=GH_TIMEOUT_SECONDS,
+            check=False,
+        )
+    except subprocess.TimeoutExpired as exc:
+        raise GitHubError(f"{command[0]} timed out after {exc.timeout:g}s") from exc
     if result.returncode != 0:
-        raise GitHubError(result.stderr.strip() or "Unknown GitHub CLI error")
+        message = result.stderr.strip() or "Unknown GitHub CLI error"
+        if RATE_LIMIT_PATTERN.search(message):
+            raise RateLimitError(message, cli_retry_after(message))
+        raise GitHubError(message)
     return result.stdout.strip()
 
 
+def cli_retry_after(message: str) -> float | None:
+    """The wait a rate-limited gh call implies; gh prints no response headers.
+
+    A primary limit lasts until the reset time `gh api rate_limit` reports
+    (that endpoint is not itself rate limited); a secondary limit gets the
+    minute GitHub asks for when it sends no Retry-After.
+    """
+    if not PRIMARY_LIMIT_PATTERN.search(message):
+        return SECONDARY_LIMIT_SECONDS if "secondary" in message.lower() else None
+    try:
+        result = subprocess.run(
+            [gh_binary(), "api", "rate_limit", "--jq", ".resources.core.reset"],
+            capture_output=True,
+            text=True,
+            timeout=GH_TIMEOUT_SECONDS,
+            check=False,
+        )
+        reset = float(result.stdout.strip()) if result.returncode == 0 else None
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        reset = None
+    return None if reset is None else max(0.0, reset - time.time())
+
+
+def gh_binary() -> str:
+    return os.environ.get(GH_BIN_ENV, "gh")
+
+
+def github_token() -> str | None:
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+    try:
+        return run_command([gh_binary(), "auth", "token"]) or None
+    except (GitHubError, OSError):
+        return None
+
+
+_http_client: GitHubHttpClient | None = None
+# Set once the backend was chosen, so a missing token is looked up only once.
+_http_client_resolved = False
+_http_client_lock = threading.Lock()
+
+
+def http_client() -> GitHubHttpClient | None:
+    """Shared pooled REST client, or None to use the gh CLI backend.
+
+    The CLI stays in use unless `LAZY_GH_BACKEND=http`, and is also the
+    fallback when no token is available for the real API.
+    """
+    global _http_client, _http_client_resolved
+    if os.environ.get(BACKEND_ENV, "cli") != "http":
+        return None
+    with _http_client_lock:
+        if not _http_client_resolved:
+            api_url = os.environ.get(API_URL_ENV, DEFAULT_API_URL)
+            token = github_token()
+            if token is not None or api_url != DEFAULT_API_URL:
+                _http_client = GitHubHttpClient(token, api_url)
+            _http_client_resolved = True
+        return _http_client
+
+
+@contextmanager
+def api_errors() -> Iterator[None]:
+    """Surface REST backend failures as the wrapper's usual exceptions."""
+    try:
+        yield
+    except ApiRateLimitError as exc:
+        raise RateLimitError(str(exc), exc.retry_after) from exc
+    except (GitHubApiError, OSError, http.client.HTTPException) as exc:
+        raise GitHubError(str(exc)) from exc
+
+
 def create_issue(
     title: str,
     body: str,
     *,
-    labels: Optional[list[str]] = None,
-    milestone: Optional[str] = None,
-    assignee: Optional[str] = None,
-    repo: Optional[str] = None,
+    labels: list[str] | None = None,
+    milestone: str | None = None,
+    assignee: str | None = None,
+    repo: str | None = None,
 ) -> str:
-    command = ["gh", "issue", "create", "--title", title, "--body", body]
+    client = http_client()
+    if client is not None:
+        with api_errors():
+            return client.create_issue(
+                repo or current_repo(),
+                title,
+                body,
+                labels=labels,
+                milestone=milestone,
+                assignee=assignee,
+            )
+
+    command = [gh_binary(), "issue", "create", "--title", title, "--body", body]
     if labels:
         command.extend(["--label", ",".join(labels)])
     if milestone:
@@ -47,11 +201,33 @@ def create_pr(
     body: str,
     *,
     base: str = "main",
-    head: Optional[str] = None,
-    labels: Optional[list[str]] = None,
-    repo: Optional[str] = None,
+    head: str | None = None,
+    labels: list[str] | None = None,
+    repo: str | None = None,
 ) -> str:
-    command = ["gh", "pr", "create", "--title", title, "--body", body, "--base", base]
+    client = http_client()
+    if client is not None:
+        with api_errors():
+            return client.create_pr(
+                repo or current_repo(),
+                title,
+                body,
+                base=base,
+                head=head or get_current_branch(),
+                labels=labels,
+            )
+
+    command = [
+        gh_binary(),
+        "pr",
+        "create",
+        "--title",
+        title,
+        "--body",
+        body,
+        "--base",
+        base,
+    ]
     if head:
         command.extend(["--head", head])
     if labels:
@@ -61,9 +237,62 @@ def create_pr(
     return run_command(command)
 
 
-def list_issues(repo: str, *, state: str = "open") -> list[dict]:
+def fetch_issues(repo: str, since: str | None = None) -> list[dict]:
+    """Every issue (all states) updated at or after `since`, across all pages."""
+    client = http_client()
+    if client is not None:
+        with api_errors():
+            return client.fetch_issues(repo, since)
+
     command = [
-        "gh",
+        gh_binary(),
+        "api",
+        "--method",
+        "GET",
+        f"repos/{repo}/issues",
+        "--paginate",
+        "-f",
+        "state=all",
+        "-f",
+        "sort=updated",
+        "-f",
+        "direction=asc",
+        "-f",
+        f"per_page={ISSUES_PER_PAGE}",
+    ]
+    if since:
+        command.extend(["-f", f"since={since}"])
+    return decode_pages(run_command(command))
+
+
+def list_issues(
+    repo: str,
+    *,
+    state: str = "open",
+    labels: list[str] | None = None,
+    search: str | None = None,
+    cached: bool = False,
+    max_age: float = DEFAULT_MAX_AGE_SECONDS,
+) -> list[dict]:
+    """List issues from GitHub, or from the local store when `cached` is set.
+
+    The cached path syncs incrementally first when the store is older than
+    `max_age` seconds, then filters locally (`search` matches title or body).
+    """
+    if cached:
+        with IssueStore() as store:
+            age = store.sync_age(repo)
+            if age is None or age > max_age:
+                store.sync(repo, fetch_issues)
+            return store.query(repo, state=state, labels=labels or (), text=search)
+
+    client = http_client()
+    if client is not None:
+        with api_errors():
+            return client.list_issues(repo, state=state, labels=labels, search=search)
+
+    command = [
+        gh_binary(),
         "issue",
         "list",
         "--repo",
@@ -72,17 +301,166 @@ def list_issues(repo: str, *, state: str = "open") -> list[dict]:
         state,
         "--json",
         "number,title,body,url",
+        "--limit",
+        str(CLI_ISSUE_LIMIT),
     ]
+    if labels:
+        command.extend(["--label", ",".join(labels)])
+    if search:
+        command.extend(["--search", search])
     output = run_command(command)
     return json.loads(output)
 
 
+@functools.cache
+def current_repo() -> str:
+    return run_command(
+        [
+            gh_binary(),
+            "repo",
+            "view",
+            "--json",
+            "nameWithOwner",
+            "--jq",
+            ".nameWithOwner",
+        ]
+    )
+
+
+class RateLimiter:
+    """Pause shared by all batch workers once any of them hits a rate limit."""
+
+    def __init__(
+        self,
+        base_seconds: float = BACKOFF_BASE_SECONDS,
+        max_seconds: float = BACKOFF_MAX_SECONDS,
+    ) -> None:
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def back_off(self, attempt: int, minimum: float | None = None) -> None:
+        """Pause every worker; at least `minimum` seconds when the server said so."""
+        delay = min(self.max_seconds, self.base_seconds * 2**attempt)
+        delay *= random.uniform(1.0, 1.5)
+        if minimum is not None and minimum > delay:
+            delay = minimum
+            print(
+                f"⏳ Rate limited; GitHub asked to wait {delay:.0f}s", file=sys.stderr
+            )
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+
+def load_issue_specs(path: Path) -> list[dict]:
+    """Read issue specs from JSON Lines (one object per line) or YAML (a list)."""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yml", ".yaml"):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise GitHubError("PyYAML is required to read YAML issue files") from exc
+        specs = yaml.safe_load(text) or []
+        if isinstance(specs, dict):
+            specs = specs.get("issues", [])
+    else:
+        specs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for index, spec in enumerate(specs, start=1):
+        if not isinstance(spec, dict) or not spec.get("title"):
+            raise GitHubError(f"{path}: issue #{index} has no title")
+    return specs
+
+
+def issue_key(spec: dict) -> str:
+    """Stable identity of a spec: its `key`, or a hash of its title."""
+    if spec.get("key"):
+        return str(spec["key"])
+    return hashlib.sha256(spec["title"].encode("utf-8")).hexdigest()[:16]
+
+
+def create_issues(
+    specs: list[dict],
+    *,
+    repo: str | None = None,
+    workers: int = DEFAULT_BATCH_WORKERS,
+    limiter: RateLimiter | None = None,
+) -> list[dict]:
+    """Create many issues concurrently, skipping ones that already exist.
+
+    Every created issue carries a hidden key marker in its body, so re-running
+    the same batch finds it by marker (or by an open issue with the same title)
+    and reports it as `exists` instead of creating a duplicate. Rate-limited
+    calls are retried with a shared exponential backoff, never shorter than
+    the wait GitHub asked for.
+    """
+    repo = repo or current_repo()
+    limiter = limiter or RateLimiter()
+    with IssueStore() as store:
+        store.sync(repo, fetch_issues)
+        known = store.query(repo, state="all")
+    by_key = {
+        match.group(1): issue["url"]
+        for issue in known
+        for match in ISSUE_KEY_PATTERN.finditer(issue["body"])
+    }
+    by_title = {
+        issue["title"]: issue["url"] for issue in known if issue["state"] == "open"
+    }
+
+    def create(spec: dict) -> dict:
+        key = issue_key(spec)
+        result = {"key": key, "title": spec["title"], "url": None, "error": None}
+        existing = by_key.get(key) or by_title.get(spec["title"])
+        if existing:
+            return {**result, "status": "exists", "url": existing}
+
+        body = f"{spec.get('body', '')}\n\n{ISSUE_KEY_MARKER.format(key=key)}"
+        labels = spec.get("labels")
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            limiter.wait()
+            try:
+                url = create_issue(
+                    spec["title"],
+                    body,
+                    labels=labels.split(",") if isinstance(labels, str) else labels,
+                    milestone=spec.get("milestone"),
+                    assignee=spec.get("assignee"),
+                    repo=repo,
+                )
+                return {**result, "status": "created", "url": url}
+            except RateLimitError as exc:
+                result["error"] = str(exc)
+                limiter.back_off(attempt, exc.retry_after)
+            except GitHubError as exc:
+                return {**result, "status": "failed", "error": str(exc)}
+        return {**result, "status": "failed"}
+
+    unique: dict[str, dict] = {}
+    for spec in specs:
+        unique.setdefault(issue_key(spec), spec)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(create, unique.values()))
+    return results
+
+
 def get_current_branch() -> str:
     return run_command(["git", "rev-parse", "--abbrev-ref", "HEAD"])
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="GitHub CLI wrapper.")
+    parser.add_argument(
+        "--backend",
+        choices=["cli", "http"],
+        help=f"Use the gh CLI or the pooled REST API (default: ${BACKEND_ENV} or cli)",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     issue_parser = subparsers.add_parser("create-issue", help="Create a GitHub issue")
@@ -101,11 +479,44 @@ def build_parser() -> argparse.ArgumentParser:
     pr_parser.add_argument("--labels")
     pr_parser.add_argument("--repo")
 
+    batch_parser = subparsers.add_parser(
+        "create-issues", help="Create many GitHub issues from a JSONL/YAML file"
+    )
+    batch_parser.add_argument(
+        "--from",
+        dest="source",
+        required=True,
+        type=Path,
+        help="JSON Lines or YAML file of issues (title, body, labels, key, ...)",
+    )
+    batch_parser.add_argument("--repo")
+    batch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_BATCH_WORKERS,
+        help=f"Concurrent gh calls (default: {DEFAULT_BATCH_WORKERS})",
+    )
+
     list_parser = subparsers.add_parser("list-issues", help="List GitHub issues")
     list_parser.add_argument("--repo", required=True)
     list_parser.add_argument(
         "--state", default="open", choices=["open", "closed", "all"]
     )
+    list_parser.add_argument("--labels", help="Comma-separated labels to require")
+    list_parser.add_argument("--search", help="Text to match in title or body")
+    list_parser.add_argument(
+        "--cached",
+        action="store_true",
+        help="Serve from the local issue store (.lazy_cache/issues.sqlite3)",
+    )
+    list_parser.add_argument(
+        "--max-age",
+        type=float,
+        help=(
+            "Sync the local store first if older than this many seconds "
+            f"(implies --cached, default: {DEFAULT_MAX_AGE_SECONDS:g})"
+        ),
+    )
 
     subparsers.add_parser("current-branch", help="Print the current git branch")
 
@@ -115,6 +526,8 @@ def build_parser() -> argparse.ArgumentParser:
 def main(argv: list[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.backend:
+        os.environ[BACKEND_ENV] = args.backend
 
     try:
         if args.command == "create-issue":
@@ -129,6 +542,21 @@ def main(argv: list[str] | None = None) -> int:
             )
             print(f"✅ Issue created: {issue_url}")
             return 0
+        if args.command == "create-issues":
+            results = create_issues(
+                load_issue_specs(args.source), repo=args.repo, workers=args.workers
+            )
+            print(json.dumps(results, indent=2))
+            counts = {
+                status: sum(1 for result in results if result["status"] == status)
+                for status in ("created", "exists", "failed")
+            }
+            summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+            print(
+                f"{'❌' if counts['failed'] else '✅'} Issues: {summary}",
+                file=sys.stderr,
+            )
+            return 1 if counts["failed"] else 0
         if args.command == "create-pr":
             labels = args.labels.split(",") if args.labels else None
             pr_url = create_pr(
@@ -142,7 +570,15 @@ def main(argv: list[str] | None = None) -> int:
             print(f"✅ PR created: {pr_url}")
             return 0
         if args.command == "list-issues":
-            issues = list_issues(args.repo, state=args.state)
+            max_age = DEFAULT_MAX_AGE_SECONDS if args.max_age is None else args.max_age
+            issues = list_issues(
+                args.repo,
+                state=args.state,
+                labels=args.labels.split(",") if args.labels else None,
+                search=args.search,
+                cached=args.cached or args.max_age is not None,
+                max_age=max_age,
+            )
             print(json.dumps(issues, indent=2))
             return 0
         if args.command == "current-branch":
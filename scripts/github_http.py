@@ -0,0 +1,318 @@
+"""Pooled GitHub REST backend for `gh_wrapper.py`.
+
+Spawning `gh` for every call pays process start-up, auth lookup and a fresh
+TLS handshake each time. This client keeps a small pool of keep-alive HTTP
+connections to the API and reuses them across calls and threads, so a call
+costs one request round trip. It is opt-in (`LAZY_GH_BACKEND=http`); the CLI
+backend stays the default and the fallback.
+
+The API root can be pointed at a mock server with `LAZY_GH_API_URL`.
+"""
+
+from __future__ import annotations
+
+import email.utils
+import http.client
+import json
+import queue
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Final
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_API_URL: Final[str] = "https://api.github.com"
+DEFAULT_POOL_SIZE: Final[int] = 8
+REQUEST_TIMEOUT_SECONDS: Final[float] = 30.0
+PER_PAGE: Final[int] = 100
+# GitHub asks clients to wait at least a minute after a secondary rate limit
+# that came without a Retry-After header.
+SECONDARY_LIMIT_SECONDS: Final[float] = 60.0
+NEXT_LINK_PATTERN: Final[re.Pattern[str]] = re.compile(r'<([^>]+)>;\s*rel="next"')
+# A kept-alive connection the server already closed fails on first use.
+STALE_CONNECTION_ERRORS: Final[tuple[type[Exception], ...]] = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class GitHubApiError(RuntimeError):
+    """Non-success response from the GitHub API."""
+
+    def __init__(self, message: str, status: int) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ApiRateLimitError(GitHubApiError):
+    """The API refused the request because of a primary or secondary rate limit.
+
+    `retry_after` is how many seconds the server asked the client to wait, or
+    None when the response did not say.
+    """
+
+    def __init__(
+        self, message: str, status: int, retry_after: float | None = None
+    ) -> None:
+        super().__init__(message, status)
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(
+    response: http.client.HTTPResponse, message: str
+) -> float | None:
+    """The wait a rate-limited response asks for, from its headers or message."""
+    header = response.getheader("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(header)
+            except (TypeError, ValueError):
+                when = None
+            if when is not None:
+                return max(0.0, when.timestamp() - time.time())
+    reset = response.getheader("x-ratelimit-reset")
+    if response.getheader("x-ratelimit-remaining") == "0" and reset:
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    if "secondary rate limit" in message.lower():
+        return SECONDARY_LIMIT_SECONDS
+    return None
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections to one host."""
+
+    def __init__(self, base_url: str, size: int = DEFAULT_POOL_SIZE) -> None:
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(
+            maxsize=size
+        )
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=REQUEST_TIMEOUT_SECONDS
+            )
+        return http.client.HTTPConnection(
+            self.host, self.port, timeout=REQUEST_TIMEOUT_SECONDS
+        )
+
+    @contextmanager
+    def connection(self) -> Iterator[tuple[http.client.HTTPConnection, bool]]:
+        """Yield a connection and whether it was reused from the pool."""
+        try:
+            connection, reused = self.idle.get_nowait(), True
+        except queue.Empty:
+            connection, reused = self._connect(), False
+        try:
+            yield connection, reused
+        except BaseException:
+            connection.close()
+            raise
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class GitHubHttpClient:
+    """The subset of the GitHub REST API that `gh_wrapper` needs."""
+
+    def __init__(
+        self,
+        token: str | None,
+        api_url: str = DEFAULT_API_URL,
+        *,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        self.pool = ConnectionPool(api_url, pool_size)
+        self.headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "lazy-dev-gh-wrapper",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        payload: dict[str, Any] | None = None,
+    ) -> tuple[Any, str | None]:
+        """Send one request; return the decoded body and the next page's path."""
+        if not path.startswith(self.pool.prefix + "/"):
+            path = f"{self.pool.prefix}/{path.lstrip('/')}"
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = dict(self.headers)
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(2):
+            with self.pool.connection() as (connection, reused):
+                try:
+                    connection.request(method, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except STALE_CONNECTION_ERRORS:
+                    if reused and attempt == 0:
+                        connection.close()
+                        continue
+                    raise
+                break
+
+        try:
+            decoded = json.loads(data) if data else None
+        except ValueError:
+            # Proxies and maintenance pages answer errors with HTML, not JSON.
+            if response.status < 400:
+                raise GitHubApiError(
+                    f"HTTP {response.status}: response is not JSON", response.status
+                ) from None
+            decoded = None
+        if response.status >= 400:
+            message = (
+                decoded.get("message", "") if isinstance(decoded, dict) else ""
+            ) or response.reason
+            error = f"HTTP {response.status}: {message}"
+            remaining = response.getheader("x-ratelimit-remaining")
+            if (
+                response.status == 429
+                or remaining == "0"
+                or "rate limit" in message.lower()
+            ):
+                raise ApiRateLimitError(
+                    error, response.status, retry_after_seconds(response, message)
+                )
+            raise GitHubApiError(error, response.status)
+
+        match = NEXT_LINK_PATTERN.search(response.getheader("Link") or "")
+        next_path = None
+        if match:
+            next_url = urlsplit(match.group(1))
+            next_path = f"{next_url.path}?{next_url.query}"
+        return decoded, next_path
+
+    def paginate(self, path: str, params: dict[str, Any]) -> list[dict]:
+        items: list[dict] = []
+        page, next_path = self.request(
+            "GET", path, params={**params, "per_page": PER_PAGE}
+        )
+        items.extend(page)
+        while next_path:
+            page, next_path = self.request("GET", next_path)
+            items.extend(page)
+        return items
+
+    def milestone_number(self, repo: str, title: str) -> int:
+        for milestone in self.paginate(f"repos/{repo}/milestones", {"state": "all"}):
+            if milestone["title"] == title:
+                return milestone["number"]
+        raise GitHubApiError(f"Milestone not found: {title}", 404)
+
+    def create_issue(
+        self,
+        repo: str,
+        title: str,
+        body: str,
+        *,
+        labels: list[str] | None = None,
+        milestone: str | None = None,
+        assignee: str | None = None,
+    ) -> str:
+        payload: dict[str, Any] = {"title": title, "body": body}
+        if labels:
+            payload["labels"] = labels
+        if milestone:
+            payload["milestone"] = self.milestone_number(repo, milestone)
+        if assignee:
+            payload["assignees"] = [assignee]
+        issue, _ = self.request("POST", f"repos/{repo}/issues", payload=payload)
+        return issue["html_url"]
+
+    def create_pr(
+        self,
+        repo: str,
+        title: str,
+        body: str,
+        *,
+        base: str,
+        head: str,
+        labels: list[str] | None = None,
+    ) -> str:
+        payload = {"title": title, "body": body, "base": base, "head": head}
+        pull, _ = self.request("POST", f"repos/{repo}/pulls", payload=payload)
+        if labels:
+            self.request(
+                "POST",
+                f"repos/{repo}/issues/{pull['number']}/labels",
+                payload={"labels": labels},
+            )
+        return pull["html_url"]
+
+    def fetch_issues(self, repo: str, since: str | None = None) -> list[dict]:
+        """Every issue and PR (all states) updated at or after `since`."""
+        params = {"state": "all", "sort": "updated", "direction": "asc"}
+        if since:
+            params["since"] = since
+        return self.paginate(f"repos/{repo}/issues", params)
+
+    def list_issues(
+        self,
+        repo: str,
+        *,
+        state: str = "open",
+        labels: list[str] | None = None,
+        search: str | None = None,
+    ) -> list[dict]:
+        """Issues in the shape `gh issue list --json number,title,body,url` uses.
+
+        The REST listing has no full-text filter, so `search` is matched as a
+        case-insensitive substring of the title or body.
+        """
+        params = {"state": state}
+        if labels:
+            params["labels"] = ",".join(labels)
+        issues = [
+            {
+                "number": issue["number"],
+                "title": issue["title"],
+                "body": issue.get("body") or "",
+                "url": issue["html_url"],
+            }
+            for issue in self.paginate(f"repos/{repo}/issues", params)
+            if "pull_request" not in issue
+        ]
+        if search:
+            needle = search.lower()
+            issues = [
+                issue
+                for issue in issues
+                if needle in issue["title"].lower() or needle in issue["body"].lower()
+            ]
+        return issues
@@ -0,0 +1,156 @@
+"""Test impact analysis for the LAZY-DEV-FRAMEWORK test runner.
+
+A full pytest run with `--cov-context=test` tells coverage which test executed
+which lines. This module turns that data into a file -> tests index stored in
+`.lazy_cache/test_impact/index.json`, together with the content hash of every
+file it knows about. Later runs compare hashes against the index and only run
+the tests that covered a changed file, plus any changed test files. Whenever
+the index cannot answer safely (missing, built for another target, new source
+files, changed files no test reached) the caller falls back to the full suite.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Final
+
+from result_cache import iter_python_files
+
+INDEX_FILE: Final[Path] = Path(".lazy_cache") / "test_impact" / "index.json"
+COVERAGE_DATA_FILE: Final[Path] = Path(".coverage")
+CONTEXT_ARGS: Final[tuple[str, ...]] = ("--cov-context=test",)
+INDEX_VERSION: Final[int] = 1
+MAX_NODE_ARGS: Final[int] = 500
+# pytest's default `python_files`; anything else under the target is support code.
+TEST_MODULE_PATTERNS: Final[tuple[str, ...]] = ("test_*.py", "*_test.py")
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def normalise(path: str) -> str:
+    resolved = Path(path).resolve()
+    try:
+        return resolved.relative_to(Path.cwd().resolve()).as_posix()
+    except ValueError:
+        return resolved.as_posix()
+
+
+def is_test_module(path: Path) -> bool:
+    return any(fnmatch.fnmatch(path.name, pattern) for pattern in TEST_MODULE_PATTERNS)
+
+
+def node_id_from_context(context: str) -> str:
+    """`tests/test_x.py::test_y|run` -> `tests/test_x.py::test_y`."""
+    return context.split("|", 1)[0]
+
+
+def build_index(target: str, data_file: Path = COVERAGE_DATA_FILE) -> dict | None:
+    """Read per-test contexts from coverage data into a file -> tests index."""
+    try:
+        from coverage import CoverageData
+    except ImportError:
+        return None
+    if not data_file.exists():
+        return None
+
+    data = CoverageData(basename=str(data_file))
+    data.read()
+
+    files: dict[str, dict] = {}
+    all_tests: set[str] = set()
+    for measured in data.measured_files():
+        path = Path(measured)
+        if not path.exists():
+            continue
+        tests: set[str] = set()
+        for contexts in data.contexts_by_lineno(measured).values():
+            tests.update(node_id_from_context(ctx) for ctx in contexts if ctx)
+        all_tests.update(tests)
+        files[normalise(measured)] = {"hash": file_hash(path), "tests": sorted(tests)}
+
+    test_files = {
+        normalise(str(path)): file_hash(path)
+        for path in iter_python_files([Path(target)])
+    }
+    return {
+        "version": INDEX_VERSION,
+        "target": target,
+        "files": files,
+        "test_files": test_files,
+        "tests": sorted(all_tests),
+    }
+
+
+def save_index(index: dict, index_file: Path = INDEX_FILE) -> None:
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=index_file.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(index, handle)
+    os.replace(tmp_name, index_file)
+
+
+def load_index(index_file: Path = INDEX_FILE) -> dict | None:
+    try:
+        index = json.loads(index_file.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+    if index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def select_tests(
+    target: str, source_root: Path, index_file: Path = INDEX_FILE
+) -> list[str] | None:
+    """Tests affected by changes since the index was built.
+
+    Returns None when the full suite must run, otherwise the (possibly empty)
+    list of pytest node ids or test files to run.
+    """
+    index = load_index(index_file)
+    if index is None or index.get("target") != target:
+        return None
+
+    known = index["files"]
+    test_files = index["test_files"]
+    selected: set[str] = set()
+
+    for path, entry in known.items():
+        current = Path(path)
+        if current.exists() and file_hash(current) == entry["hash"]:
+            continue
+        if not entry["tests"] and path not in test_files:
+            # A changed file that only ran at import time: no safe answer.
+            return None
+        selected.update(entry["tests"])
+
+    for path in iter_python_files([Path(target)]):
+        name = normalise(str(path))
+        if test_files.get(name) == file_hash(path):
+            continue
+        if not is_test_module(path):
+            # conftest.py or a shared helper: any test might depend on it.
+            return None
+        selected.add(name)
+
+    if source_root.exists():
+        for path in iter_python_files([source_root]):
+            if normalise(str(path)) not in known:
+                # New source file: any test might import it.
+                return None
+
+    return collapse_selection(sorted(selected))
+
+
+def collapse_selection(node_ids: list[str]) -> list[str]:
+    """Fall back to whole test files when the node id list gets too long."""
+    if len(node_ids) <= MAX_NODE_ARGS:
+        return node_ids
+    return sorted({node_id.split("::", 1)[0] for node_id in node_ids})
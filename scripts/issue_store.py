@@ -0,0 +1,192 @@
+"""Local SQLite issue store backing `gh_wrapper.list_issues --cached`.
+
+The first sync of a repository pulls every issue page by page; later syncs
+only ask GitHub for issues updated since the newest `updated_at` already
+stored, so agents polling for work hit a local database instead of the API.
+Queries by state, label and text are answered from `.lazy_cache/issues.sqlite3`.
+
+Issues that are deleted or transferred away are not reported by incremental
+syncs; `IssueStore.sync(..., full=True)` rebuilds a repository from scratch.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Final, Self
+
+STORE_FILE: Final[Path] = Path(".lazy_cache") / "issues.sqlite3"
+DEFAULT_MAX_AGE_SECONDS: Final[float] = 60.0
+
+# fetch(repo, since) -> REST issue objects updated at or after `since`
+# (every issue when `since` is None), across all pages.
+FetchIssues = Callable[[str, str | None], Iterable[dict]]
+
+SCHEMA: Final[str] = """
+CREATE TABLE IF NOT EXISTS issues (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    state TEXT NOT NULL,
+    url TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (repo, number)
+);
+CREATE TABLE IF NOT EXISTS issue_labels (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    PRIMARY KEY (repo, number, label)
+);
+CREATE INDEX IF NOT EXISTS issue_labels_by_label ON issue_labels (repo, label);
+CREATE TABLE IF NOT EXISTS sync_state (
+    repo TEXT PRIMARY KEY,
+    last_updated_at TEXT,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+def label_names(issue: dict) -> list[str]:
+    return [
+        label["name"] if isinstance(label, dict) else str(label)
+        for label in issue.get("labels", [])
+    ]
+
+
+class IssueStore:
+    """Issues of any number of repositories, kept in one SQLite file."""
+
+    def __init__(self, path: Path = STORE_FILE) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def sync_age(self, repo: str) -> float | None:
+        """Seconds since the repository was last synced, None if never."""
+        row = self.connection.execute(
+            "SELECT synced_at FROM sync_state WHERE repo = ?", (repo,)
+        ).fetchone()
+        return None if row is None else time.time() - row["synced_at"]
+
+    def sync(self, repo: str, fetch: FetchIssues, *, full: bool = False) -> int:
+        """Pull new and updated issues; return how many records were written."""
+        row = self.connection.execute(
+            "SELECT last_updated_at FROM sync_state WHERE repo = ?", (repo,)
+        ).fetchone()
+        since = None if full or row is None else row["last_updated_at"]
+        issues = [issue for issue in fetch(repo, since) if "pull_request" not in issue]
+
+        newest = since
+        with self.connection:
+            if since is None:
+                self.connection.execute("DELETE FROM issues WHERE repo = ?", (repo,))
+                self.connection.execute(
+                    "DELETE FROM issue_labels WHERE repo = ?", (repo,)
+                )
+            for issue in issues:
+                self._upsert(repo, issue)
+                if newest is None or issue["updated_at"] > newest:
+                    newest = issue["updated_at"]
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (repo, newest, time.time()),
+            )
+        return len(issues)
+
+    def _upsert(self, repo: str, issue: dict) -> None:
+        number = issue["number"]
+        self.connection.execute(
+            "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                repo,
+                number,
+                issue["title"],
+                issue.get("body") or "",
+                issue["state"].lower(),
+                issue.get("html_url") or issue.get("url", ""),
+                issue["updated_at"],
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM issue_labels WHERE repo = ? AND number = ?", (repo, number)
+        )
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO issue_labels VALUES (?, ?, ?)",
+            [(repo, number, name) for name in label_names(issue)],
+        )
+
+    def query(
+        self,
+        repo: str,
+        *,
+        state: str = "open",
+        labels: Iterable[str] = (),
+        text: str | None = None,
+    ) -> list[dict]:
+        """Issues matching state ("open", "closed" or "all"), every label and text."""
+        clauses = ["repo = ?"]
+        params: list[object] = [repo]
+        if state != "all":
+            clauses.append("state = ?")
+            params.append(state)
+        for label in labels:
+            clauses.append(
+                "number IN (SELECT number FROM issue_labels "
+                "WHERE repo = issues.repo AND label = ?)"
+            )
+            params.append(label)
+        if text:
+            clauses.append("(title LIKE ? OR body LIKE ?)")
+            params.extend([f"%{text}%"] * 2)
+
+        rows = self.connection.execute(
+            f"SELECT * FROM issues WHERE {' AND '.join(clauses)} ORDER BY number DESC",
+            params,
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def _to_dict(self, row: sqlite3.Row) -> dict:
+        labels = self.connection.execute(
+            "SELECT label FROM issue_labels WHERE repo = ? AND number = ? "
+            "ORDER BY label",
+            (row["repo"], row["number"]),
+        ).fetchall()
+        return {
+            "number": row["number"],
+            "title": row["title"],
+            "body": row["body"],
+            "url": row["url"],
+            "state": row["state"],
+            "labels": [label["label"] for label in labels],
+            "updatedAt": row["updated_at"],
+        }
+
+
+def decode_pages(output: str) -> list[dict]:
+    """`gh api --paginate` prints one JSON array per page back to back."""
+    decoder = json.JSONDecoder()
+    items: list[dict] = []
+    position = 0
+    output = output.strip()
+    while position < len(output):
+        page, position = decoder.raw_decode(output, position)
+        items.extend(page)
+        while position < len(output) and output[position].isspace():
+            position += 1
+    return items
@@ -5,15 +5,44 @@ from __future__ import annotations
 
 import argparse
 import json
-import subprocess
 import sys
 import time
+from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Final, Optional
+from typing import Final
 
+from changed_files import (
+    GitError,
+    add_changed_arguments,
+    describe_targets,
+    resolve_targets,
+)
+from lint_baseline import (
+    DEFAULT_BASELINE_FILE,
+    BaselineFilter,
+    LintBaseline,
+    format_violation,
+)
+from result_cache import ResultCache, compute_key, tool_fingerprint
+from session_log import append_entry
+from stream_runner import (
+    ResourceUsage,
+    full_output,
+    run_streaming,
+    spill_dir_for,
+    step_timeout,
+)
+from tracing import configure as configure_tracing
+from tracing import span, traced
 
-LOG_FILE_NAME: Final[str] = "lint.json"
+LOG_FILE_NAME: Final[str] = "lint.jsonl"
+RUFF_ARGS: Final[tuple[str, ...]] = ("--fix", "--output-format=json")
+# One violation per line, so baseline runs can filter while ruff streams.
+RUFF_BASELINE_ARGS: Final[tuple[str, ...]] = ("--fix", "--output-format=json-lines")
+CACHEABLE_EXIT_CODES: Final[frozenset[int]] = frozenset({0, 1})
+# Override with LAZY_TIMEOUT_RUFF (seconds, 0 disables).
+RUFF_TIMEOUT_SECONDS: Final[float] = 300.0
 
 
 @dataclass
@@ -22,6 +51,11 @@ class LintResult:
     duration_seconds: float
     stdout: str
     stderr: str
+    stdout_path: str | None = None
+    stderr_path: str | None = None
+    cached: bool = False
+    slot_wait_seconds: float = 0.0
+    resources: ResourceUsage | None = None
 
     def as_dict(self) -> dict:
         return {
@@ -29,100 +63,406 @@ class LintResult:
             "exit_code": self.exit_code,
             "stdout": self.stdout,
             "stderr": self.stderr,
+            "stdout_path": self.stdout_path,
+            "stderr_path": self.stderr_path,
+            "cached": self.cached,
+            "slot_wait_seconds": self.slot_wait_seconds,
+            "resources": self.resources.as_dict() if self.resources else None,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> LintResult:
+        return cls(
+            exit_code=data["exit_code"],
+            duration_seconds=data["duration_seconds"],
+            stdout=data["stdout"],
+            stderr=data["stderr"],
+            stdout_path=data.get("stdout_path"),
+            stderr_path=data.get("stderr_path"),
+        )
 
-def run_ruff_check(target: Path) -> LintResult:
-    start = time.perf_counter()
-    result = subprocess.run(
-        ["ruff", "check", str(target), "--fix", "--output-format=json"],
-        capture_output=True,
-        text=True,
+
+def ruff_args(*, streaming: bool = False, fix: bool = True) -> tuple[str, ...]:
+    args = RUFF_BASELINE_ARGS if streaming else RUFF_ARGS
+    return args if fix else tuple(arg for arg in args if arg != "--fix")
+
+
+def run_ruff_check(
+    targets: Sequence[Path],
+    spill_dir: Path | None = None,
+    *,
+    baseline_filter: BaselineFilter | None = None,
+    fix: bool = True,
+) -> LintResult:
+    # Ruff's JSON is re-printed as parsed violations, so it is not echoed live.
+    # With a baseline filter, stdout is consumed line by line and not kept.
+    args = ruff_args(streaming=baseline_filter is not None, fix=fix)
+    result = run_streaming(
+        ["ruff", "check", *(str(target) for target in targets), *args],
+        name="ruff",
+        echo=False,
+        on_stdout_line=baseline_filter,
+        spill_dir=spill_dir,
+        capture_stdout=baseline_filter is None,
+        slots=1,
+        timeout=step_timeout("ruff", RUFF_TIMEOUT_SECONDS),
     )
-    duration = time.perf_counter() - start
     return LintResult(
         exit_code=result.returncode,
-        duration_seconds=duration,
-        stdout=result.stdout,
-        stderr=result.stderr,
+        duration_seconds=result.duration_seconds,
+        stdout=result.stdout.text,
+        stderr=result.stderr.text,
+        stdout_path=result.stdout.log_path,
+        stderr_path=result.stderr.log_path,
+        slot_wait_seconds=result.slot_wait_seconds,
+        resources=result.resources,
     )
 
 
+@traced()
+def parse_violations(stdout: str) -> list | None:
+    if not stdout:
+        return None
+    try:
+        return json.loads(stdout)
+    except json.JSONDecodeError:
+        return None
+
+
+def run_ruff_check_cached(
+    targets: Sequence[Path],
+    cache: ResultCache | None,
+    spill_dir: Path | None = None,
+    fix: bool = True,
+) -> tuple[LintResult, list | None]:
+    """Replay a stored result when the files, config and ruff are unchanged."""
+    if cache is None:
+        result = run_ruff_check(targets, spill_dir, fix=fix)
+        return result, parse_violations(full_output(result.stdout, result.stdout_path))
+
+    start = time.perf_counter()
+    args = ruff_args(fix=fix)
+    with span("cache_lookup"):
+        tool = tool_fingerprint("ruff", "ruff")
+        cached = cache.get(compute_key(tool, args, targets))
+    if cached is not None:
+        result = LintResult.from_dict(cached["result"])
+        result.cached = True
+        result.duration_seconds = time.perf_counter() - start
+        return result, cached["violations"]
+
+    result = run_ruff_check(targets, spill_dir, fix=fix)
+    violations = parse_violations(full_output(result.stdout, result.stdout_path))
+    if result.exit_code in CACHEABLE_EXIT_CODES:
+        # --fix may have rewritten files, so key on the post-run contents.
+        cache.put(
+            compute_key(tool, args, targets),
+            {"result": result.as_dict(), "violations": violations},
+        )
+    return result, violations
+
+
+def run_ruff_check_baseline(
+    targets: Sequence[Path],
+    baseline: LintBaseline,
+    cache: ResultCache | None,
+    spill_dir: Path | None = None,
+    fix: bool = True,
+) -> tuple[LintResult, list, dict]:
+    """Run ruff and keep only violations missing from the baseline.
+
+    Returns the result, the new violations and counts of known, new and fixed
+    violations. A run with nothing new exits 0 even if ruff reported known ones.
+    """
+    start = time.perf_counter()
+    if cache is not None:
+        with span("cache_lookup"):
+            tool = tool_fingerprint("ruff", "ruff")
+            baseline_args = (
+                *ruff_args(streaming=True, fix=fix),
+                f"baseline={baseline.digest()}",
+            )
+            cached = cache.get(compute_key(tool, baseline_args, targets))
+        if cached is not None:
+            result = LintResult.from_dict(cached["result"])
+            result.cached = True
+            result.duration_seconds = time.perf_counter() - start
+            return result, cached["violations"], cached["baseline"]
+
+    baseline_filter = BaselineFilter(baseline, targets)
+    result = run_ruff_check(
+        targets, spill_dir, baseline_filter=baseline_filter, fix=fix
+    )
+    stats = {
+        "known": baseline_filter.known,
+        "new": len(baseline_filter.new),
+        "fixed": baseline_filter.fixed(),
+    }
+    if result.exit_code in CACHEABLE_EXIT_CODES:
+        result.exit_code = 1 if baseline_filter.new else 0
+        if cache is not None:
+            # --fix may have rewritten files, so key on the post-run contents.
+            cache.put(
+                compute_key(tool, baseline_args, targets),
+                {
+                    "result": result.as_dict(),
+                    "violations": baseline_filter.new,
+                    "baseline": stats,
+                },
+            )
+    return result, baseline_filter.new, stats
+
+
+def update_baseline(
+    targets: Sequence[Path], baseline_file: Path, spill_dir: Path | None = None
+) -> tuple[LintResult, int]:
+    """Record every current violation of `targets` as known.
+
+    Entries of files outside `targets` are kept as they are. Returns the
+    result and the number of violations recorded for `targets`.
+    """
+    baseline_filter = BaselineFilter(LintBaseline(), targets)
+    result = run_ruff_check(
+        targets, spill_dir, baseline_filter=baseline_filter, fix=False
+    )
+    if result.exit_code in CACHEABLE_EXIT_CODES:
+        recorded = baseline_filter.as_baseline()
+        existing = LintBaseline.load(baseline_file) or LintBaseline()
+        existing.replace_scope(recorded, targets).save(baseline_file)
+        result.exit_code = 0
+        return result, recorded.total
+    return result, 0
+
+
+@traced()
 def write_log(
-    target: Path,
-    session_id: Optional[str],
+    targets: Sequence[Path],
+    session_id: str | None,
     lint_result: LintResult,
     violations: list | None,
+    baseline: dict | None = None,
 ) -> None:
     if not session_id:
         return
 
-    log_dir = Path("logs") / session_id
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / LOG_FILE_NAME
-
     entry = {
-        "path": str(target),
+        "path": describe_targets(targets),
         "session_id": session_id,
         "status": "success" if lint_result.exit_code == 0 else "failed",
         "result": lint_result.as_dict(),
     }
+    if len(targets) > 1:
+        entry["files"] = [str(target) for target in targets]
     if violations is not None:
         entry["violations"] = violations
+    if baseline is not None:
+        entry["baseline"] = baseline
 
-    existing: list[dict] = []
-    if log_file.exists():
-        try:
-            existing = json.loads(log_file.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            existing = []
+    append_entry(session_id, LOG_FILE_NAME, entry)
 
-    existing.append(entry)
-    log_file.write_text(json.dumps(existing, indent=2), encoding="utf-8")
 
+def lint_path(target: Path, session_id: str | None, *, use_cache: bool = True) -> int:
+    return lint_paths([target], session_id, use_cache=use_cache)
 
-def lint_path(target: Path, session_id: Optional[str]) -> int:
-    if not target.exists():
-        raise FileNotFoundError(f"Path does not exist: {target}")
 
-    print(f"🔍 Running Ruff check on {target}...")
-    lint_result = run_ruff_check(target)
+def lint_paths(
+    targets: Sequence[Path],
+    session_id: str | None,
+    *,
+    use_cache: bool = True,
+    baseline_file: Path | None = None,
+    update: bool = False,
+    scope: Sequence[Path] | None = None,
+    fix: bool = True,
+) -> int:
+    for target in targets:
+        if not target.exists():
+            raise FileNotFoundError(f"Path does not exist: {target}")
+    if baseline_file is not None:
+        return lint_paths_baseline(
+            targets,
+            session_id,
+            baseline_file,
+            use_cache=use_cache,
+            update=update,
+            scope=scope,
+            fix=fix,
+        )
+
+    print(f"🔍 Running Ruff check on {describe_targets(targets)}...")
+    cache = ResultCache() if use_cache else None
+    lint_result, violations = run_ruff_check_cached(
+        targets, cache, spill_dir_for(session_id), fix=fix
+    )
+    if lint_result.cached:
+        print("♻️  No changes since the last run, replaying cached result")
 
-    violations: list | None = None
-    if lint_result.stdout:
-        try:
-            violations = json.loads(lint_result.stdout)
-            if violations:
-                print(json.dumps(violations, indent=2))
-        except json.JSONDecodeError:
-            print(lint_result.stdout)
+    if violations:
+        print(json.dumps(violations, indent=2))
+    elif violations is None and lint_result.stdout:
+        print(lint_result.stdout)
 
     if lint_result.exit_code != 0:
         print("❌ Ruff check reported issues", file=sys.stderr)
-        write_log(target, session_id, lint_result, violations)
+        write_log(targets, session_id, lint_result, violations)
         return lint_result.exit_code
 
     print("✅ Linting complete")
-    write_log(target, session_id, lint_result, violations)
+    write_log(targets, session_id, lint_result, violations)
+    return 0
+
+
+def record_baseline(
+    targets: Sequence[Path], session_id: str | None, baseline_file: Path
+) -> int:
+    print(f"📌 Recording Ruff violations of {describe_targets(targets)}...")
+    lint_result, count = update_baseline(
+        targets, baseline_file, spill_dir_for(session_id)
+    )
+    if lint_result.exit_code != 0:
+        print("❌ Ruff check failed", file=sys.stderr)
+        if lint_result.stderr:
+            print(lint_result.stderr, file=sys.stderr)
+        write_log(targets, session_id, lint_result, None)
+        return lint_result.exit_code
+
+    print(f"✅ Baseline {baseline_file} records {count} known violation(s)")
+    stats = {"file": str(baseline_file), "known": count, "new": 0, "fixed": 0}
+    write_log(targets, session_id, lint_result, None, stats)
+    return 0
+
+
+def lint_paths_baseline(
+    targets: Sequence[Path],
+    session_id: str | None,
+    baseline_file: Path,
+    *,
+    use_cache: bool = True,
+    update: bool = False,
+    scope: Sequence[Path] | None = None,
+    fix: bool = True,
+) -> int:
+    """Lint against a baseline, reporting and logging only new violations.
+
+    `scope` is the tree `targets` were picked from (with --changed); a missing
+    baseline is recorded for all of it rather than just for the changed files.
+    """
+    if update:
+        return record_baseline(targets, session_id, baseline_file)
+    baseline = LintBaseline.load(baseline_file)
+    if baseline is None:
+        print(f"📌 No baseline at {baseline_file} yet, creating it")
+        return record_baseline(scope or targets, session_id, baseline_file)
+
+    print(
+        f"🔍 Running Ruff check on {describe_targets(targets)} "
+        f"against {baseline_file}..."
+    )
+    cache = ResultCache() if use_cache else None
+    lint_result, violations, stats = run_ruff_check_baseline(
+        targets, baseline, cache, spill_dir_for(session_id), fix=fix
+    )
+    stats = {"file": str(baseline_file), **stats}
+    if lint_result.cached:
+        print("♻️  No changes since the last run, replaying cached result")
+
+    for violation in violations:
+        print(format_violation(violation))
+    summary = (
+        f"{stats['new']} new, {stats['known']} known, "
+        f"{stats['fixed']} fixed since the baseline"
+    )
+    if stats["fixed"]:
+        print("💡 Run with --update-baseline to drop fixed violations from it")
+
+    if lint_result.exit_code != 0:
+        if violations:
+            print(f"❌ Ruff found new violations ({summary})", file=sys.stderr)
+        else:
+            print("❌ Ruff check failed", file=sys.stderr)
+            if lint_result.stderr:
+                print(lint_result.stderr, file=sys.stderr)
+        write_log(targets, session_id, lint_result, violations, stats)
+        return lint_result.exit_code
+
+    print(f"✅ Linting complete ({summary})")
+    write_log(targets, session_id, lint_result, violations, stats)
     return 0
 
 
 def parse_args(argv: list[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run Ruff lint checks.")
-    parser.add_argument("path", help="File or directory to lint")
+    parser.add_argument(
+        "path",
+        nargs="?",
+        help="File or directory to lint (scopes --changed when both are given)",
+    )
     parser.add_argument(
         "--session",
         dest="session_id",
         help="Optional session identifier for logging",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Always run ruff instead of replaying a cached result",
+    )
+    parser.add_argument(
+        "--no-fix",
+        dest="fix",
+        action="store_false",
+        help="Report violations without letting ruff rewrite files",
+    )
+    parser.add_argument(
+        "--baseline",
+        nargs="?",
+        type=Path,
+        const=DEFAULT_BASELINE_FILE,
+        metavar="FILE",
+        help=(
+            "Only report violations missing from a baseline of known ones "
+            f"(default file: {DEFAULT_BASELINE_FILE}; created on first use)"
+        ),
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Record every current violation in the baseline and exit",
+    )
+    add_changed_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.path is None and not (args.changed or args.since):
+        parser.error("a path is required unless --changed is given")
+    return args
 
 
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
-    target = Path(args.path)
+    configure_tracing(args.session_id, "lint.py")
     try:
-        return lint_path(target, args.session_id)
+        targets = resolve_targets(args.path, args.changed, args.since)
+        if not targets:
+            print("✅ No changed Python files to lint")
+            return 0
+        baseline_file = args.baseline
+        if args.update_baseline and baseline_file is None:
+            baseline_file = DEFAULT_BASELINE_FILE
+        scope = None
+        if args.changed or args.since:
+            scope = [Path(args.path or ".")]
+        return lint_paths(
+            targets,
+            args.session_id,
+            use_cache=args.use_cache,
+            baseline_file=baseline_file,
+            update=args.update_baseline,
+            scope=scope,
+            fix=args.fix,
+        )
+    except GitError as exc:
+        print(f"❌ {exc}", file=sys.stderr)
+        return 1
     except FileNotFoundError as exc:
         print(f"❌ {exc}", file=sys.stderr)
         return 1
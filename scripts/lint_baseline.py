@@ -0,0 +1,194 @@
+"""Baseline of known Ruff violations for `lint.py --baseline`.
+
+Legacy code can carry thousands of violations nobody is going to fix in the
+current change. A baseline records a fingerprint per known violation: a hash
+of the rule code, the file and the whitespace-normalised source it points at.
+Line numbers are left out, so code moving around does not turn old violations
+into new ones. Fingerprints are counted, so adding a second copy of an
+already-known violation still counts as new.
+
+Fingerprints are grouped by file, so a run over part of the tree only
+reports fixed violations of the files it scanned, and re-recording it
+replaces those files' entries while keeping everybody else's.
+
+Ruff's JSON Lines output is parsed one line at a time as it streams in and
+only violations missing from the baseline are kept, so memory, console output
+and log size follow the size of the change, not of the codebase.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Final
+
+from impact_analysis import normalise
+
+DEFAULT_BASELINE_FILE: Final[Path] = Path(".lint-baseline.json")
+BASELINE_VERSION: Final[int] = 2
+FINGERPRINT_CHARS: Final[int] = 16
+# Violations spanning more lines are fingerprinted by their first lines only.
+MAX_SNIPPET_LINES: Final[int] = 5
+
+
+def snippet(lines: list[str], start: int, end: int) -> str:
+    """Source lines `start`..`end` (1-based) with all whitespace collapsed."""
+    end = min(end, start + MAX_SNIPPET_LINES - 1)
+    return " ".join(" ".join(lines[start - 1 : end]).split())
+
+
+def fingerprint(code: str, path: str, text: str) -> str:
+    digest = hashlib.sha256(f"{code}\0{path}\0{text}".encode())
+    return digest.hexdigest()[:FINGERPRINT_CHARS]
+
+
+def in_scope(path: str, scopes: Sequence[Path]) -> bool:
+    """Whether a baselined file lies inside one of the scanned targets."""
+    resolved = Path(path).resolve()
+    return any(
+        resolved == scope or scope in resolved.parents
+        for scope in (target.resolve() for target in scopes)
+    )
+
+
+class LintBaseline:
+    """Known violation fingerprint counts per file, stored as compact JSON."""
+
+    def __init__(self, files: dict[str, dict[str, int]] | None = None) -> None:
+        self.files: dict[str, dict[str, int]] = {
+            path: dict(counts) for path, counts in (files or {}).items() if counts
+        }
+
+    @classmethod
+    def load(cls, path: Path) -> LintBaseline | None:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("version") != BASELINE_VERSION:
+            return None
+        return cls(data.get("files", {}))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": BASELINE_VERSION,
+            "files": {
+                name: dict(sorted(counts.items()))
+                for name, counts in sorted(self.files.items())
+            },
+        }
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            # One fingerprint per line keeps baseline updates reviewable.
+            json.dump(data, handle, indent=0, separators=(",", ":"))
+            handle.write("\n")
+        os.replace(tmp_name, path)
+
+    @property
+    def total(self) -> int:
+        return sum(sum(counts.values()) for counts in self.files.values())
+
+    def count(self, path: str, key: str) -> int:
+        return self.files.get(path, {}).get(key, 0)
+
+    def replace_scope(
+        self, recorded: LintBaseline, scopes: Sequence[Path]
+    ) -> LintBaseline:
+        """This baseline with the files inside `scopes` taken from `recorded`."""
+        kept = {
+            path: counts
+            for path, counts in self.files.items()
+            if not in_scope(path, scopes)
+        }
+        return LintBaseline({**kept, **recorded.files})
+
+    def digest(self) -> str:
+        encoded = json.dumps(self.files, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+
+class BaselineFilter:
+    """`run_streaming` line callback that keeps only violations not baselined.
+
+    `targets` are the paths ruff was asked to check; only baselined files
+    inside them can count as fixed.
+    """
+
+    def __init__(self, baseline: LintBaseline, targets: Sequence[Path]) -> None:
+        self.baseline = baseline
+        self.targets = list(targets)
+        self.seen: Counter[tuple[str, str]] = Counter()
+        self.new: list[dict] = []
+        self.unparsed = 0
+        self._source_path: str | None = None
+        self._source_lines: list[str] = []
+
+    def _lines(self, filename: str) -> list[str]:
+        # Ruff reports violations grouped by file, so one file is enough.
+        if filename != self._source_path:
+            self._source_path = filename
+            try:
+                text = Path(filename).read_text(encoding="utf-8", errors="replace")
+                self._source_lines = text.splitlines()
+            except OSError:
+                self._source_lines = []
+        return self._source_lines
+
+    def __call__(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            violation = json.loads(line)
+        except json.JSONDecodeError:
+            self.unparsed += 1
+            return
+        filename = violation.get("filename") or ""
+        path = normalise(filename) if filename else ""
+        start = (violation.get("location") or {}).get("row") or 1
+        end = (violation.get("end_location") or {}).get("row") or start
+        key = fingerprint(
+            violation.get("code") or violation.get("name") or "",
+            path,
+            snippet(self._lines(filename), start, end) if filename else "",
+        )
+        self.seen[path, key] += 1
+        if self.seen[path, key] > self.baseline.count(path, key):
+            self.new.append(violation)
+
+    @property
+    def known(self) -> int:
+        return sum(self.seen.values()) - len(self.new)
+
+    def fixed(self) -> int:
+        """Baselined violations of the scanned files that no longer occur."""
+        return sum(
+            max(0, count - self.seen.get((path, key), 0))
+            for path, counts in self.baseline.files.items()
+            if in_scope(path, self.targets)
+            for key, count in counts.items()
+        )
+
+    def as_baseline(self) -> LintBaseline:
+        files: dict[str, dict[str, int]] = {}
+        for (path, key), count in self.seen.items():
+            files.setdefault(path, {})[key] = count
+        return LintBaseline(files)
+
+
+def format_violation(violation: dict) -> str:
+    """`path:row:col: CODE message`, the way Ruff's concise output reads."""
+    location = violation.get("location") or {}
+    filename = violation.get("filename") or "?"
+    return (
+        f"{normalise(filename) if filename != '?' else filename}:"
+        f"{location.get('row', 0)}:{location.get('column', 0)}: "
+        f"{violation.get('code') or violation.get('name')} "
+        f"{violation.get('message', '')}"
+    )
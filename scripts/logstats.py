@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""Duration and failure statistics across LAZY-DEV-FRAMEWORK session logs.
+
+Every run of a quality script appends a record to
+`logs/<session_id>/<tool>.jsonl`. This script ingests those records into a
+SQLite index (`.lazy_cache/logstats.sqlite3`) and reports, per tool, the
+p50/p95/max run duration and failure rate, the slowest sessions, and the tools
+whose recent runs got slower than in a trailing baseline window. Runs answered
+from a result cache are counted separately and kept out of the durations, so
+a rising or falling hit rate does not read as a speed change.
+
+Ingestion is incremental: a log whose mtime and size are unchanged is skipped,
+and because logs are append-only, a grown JSON Lines file is read from the
+byte offset where the previous ingest stopped. A file that shrank or was
+rewritten, and legacy `<tool>.json` arrays, are re-ingested in full.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sqlite3
+import sys
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Final, Self
+
+from session_log import LOG_ROOT
+
+STORE_FILE: Final[Path] = Path(".lazy_cache") / "logstats.sqlite3"
+# Logs that hold spans or exports rather than one record per tool run.
+IGNORED_LOG_FILES: Final[frozenset[str]] = frozenset({"trace.jsonl", "trace.json"})
+DEFAULT_TOP: Final[int] = 10
+DEFAULT_WINDOW_DAYS: Final[float] = 7.0
+DEFAULT_BASELINE_DAYS: Final[float] = 28.0
+DEFAULT_THRESHOLD: Final[float] = 0.2
+# A tool needs this many runs in both windows before it can be called regressed.
+MIN_REGRESSION_SAMPLES: Final[int] = 5
+SECONDS_PER_DAY: Final[float] = 86400.0
+
+SCHEMA: Final[str] = """
+CREATE TABLE IF NOT EXISTS log_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration_seconds REAL,
+    failed INTEGER NOT NULL,
+    cached INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_path ON runs (path);
+CREATE INDEX IF NOT EXISTS runs_by_tool ON runs (tool, started_at);
+CREATE INDEX IF NOT EXISTS runs_by_session ON runs (session_id);
+"""
+
+
+@dataclass
+class ToolStats:
+    tool: str
+    runs: int
+    failures: int
+    cached_runs: int
+    p50_seconds: float | None
+    p95_seconds: float | None
+    max_seconds: float | None
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.runs if self.runs else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "tool": self.tool,
+            "runs": self.runs,
+            "failures": self.failures,
+            "failure_rate": round(self.failure_rate, 4),
+            "cached_runs": self.cached_runs,
+            "p50_seconds": self.p50_seconds,
+            "p95_seconds": self.p95_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+
+@dataclass
+class Regression:
+    tool: str
+    baseline_p50_seconds: float
+    recent_p50_seconds: float
+    baseline_runs: int
+    recent_runs: int
+
+    @property
+    def ratio(self) -> float:
+        return self.recent_p50_seconds / self.baseline_p50_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "tool": self.tool,
+            "baseline_p50_seconds": self.baseline_p50_seconds,
+            "recent_p50_seconds": self.recent_p50_seconds,
+            "baseline_runs": self.baseline_runs,
+            "recent_runs": self.recent_runs,
+            "ratio": round(self.ratio, 3),
+        }
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_duration(entry: dict) -> float | None:
+    """Wall time of one logged run, whichever shape the tool logs it in."""
+    if isinstance(entry.get("duration_seconds"), (int, float)):
+        return float(entry["duration_seconds"])
+    result = entry.get("result")
+    if isinstance(result, dict) and isinstance(
+        result.get("duration_seconds"), (int, float)
+    ):
+        return float(result["duration_seconds"])
+    steps = [
+        step["duration_seconds"]
+        for step in entry.get("steps") or []
+        if isinstance(step, dict)
+        and isinstance(step.get("duration_seconds"), (int, float))
+    ]
+    return float(sum(steps)) if steps else None
+
+
+def run_timestamp(entry: dict, fallback: float) -> float:
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return fallback
+
+
+def read_json_lines(path: Path, offset: int) -> tuple[list[dict], int]:
+    """Records after `offset` and the offset just past the last complete line."""
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        data = handle.read()
+    # A line still being appended has no newline yet; pick it up next time.
+    complete = data[: data.rfind(b"\n") + 1]
+    entries = []
+    for line in complete.splitlines():
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(entry, dict):
+            entries.append(entry)
+    return entries, offset + len(complete)
+
+
+def read_json_array(path: Path) -> list[dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return []
+    return [entry for entry in data if isinstance(entry, dict)] if data else []
+
+
+def discover_logs(root: Path) -> Iterator[Path]:
+    for pattern in ("*/*.jsonl", "*/*.json"):
+        for path in sorted(root.glob(pattern)):
+            if path.name not in IGNORED_LOG_FILES and path.is_file():
+                yield path
+
+
+class LogStatsStore:
+    """Tool runs of every session under a log root, indexed in SQLite."""
+
+    def __init__(self, path: Path = STORE_FILE) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def ingest(self, root: Path = LOG_ROOT, *, rebuild: bool = False) -> int:
+        """Index new records from the logs under `root`; return how many."""
+        with self.connection:
+            if rebuild:
+                self.connection.execute("DELETE FROM runs")
+                self.connection.execute("DELETE FROM log_files")
+            seen: set[str] = set()
+            added = 0
+            for path in discover_logs(root):
+                seen.add(str(path))
+                added += self._ingest_file(path)
+            known = self.connection.execute("SELECT path FROM log_files").fetchall()
+            for row in known:
+                path = Path(row["path"])
+                if row["path"] not in seen and path.parent.parent == root:
+                    self._forget(row["path"])
+        return added
+
+    def _forget(self, key: str) -> None:
+        self.connection.execute("DELETE FROM runs WHERE path = ?", (key,))
+        self.connection.execute("DELETE FROM log_files WHERE path = ?", (key,))
+
+    def _ingest_file(self, path: Path) -> int:
+        key = str(path)
+        stat = path.stat()
+        row = self.connection.execute(
+            "SELECT mtime_ns, size, offset FROM log_files WHERE path = ?", (key,)
+        ).fetchone()
+        if row is not None and (row["mtime_ns"], row["size"]) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return 0
+
+        appendable = path.suffix == ".jsonl"
+        if row is not None and appendable and stat.st_size >= row["offset"]:
+            offset = row["offset"]
+        else:
+            self._forget(key)
+            offset = 0
+        if appendable:
+            entries, offset = read_json_lines(path, offset)
+        else:
+            entries, offset = read_json_array(path), stat.st_size
+
+        self._insert_runs(key, path.parent.name, path.stem, entries, stat.st_mtime)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO log_files VALUES (?, ?, ?, ?)",
+            (key, stat.st_mtime_ns, stat.st_size, offset),
+        )
+        return len(entries)
+
+    def _insert_runs(
+        self,
+        key: str,
+        session_id: str,
+        tool: str,
+        entries: Iterable[dict],
+        fallback_time: float,
+    ) -> None:
+        self.connection.executemany(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    key,
+                    session_id,
+                    tool,
+                    run_timestamp(entry, fallback_time),
+                    run_duration(entry),
+                    int(entry.get("status") == "failed"),
+                    int(bool((entry.get("result") or {}).get("cached"))),
+                )
+                for entry in entries
+            ],
+        )
+
+    def _durations(
+        self, tool: str, start: float, end: float | None = None
+    ) -> list[float]:
+        """Ascending durations of a tool's uncached runs started in [start, end)."""
+        rows = self.connection.execute(
+            "SELECT duration_seconds FROM runs WHERE tool = ? AND started_at >= ? "
+            "AND (? IS NULL OR started_at < ?) AND duration_seconds IS NOT NULL "
+            "AND cached = 0 ORDER BY duration_seconds",
+            (tool, start, end, end),
+        ).fetchall()
+        return [row["duration_seconds"] for row in rows]
+
+    def tools(self) -> list[str]:
+        rows = self.connection.execute(
+            "SELECT DISTINCT tool FROM runs ORDER BY tool"
+        ).fetchall()
+        return [row["tool"] for row in rows]
+
+    def tool_stats(self, since: float = 0.0) -> list[ToolStats]:
+        stats = []
+        for tool in self.tools():
+            counts = self.connection.execute(
+                "SELECT COUNT(*) AS runs, COALESCE(SUM(failed), 0) AS failures, "
+                "COALESCE(SUM(cached), 0) AS cached_runs "
+                "FROM runs WHERE tool = ? AND started_at >= ?",
+                (tool, since),
+            ).fetchone()
+            if not counts["runs"]:
+                continue
+            durations = self._durations(tool, since)
+            stats.append(
+                ToolStats(
+                    tool=tool,
+                    runs=counts["runs"],
+                    failures=counts["failures"],
+                    cached_runs=counts["cached_runs"],
+                    p50_seconds=percentile(durations, 0.50),
+                    p95_seconds=percentile(durations, 0.95),
+                    max_seconds=durations[-1] if durations else None,
+                )
+            )
+        return stats
+
+    def slowest_sessions(
+        self, limit: int = DEFAULT_TOP, since: float = 0.0
+    ) -> list[dict]:
+        """Sessions by total logged tool time (pipeline reports excluded)."""
+        rows = self.connection.execute(
+            "SELECT session_id, COUNT(*) AS runs, SUM(failed) AS failures, "
+            "SUM(duration_seconds) AS total_seconds, MIN(started_at) AS first_run, "
+            "MAX(started_at) AS last_run FROM runs "
+            "WHERE tool != 'pipeline' AND started_at >= ? "
+            "GROUP BY session_id ORDER BY total_seconds DESC LIMIT ?",
+            (since, limit),
+        ).fetchall()
+        return [
+            {
+                "session_id": row["session_id"],
+                "runs": row["runs"],
+                "failures": row["failures"],
+                "total_seconds": row["total_seconds"] or 0.0,
+                "first_run": datetime.fromtimestamp(row["first_run"]).isoformat(),
+                "last_run": datetime.fromtimestamp(row["last_run"]).isoformat(),
+            }
+            for row in rows
+        ]
+
+    def regressions(
+        self,
+        *,
+        now: float | None = None,
+        window_days: float = DEFAULT_WINDOW_DAYS,
+        baseline_days: float = DEFAULT_BASELINE_DAYS,
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> list[Regression]:
+        """Tools whose recent uncached median exceeds the trailing window's."""
+        now = time.time() if now is None else now
+        window_start = now - window_days * SECONDS_PER_DAY
+        baseline_start = window_start - baseline_days * SECONDS_PER_DAY
+        found = []
+        for tool in self.tools():
+            baseline = self._durations(tool, baseline_start, window_start)
+            recent = self._durations(tool, window_start)
+            if min(len(baseline), len(recent)) < MIN_REGRESSION_SAMPLES:
+                continue
+            before = percentile(baseline, 0.50)
+            after = percentile(recent, 0.50)
+            if before and after and after > before * (1 + threshold):
+                found.append(
+                    Regression(tool, before, after, len(baseline), len(recent))
+                )
+        return sorted(found, key=lambda regression: -regression.ratio)
+
+
+def format_seconds(value: float | None) -> str:
+    return f"{value:.2f}" if value is not None else "n/a"
+
+
+def print_report(
+    stats: list[ToolStats], sessions: list[dict], regressions: list[Regression]
+) -> None:
+    print(
+        f"{'tool':<14}{'runs':>7}{'cached':>8}{'fail %':>8}"
+        f"{'p50 s':>9}{'p95 s':>9}{'max s':>9}"
+    )
+    for item in stats:
+        print(
+            f"{item.tool:<14}{item.runs:>7}{item.cached_runs:>8}"
+            f"{item.failure_rate * 100:>7.1f}%"
+            f"{format_seconds(item.p50_seconds):>9}"
+            f"{format_seconds(item.p95_seconds):>9}"
+            f"{format_seconds(item.max_seconds):>9}"
+        )
+
+    if sessions:
+        print("\n🐢 Slowest sessions:")
+        for session in sessions:
+            print(
+                f"  {session['session_id']:<30}{session['total_seconds']:>9.2f}s "
+                f"over {session['runs']} runs ({session['failures']} failed), "
+                f"last {session['last_run']}"
+            )
+
+    if regressions:
+        print("\n📈 Regressions against the trailing window:")
+        for regression in regressions:
+            print(
+                f"  ❌ {regression.tool}: p50 "
+                f"{regression.baseline_p50_seconds:.2f}s -> "
+                f"{regression.recent_p50_seconds:.2f}s "
+                f"({regression.ratio:.2f}x, {regression.recent_runs} recent runs)"
+            )
+    else:
+        print("\n✅ No regressions against the trailing window")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Report run durations, failure rates and regressions "
+        "across session logs."
+    )
+    parser.add_argument(
+        "--logs", type=Path, default=LOG_ROOT, help="Log root (default: logs)"
+    )
+    parser.add_argument(
+        "--since-days",
+        type=float,
+        help="Only report runs from the last N days (default: all)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=DEFAULT_TOP,
+        help=f"Slowest sessions to list (default: {DEFAULT_TOP})",
+    )
+    parser.add_argument(
+        "--window-days",
+        type=float,
+        default=DEFAULT_WINDOW_DAYS,
+        help=f"Recent window checked for regressions (default: {DEFAULT_WINDOW_DAYS})",
+    )
+    parser.add_argument(
+        "--baseline-days",
+        type=float,
+        default=DEFAULT_BASELINE_DAYS,
+        help="Trailing window before it used as the baseline "
+        f"(default: {DEFAULT_BASELINE_DAYS})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed relative p50 slowdown (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Drop the index and re-ingest all logs"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or sys.argv[1:])
+    if not args.logs.is_dir():
+        print(f"❌ Log directory not found: {args.logs}")
+        return 1
+
+    since = time.time() - args.since_days * SECONDS_PER_DAY if args.since_days else 0
+    with LogStatsStore() as store:
+        added = store.ingest(args.logs, rebuild=args.rebuild)
+        stats = store.tool_stats(since)
+        sessions = store.slowest_sessions(args.top, since)
+        regressions = store.regressions(
+            window_days=args.window_days,
+            baseline_days=args.baseline_days,
+            threshold=args.threshold,
+        )
+
+    if args.json:
+        report = {
+            "ingested": added,
+            "tools": [item.as_dict() for item in stats],
+            "slowest_sessions": sessions,
+            "regressions": [regression.as_dict() for regression in regressions],
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"📥 Ingested {added} new log records from {args.logs}")
+        print_report(stats, sessions, regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Shared, content-addressed mypy cache for parallel git worktrees.
+
+Every worktree has its own `.mypy_cache`, so a freshly created agent worktree
+re-checks the project and all of typeshed from scratch. This store sits next
+to the repository's common git directory (`<git-common-dir>/lazy-cache/mypy`,
+shared by all worktrees of a clone) and holds:
+
+- `objects/ab/cdef...`: cache files stored once by the SHA-256 of their bytes.
+  The cache format is treated as opaque (JSON meta/data files or SQLite
+  shards, depending on the mypy version), so unchanged files dedupe across
+  snapshots and worktrees.
+- `manifests/<key>/<id>.json`: snapshots mapping each relative cache path to
+  its object. The key covers the mypy build, Python version, platform, mypy
+  arguments and config contents, so only compatible caches are shared.
+
+A worktree without a local cache seeds it from the newest compatible snapshot;
+after each mypy run the local cache is published back. Mypy re-validates
+every module against its source hash, so a snapshot taken on another commit
+only costs re-checking the modules that differ. Publishing and eviction hold
+an exclusive lock; seeding reads without one and gives up on a snapshot whose
+objects were evicted underneath it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import Iterable
+from importlib import metadata
+from pathlib import Path
+from typing import Final
+
+from changed_files import GitError, run_git
+from result_cache import find_config_files
+from session_log import locked
+
+STORE_ENV: Final[str] = "LAZY_MYPY_SHARED_CACHE"
+MAX_BYTES_ENV: Final[str] = "LAZY_MYPY_SHARED_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES: Final[int] = 1024 * 1024 * 1024
+MAX_MANIFESTS: Final[int] = 16
+LOCAL_CACHE_DIR: Final[Path] = Path(os.environ.get("MYPY_CACHE_DIR", ".mypy_cache"))
+# Hash and size of each local cache file at the last publish, so unchanged
+# files are not re-read.
+PUBLISH_STATE_FILE: Final[Path] = Path(".lazy_cache") / "mypy_shared_state.json"
+# SQLite shared-memory files are rebuilt on open and never worth sharing.
+SKIPPED_SUFFIXES: Final[tuple[str, ...]] = ("-shm", ".tmp")
+CHUNK_SIZE: Final[int] = 1024 * 1024
+
+
+def store_key(args: Iterable[str], targets: Iterable[Path]) -> str:
+    """Identify caches that are interchangeable between worktrees.
+
+    Unlike the result cache key, config files are identified by name and
+    contents only, since each worktree lives under a different path.
+    """
+    digest = hashlib.sha256()
+    try:
+        digest.update(metadata.version("mypy").encode())
+    except metadata.PackageNotFoundError:
+        pass
+    digest.update(sys.version.encode())
+    digest.update(platform.platform().encode())
+    for arg in args:
+        digest.update(b"\0arg:" + arg.encode())
+    for config in find_config_files(targets):
+        digest.update(b"\0config:" + config.name.encode())
+        digest.update(hashlib.sha256(config.read_bytes()).digest())
+    return digest.hexdigest()[:32]
+
+
+def default_store_root() -> Path | None:
+    """`$LAZY_MYPY_SHARED_CACHE`, else next to the common git directory."""
+    configured = os.environ.get(STORE_ENV)
+    if configured is not None:
+        return Path(configured) if configured else None
+    try:
+        common_dir = run_git(["rev-parse", "--git-common-dir"])[0]
+    except (GitError, OSError, IndexError):
+        return None
+    return Path(common_dir).resolve() / "lazy-cache" / "mypy"
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_cache_files(cache_dir: Path) -> Iterable[Path]:
+    for root, _, files in os.walk(cache_dir):
+        for name in sorted(files):
+            if not name.endswith(SKIPPED_SUFFIXES):
+                yield Path(root) / name
+
+
+class SharedMypyCache:
+    """Content-addressed snapshots of `.mypy_cache` shared between worktrees."""
+
+    def __init__(self, root: Path, *, max_bytes: int | None = None) -> None:
+        self.root = root
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+
+    @property
+    def objects_dir(self) -> Path:
+        return self.root / "objects"
+
+    @property
+    def manifests_dir(self) -> Path:
+        return self.root / "manifests"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def _manifests(self, key: str | None = None) -> list[tuple[float, Path]]:
+        """Manifests (of one key, or all) with their mtimes, newest first."""
+        pattern = f"{key}/*.json" if key else "*/*.json"
+        found = []
+        for path in self.manifests_dir.glob(pattern):
+            try:
+                found.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        return sorted(found, reverse=True)
+
+    @staticmethod
+    def _read_manifest(path: Path) -> dict[str, str] | None:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["files"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            return None
+
+    def seed(self, key: str, cache_dir: Path = LOCAL_CACHE_DIR) -> int | None:
+        """Fill a missing or empty local cache; return how many files were copied."""
+        if cache_dir.is_dir() and any(cache_dir.iterdir()):
+            return None
+        for _, manifest_path in self._manifests(key):
+            files = self._read_manifest(manifest_path)
+            if not files:
+                continue
+            cache_dir.parent.mkdir(parents=True, exist_ok=True)
+            staging = Path(
+                tempfile.mkdtemp(dir=cache_dir.parent, prefix=f"{cache_dir.name}-")
+            )
+            try:
+                for relative, digest in files.items():
+                    target = staging / relative
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(self._object_path(digest), target)
+                if cache_dir.is_dir():
+                    cache_dir.rmdir()
+                staging.rename(cache_dir)
+            except OSError:
+                # Evicted while copying, or another run created the cache first.
+                shutil.rmtree(staging, ignore_errors=True)
+                if cache_dir.is_dir() and any(cache_dir.iterdir()):
+                    return None
+                continue
+            os.utime(manifest_path)
+            return len(files)
+        return None
+
+    def publish(self, key: str, cache_dir: Path = LOCAL_CACHE_DIR) -> bool:
+        """Snapshot the local cache into the store; False if nothing was new."""
+        if not cache_dir.is_dir():
+            return False
+        state = self._load_state()
+        files: dict[str, str] = {}
+        new_state: dict[str, list] = {}
+        for path in iter_cache_files(cache_dir):
+            relative = path.relative_to(cache_dir).as_posix()
+            try:
+                stat = path.stat()
+                recorded = state.get(relative)
+                signature = [stat.st_mtime_ns, stat.st_size]
+                if recorded and recorded[:2] == signature:
+                    digest = recorded[2]
+                else:
+                    digest = file_digest(path)
+            except OSError:
+                continue
+            files[relative] = digest
+            new_state[relative] = [*signature, digest]
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with (self.root / "lock").open("a") as lock_handle, locked(lock_handle):
+            newest = self._manifests(key)
+            if newest and self._read_manifest(newest[0][1]) == files:
+                os.utime(newest[0][1])
+                self._save_state(new_state)
+                return False
+            for relative, digest in list(files.items()):
+                stored = self._put_object(cache_dir / relative, digest)
+                if stored is None:
+                    del files[relative]
+                    new_state.pop(relative, None)
+                elif stored != digest:
+                    files[relative] = stored
+                    new_state.pop(relative, None)
+            manifest_dir = self.manifests_dir / key
+            manifest_dir.mkdir(parents=True, exist_ok=True)
+            manifest = manifest_dir / f"{time.time_ns()}-{os.getpid()}.json"
+            self._write_atomic(
+                manifest, json.dumps({"files": files}, sort_keys=True).encode()
+            )
+            self.evict()
+        self._save_state(new_state)
+        return True
+
+    def _put_object(self, source: Path, digest: str) -> str | None:
+        """Store a cache file; return the digest it was stored under.
+
+        The file is hashed again when copied, in case mypy rewrote it since
+        it was first hashed. None if it has disappeared.
+        """
+        if self._object_path(digest).exists():
+            return digest
+        try:
+            data = source.read_bytes()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        target = self._object_path(digest)
+        if not target.exists():
+            self._write_atomic(target, data)
+        return digest
+
+    @staticmethod
+    def _write_atomic(target: Path, data: bytes) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_name, target)
+
+    def evict(self) -> None:
+        """Drop least recently used snapshots over the count or size budget.
+
+        The newest snapshot is always kept; objects no kept snapshot refers to
+        are deleted. Callers hold the store lock.
+        """
+        referenced: set[str] = set()
+        total_bytes = 0
+        kept = 0
+        for _, manifest_path in self._manifests():
+            files = self._read_manifest(manifest_path) or {}
+            added = set(files.values()) - referenced
+            added_bytes = 0
+            for digest in added:
+                try:
+                    added_bytes += self._object_path(digest).stat().st_size
+                except OSError:
+                    continue
+            if kept and (
+                kept >= MAX_MANIFESTS or total_bytes + added_bytes > self.max_bytes
+            ):
+                manifest_path.unlink(missing_ok=True)
+                continue
+            kept += 1
+            referenced |= added
+            total_bytes += added_bytes
+
+        for path in self.objects_dir.glob("*/*"):
+            if path.parent.name + path.name not in referenced:
+                path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _load_state() -> dict[str, list]:
+        try:
+            return json.loads(PUBLISH_STATE_FILE.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def _save_state(state: dict[str, list]) -> None:
+        PUBLISH_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        PUBLISH_STATE_FILE.write_text(json.dumps(state), encoding="utf-8")
+
+
+def shared_cache() -> SharedMypyCache | None:
+    root = default_store_root()
+    return SharedMypyCache(root) if root is not None else None
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Quality pipeline orchestrator for LAZY-DEV-FRAMEWORK.
+
+Runs the individual quality scripts as a small dependency graph: formatting
+happens first because it rewrites files, then lint, type checking and tests run
+concurrently. The per-task gate therefore costs roughly the slowest stage
+instead of the sum of all of them. Lint runs with `--no-fix` here, so none of
+the concurrent stages rewrites files the others are reading. Each stage still
+writes its own session log; the pipeline adds one combined entry to
+`logs/<session_id>/pipeline.jsonl`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+from changed_files import add_changed_arguments
+from format import StepResult, run_subprocess
+from session_log import append_entry
+from stream_runner import spill_dir_for, step_timeout
+from tracing import configure as configure_tracing
+from tracing import export_trace, flush, traced
+
+LOG_FILE_NAME: Final[str] = "pipeline.jsonl"
+SCRIPTS_DIR: Final[Path] = Path(__file__).resolve().parent
+DEFAULT_TESTS: Final[str] = "tests/"
+DEFAULT_JOBS: Final[int] = 3
+STAGE_NAMES: Final[tuple[str, ...]] = ("format", "lint", "type_check", "test")
+
+
+@dataclass
+class Stage:
+    """A pipeline node: a script invocation plus the stages it waits for."""
+
+    name: str
+    command: list[str]
+    depends_on: tuple[str, ...] = ()
+
+
+def build_stages(
+    target: Path,
+    tests: str,
+    session_id: str | None,
+    skip: frozenset[str] = frozenset(),
+    changed_args: tuple[str, ...] = (),
+) -> list[Stage]:
+    """Create the default format -> (lint | type_check | test) graph."""
+    session_args = ["--session", session_id] if session_id else []
+
+    def script(name: str, *args: str) -> list[str]:
+        return [sys.executable, str(SCRIPTS_DIR / name), *args, *session_args]
+
+    source_args = (str(target), *changed_args)
+    stages = [
+        Stage("format", script("format.py", *source_args)),
+        Stage("lint", script("lint.py", *source_args, "--no-fix"), ("format",)),
+        Stage("type_check", script("type_check.py", *source_args), ("format",)),
+        Stage("test", script("test_runner.py", tests), ("format",)),
+    ]
+    kept = [stage for stage in stages if stage.name not in skip]
+    kept_names = {stage.name for stage in kept}
+    for stage in kept:
+        stage.depends_on = tuple(dep for dep in stage.depends_on if dep in kept_names)
+    return kept
+
+
+def run_stages(
+    stages: list[Stage], max_workers: int, spill_dir: Path | None = None
+) -> tuple[dict[str, StepResult], list[str]]:
+    """Execute stages respecting dependencies with bounded parallelism.
+
+    A stage only starts once all of its dependencies finished successfully; if
+    a dependency fails, every stage downstream of it is reported as skipped.
+    """
+    results: dict[str, StepResult] = {}
+    skipped: list[str] = []
+    pending = list(stages)
+    running: dict[Future[StepResult], Stage] = {}
+
+    max_workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for stage in list(pending):
+                if any(dep in skipped for dep in stage.depends_on) or any(
+                    dep in results and results[dep].exit_code != 0
+                    for dep in stage.depends_on
+                ):
+                    pending.remove(stage)
+                    skipped.append(stage.name)
+                    print(f"⏭️  Skipping {stage.name} (dependency failed)")
+                elif len(running) < max_workers and all(
+                    dep in results for dep in stage.depends_on
+                ):
+                    pending.remove(stage)
+                    print(f"▶️  Starting {stage.name}...")
+                    future = executor.submit(
+                        run_subprocess,
+                        stage.command,
+                        name=stage.name,
+                        echo=False,
+                        spill_dir=spill_dir,
+                        # Each script bounds its own tool; this is opt-in.
+                        timeout=step_timeout(stage.name, None),
+                    )
+                    running[future] = stage
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                result = future.result()
+                result.tool = stage.name
+                results[stage.name] = result
+                report_stage(result)
+
+    return results, skipped
+
+
+def report_stage(result: StepResult) -> None:
+    if result.exit_code == 0:
+        print(f"✅ {result.tool} passed ({result.duration_seconds:.2f}s)")
+        return
+
+    print(
+        f"❌ {result.tool} failed with exit code {result.exit_code} "
+        f"({result.duration_seconds:.2f}s)",
+        file=sys.stderr,
+    )
+    if result.stdout:
+        print(result.stdout, file=sys.stderr)
+    if result.stderr:
+        print(result.stderr, file=sys.stderr)
+
+
+@traced()
+def write_log(
+    target: Path,
+    tests: str,
+    session_id: str | None,
+    step_results: list[StepResult],
+    skipped: list[str],
+    duration: float,
+) -> None:
+    """Persist the combined pipeline report into logs/<session_id>/pipeline.jsonl."""
+    if not session_id:
+        return
+
+    failed = skipped or any(result.exit_code != 0 for result in step_results)
+    entry = {
+        "path": str(target),
+        "tests": tests,
+        "session_id": session_id,
+        "status": "failed" if failed else "success",
+        "duration_seconds": duration,
+        "steps": [result.as_dict() for result in step_results],
+        "skipped": skipped,
+    }
+
+    append_entry(session_id, LOG_FILE_NAME, entry)
+
+
+def run_pipeline(
+    target: Path,
+    tests: str,
+    session_id: str | None,
+    *,
+    max_workers: int = DEFAULT_JOBS,
+    skip: frozenset[str] = frozenset(),
+    changed_args: tuple[str, ...] = (),
+) -> int:
+    if not target.exists():
+        raise FileNotFoundError(f"Path does not exist: {target}")
+
+    stages = build_stages(target, tests, session_id, skip, changed_args)
+    print(f"🚦 Running quality pipeline on {target} (up to {max_workers} jobs)...")
+    start = time.perf_counter()
+    results, skipped = run_stages(stages, max_workers, spill_dir_for(session_id))
+    duration = time.perf_counter() - start
+
+    step_results = [results[stage.name] for stage in stages if stage.name in results]
+    write_log(target, tests, session_id, step_results, skipped, duration)
+    if session_id:
+        # Stage processes flushed their spans on exit; add ours and export.
+        flush()
+        print(f"🧭 Trace written to {export_trace(session_id)}")
+
+    serial = sum(result.duration_seconds for result in step_results)
+    print(f"⏱️  Pipeline wall time {duration:.2f}s (stages total {serial:.2f}s)")
+
+    failures = [result for result in step_results if result.exit_code != 0]
+    if failures or skipped:
+        print("❌ Quality pipeline failed", file=sys.stderr)
+        return failures[0].exit_code if failures else 1
+
+    print("✅ Quality pipeline complete")
+    return 0
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run format, then lint/type check/tests concurrently."
+    )
+    parser.add_argument(
+        "path", help="File or directory to check (scopes --changed when given)"
+    )
+    parser.add_argument(
+        "--tests",
+        default=DEFAULT_TESTS,
+        help=f"Path to tests (default: {DEFAULT_TESTS})",
+    )
+    parser.add_argument(
+        "--session",
+        dest="session_id",
+        help="Optional session identifier for logging",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Maximum number of stages to run at once (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--skip",
+        action="append",
+        choices=STAGE_NAMES,
+        default=[],
+        help="Stage to leave out of the pipeline (repeatable)",
+    )
+    add_changed_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or sys.argv[1:])
+    configure_tracing(args.session_id, "pipeline.py")
+    target = Path(args.path)
+    changed_args: tuple[str, ...] = ("--changed",) if args.changed else ()
+    if args.since:
+        changed_args += ("--since", args.since)
+    try:
+        return run_pipeline(
+            target,
+            args.tests,
+            args.session_id,
+            max_workers=args.jobs,
+            skip=frozenset(args.skip),
+            changed_args=changed_args,
+        )
+    except FileNotFoundError as exc:
+        print(f"❌ {exc}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("⚠️ Pipeline interrupted", file=sys.stderr)
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Pytest plugin loaded by `test_runner.py` (`-p lazy_pytest_plugin`).
+
+It is driven entirely by environment variables so the runner can pass large
+selections without hitting command-line length limits:
+
+- `LAZY_PYTEST_SELECT`: file with one node id per line; only those tests run.
+- `LAZY_PYTEST_FIRST`: JSON list of node ids (tests that failed last time)
+  moved to the front of the run, keeping collection order otherwise.
+- `LAZY_PYTEST_REPORT`: file the plugin writes per-test outcome and duration
+  to when the session finishes, including sessions stopped by `-x` or Ctrl-C.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Final
+
+SELECT_ENV: Final[str] = "LAZY_PYTEST_SELECT"
+REPORT_ENV: Final[str] = "LAZY_PYTEST_REPORT"
+FIRST_ENV: Final[str] = "LAZY_PYTEST_FIRST"
+
+_results: dict[str, dict[str, Any]] = {}
+
+
+def pytest_collection_modifyitems(config: Any, items: list[Any]) -> None:
+    select_file = os.environ.get(SELECT_ENV)
+    if select_file:
+        wanted = set(Path(select_file).read_text(encoding="utf-8").splitlines())
+        selected = [item for item in items if item.nodeid in wanted]
+        deselected = [item for item in items if item.nodeid not in wanted]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+    first_file = os.environ.get(FIRST_ENV)
+    if first_file:
+        try:
+            first = set(json.loads(Path(first_file).read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return
+        # Stable sort: previous failures first, both groups in collection order.
+        items.sort(key=lambda item: item.nodeid not in first)
+
+
+def pytest_runtest_logreport(report: Any) -> None:
+    entry = _results.setdefault(report.nodeid, {"duration": 0.0, "outcome": "passed"})
+    entry["duration"] += report.duration
+    if report.failed:
+        entry["outcome"] = "failed" if report.when == "call" else "error"
+    elif report.skipped and entry["outcome"] == "passed":
+        entry["outcome"] = "skipped"
+
+
+def pytest_sessionfinish(session: Any, exitstatus: int) -> None:
+    report_file = os.environ.get(REPORT_ENV)
+    if not report_file:
+        return
+    path = Path(report_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(_results), encoding="utf-8")
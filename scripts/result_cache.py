@@ -0,0 +1,212 @@
+"""Content-hash result cache shared by the LAZY-DEV-FRAMEWORK quality scripts.
+
+Lint and type-check runs are keyed by the hash of every analysed Python file,
+the tool binary/version and the project configuration files (including ones
+nested below the targets). When none of those change, callers can replay the
+stored result instead of launching the tool again. Only tool state, version
+control and virtualenv folders are left out of a key; installed third-party
+packages are covered by the tool fingerprint alone. Entries live in
+`.lazy_cache/results/` and are evicted least recently used first once the
+entry-count or size budget is exceeded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator
+from importlib import metadata
+from pathlib import Path
+from typing import Final
+
+from tracing import traced
+
+CACHE_DIR: Final[Path] = Path(".lazy_cache") / "results"
+DEFAULT_MAX_ENTRIES: Final[int] = 256
+DEFAULT_MAX_BYTES: Final[int] = 64 * 1024 * 1024
+CONFIG_FILES: Final[tuple[str, ...]] = (
+    "pyproject.toml",
+    "ruff.toml",
+    ".ruff.toml",
+    "mypy.ini",
+    ".mypy.ini",
+    "setup.cfg",
+)
+SKIP_DIRS: Final[frozenset[str]] = frozenset(
+    {"__pycache__", "node_modules", "venv", ".venv", "build", "dist", "logs"}
+)
+# What a cache key may ignore. Ruff and mypy still check `build/`, `dist/`,
+# `logs/` or `.github/` when a target contains them, so only tool state,
+# version control and virtualenvs are left out.
+KEY_SKIP_DIRS: Final[frozenset[str]] = frozenset(
+    {
+        "__pycache__",
+        ".git",
+        ".hg",
+        ".svn",
+        ".lazy_cache",
+        ".mypy_cache",
+        ".ruff_cache",
+        ".pytest_cache",
+        ".tox",
+        ".nox",
+        ".venv",
+        "venv",
+        "node_modules",
+        "site-packages",
+    }
+)
+
+
+def iter_python_files(
+    targets: Iterable[Path], skip_dirs: frozenset[str] | None = None
+) -> Iterator[Path]:
+    """Yield every Python file below the targets.
+
+    By default tool, venv, build and hidden folders are skipped; with
+    `skip_dirs` (e.g. `KEY_SKIP_DIRS`) exactly those folder names are.
+    """
+    for target in targets:
+        if target.is_file():
+            yield target
+            continue
+        for root, dirs, files in os.walk(target):
+            if skip_dirs is None:
+                dirs[:] = sorted(
+                    d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")
+                )
+            else:
+                dirs[:] = sorted(d for d in dirs if d not in skip_dirs)
+            for name in sorted(files):
+                if name.endswith((".py", ".pyi")):
+                    yield Path(root) / name
+
+
+def find_config_files(targets: Iterable[Path]) -> list[Path]:
+    """Collect config files from the working directory and the targets' parents.
+
+    Folders below a directory target are searched too, since Ruff applies a
+    nested config to the files beneath it.
+    """
+    directories = {Path.cwd().resolve()}
+    for target in targets:
+        resolved = target.resolve()
+        start = resolved if resolved.is_dir() else resolved.parent
+        directories.update([start, *start.parents])
+        if resolved.is_dir():
+            for root, dirs, _ in os.walk(resolved):
+                dirs[:] = [d for d in dirs if d not in KEY_SKIP_DIRS]
+                directories.update(Path(root) / d for d in dirs)
+    found = {
+        directory / name
+        for directory in directories
+        for name in CONFIG_FILES
+        if (directory / name).is_file()
+    }
+    return sorted(found)
+
+
+def tool_fingerprint(binary: str, distribution: str) -> str:
+    """Identify the exact tool build that will run (binary identity + version)."""
+    parts = [binary]
+    resolved = shutil.which(binary)
+    if resolved:
+        stat = Path(resolved).stat()
+        parts.append(f"{resolved}:{stat.st_size}:{stat.st_mtime_ns}")
+    try:
+        parts.append(metadata.version(distribution))
+    except metadata.PackageNotFoundError:
+        pass
+    return "|".join(parts)
+
+
+@traced()
+def compute_key(
+    tool: str,
+    args: Iterable[str],
+    targets: Iterable[Path],
+    *,
+    extra_roots: Iterable[Path] = (),
+) -> str:
+    """Hash tool identity, arguments, configs and analysed file contents."""
+    targets = list(targets)
+    digest = hashlib.sha256()
+    digest.update(tool.encode())
+    digest.update(sys.executable.encode())
+    for arg in args:
+        digest.update(b"\0arg:" + arg.encode())
+
+    for config in find_config_files(targets):
+        digest.update(b"\0config:" + str(config).encode())
+        digest.update(hashlib.sha256(config.read_bytes()).digest())
+
+    seen: set[Path] = set()
+    for path in iter_python_files([*targets, *extra_roots], KEY_SKIP_DIRS):
+        resolved = path.resolve()
+        if resolved in seen:
+            continue
+        seen.add(resolved)
+        digest.update(b"\0file:" + str(resolved).encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """On-disk JSON store with LRU eviction by entry count and total size."""
+
+    def __init__(
+        self,
+        root: Path = CACHE_DIR,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        entry_path = self._entry_path(key)
+        try:
+            payload = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+        os.replace(tmp_name, self._entry_path(key))
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for entry_path in self.root.glob("*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        entries.sort(reverse=True)
+        total_bytes = 0
+        for index, (_, size, entry_path) in enumerate(entries):
+            total_bytes += size
+            if index >= self.max_entries or total_bytes > self.max_bytes:
+                entry_path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
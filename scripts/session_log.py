@@ -0,0 +1,101 @@
+"""Append-only session logs for the LAZY-DEV-FRAMEWORK quality scripts.
+
+Each script records one JSON object per run in `logs/<session_id>/<name>.jsonl`
+(JSON Lines). Appends take an advisory lock on the log file, so concurrent
+pipeline stages never interleave or drop records, and the cost of logging
+stays constant no matter how long the session gets. Older sessions written as
+a single JSON array (`<name>.json`) are still readable through `read_entries`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO, Any, Final
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+LOG_ROOT: Final[Path] = Path("logs")
+
+
+@contextmanager
+def locked(handle: IO[Any]) -> Iterator[None]:
+    """Hold an exclusive advisory lock on an open file."""
+    if os.name == "nt":
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def log_path(session_id: str, file_name: str) -> Path:
+    return LOG_ROOT / session_id / file_name
+
+
+def append_entry(session_id: str, file_name: str, entry: dict) -> Path:
+    """Append one record to logs/<session_id>/<file_name> as a JSON line."""
+    entry.setdefault("timestamp", datetime.now(UTC).isoformat())
+    return append_entries(session_id, file_name, [entry])
+
+
+def append_entries(session_id: str, file_name: str, entries: list[dict]) -> Path:
+    """Append several records as-is in a single locked write."""
+    path = log_path(session_id, file_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+
+    with path.open("a", encoding="utf-8") as handle, locked(handle):
+        handle.seek(0, os.SEEK_END)
+        handle.write(lines)
+        handle.flush()
+    return path
+
+
+def iter_log_file(path: Path) -> Iterator[dict]:
+    """Stream records from a JSON Lines file, skipping torn or corrupt lines."""
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_entries(session_id: str, file_name: str) -> Iterator[dict]:
+    """Yield every record of a session log, legacy JSON array entries first."""
+    path = log_path(session_id, file_name)
+    legacy = path.with_suffix(".json")
+    if legacy != path and legacy.exists():
+        try:
+            yield from json.loads(legacy.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            pass
+    yield from iter_log_file(path)
+
+
+def last_entry(session_id: str, file_name: str) -> dict | None:
+    tail = deque(read_entries(session_id, file_name), maxlen=1)
+    return tail[0] if tail else None
@@ -0,0 +1,323 @@
+"""Duration-balanced parallel pytest sharding for LAZY-DEV-FRAMEWORK.
+
+`test_runner.py --workers N|auto` collects the selected tests, splits them into
+N shards balanced by historical per-test durations (longest tests first onto
+the least loaded shard) and runs each shard as its own pytest process. Every
+shard writes coverage to a separate data file; the files are combined into one
+`coverage.json` afterwards and pass/fail results are merged into one result.
+Durations are kept in `.lazy_cache/test_durations.json` and refreshed after
+every run through `lazy_pytest_plugin`, as is the set of tests that failed last
+(`.lazy_cache/test_failures.json`), which every run executes first.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from pytest_plugin.lazy_pytest_plugin import FIRST_ENV, REPORT_ENV, SELECT_ENV
+from slot_scheduler import usable_slots
+from stream_runner import (
+    CapturedStream,
+    ResourceUsage,
+    StreamedProcess,
+    run_streaming,
+    step_timeout,
+)
+from tracing import traced
+
+# Only this directory goes on PYTHONPATH, so the project under test never sees
+# the framework's own modules (format, lint, pipeline, ...) ahead of its own.
+PLUGIN_DIR: Final[Path] = Path(__file__).resolve().parent / "pytest_plugin"
+CACHE_DIR: Final[Path] = Path(".lazy_cache")
+DURATIONS_FILE: Final[Path] = CACHE_DIR / "test_durations.json"
+FAILURES_FILE: Final[Path] = CACHE_DIR / "test_failures.json"
+SHARD_DIR: Final[Path] = CACHE_DIR / "shards"
+PLUGIN_ARGS: Final[tuple[str, ...]] = ("-p", "lazy_pytest_plugin")
+DEFAULT_TEST_DURATION: Final[float] = 0.1
+SUMMARY_LINES: Final[int] = 3
+# pytest exit codes: 1 = tests failed, 5 = nothing collected; others are errors.
+TESTS_FAILED: Final[int] = 1
+NO_TESTS_COLLECTED: Final[int] = 5
+FAILED_OUTCOMES: Final[frozenset[str]] = frozenset({"failed", "error"})
+# Per pytest process; override with LAZY_TIMEOUT_PYTEST (seconds, 0 disables).
+PYTEST_TIMEOUT_SECONDS: Final[float] = 1800.0
+# Collection and coverage post-processing.
+HELPER_TIMEOUT_SECONDS: Final[float] = 300.0
+
+
+def plugin_env(
+    *,
+    select_file: Path | None = None,
+    report_file: Path | None = None,
+    coverage_file: Path | None = None,
+    first_file: Path | None = None,
+    coverage_core: str | None = None,
+) -> dict[str, str]:
+    """Environment that makes `-p lazy_pytest_plugin` importable and configured."""
+    env = dict(os.environ)
+    python_path = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = (
+        f"{PLUGIN_DIR}{os.pathsep}{python_path}" if python_path else str(PLUGIN_DIR)
+    )
+    if select_file is not None:
+        env[SELECT_ENV] = str(select_file)
+    if report_file is not None:
+        env[REPORT_ENV] = str(report_file)
+    if coverage_file is not None:
+        env["COVERAGE_FILE"] = str(coverage_file)
+    if first_file is not None:
+        env[FIRST_ENV] = str(first_file)
+    if coverage_core is not None:
+        env["COVERAGE_CORE"] = coverage_core
+    return env
+
+
+def resolve_workers(value: str) -> int:
+    if value == "auto":
+        # More shards than scheduler slots would only queue behind each other.
+        return usable_slots(os.cpu_count() or 1)
+    workers = int(value)
+    if workers < 1:
+        raise ValueError("--workers must be a positive integer or 'auto'")
+    return workers
+
+
+@traced()
+def collect_node_ids(args: Sequence[str]) -> list[str]:
+    """Node ids pytest would run for the given targets."""
+    try:
+        result = subprocess.run(
+            ["pytest", "--collect-only", "-q", *args],
+            capture_output=True,
+            text=True,
+            timeout=HELPER_TIMEOUT_SECONDS,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        return []
+    return [line.strip() for line in result.stdout.splitlines() if "::" in line]
+
+
+def load_durations(path: Path = DURATIONS_FILE) -> dict[str, float]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def load_report(path: Path) -> dict[str, dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def update_durations(report: dict[str, dict], path: Path = DURATIONS_FILE) -> None:
+    if not report:
+        return
+    durations = load_durations(path)
+    durations.update({node_id: entry["duration"] for node_id, entry in report.items()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(durations, handle)
+    os.replace(tmp_name, path)
+
+
+def failed_tests(report: dict[str, dict]) -> list[str]:
+    return [
+        node_id
+        for node_id, entry in report.items()
+        if entry.get("outcome") in FAILED_OUTCOMES
+    ]
+
+
+def load_failures(path: Path = FAILURES_FILE) -> list[str]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return []
+
+
+def update_failures(report: dict[str, dict], path: Path = FAILURES_FILE) -> None:
+    """Add the tests that failed in `report` and drop the ones that now ran clean.
+
+    Tests the run did not reach (deselected, or after a fail-fast stop) keep
+    their previous state.
+    """
+    if not report:
+        return
+    failures = set(load_failures(path))
+    failures -= report.keys()
+    failures.update(failed_tests(report))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(sorted(failures), handle)
+    os.replace(tmp_name, path)
+
+
+def plan_shards(
+    node_ids: Sequence[str], durations: dict[str, float], workers: int
+) -> list[list[str]]:
+    """Greedy longest-processing-time split into at most `workers` shards."""
+    known = [durations[node_id] for node_id in node_ids if node_id in durations]
+    default = statistics.median(known) if known else DEFAULT_TEST_DURATION
+    count = max(1, min(workers, len(node_ids)))
+    shards: list[list[str]] = [[] for _ in range(count)]
+    loads = [(0.0, index) for index in range(count)]
+    ordered = sorted(node_ids, key=lambda node_id: -durations.get(node_id, default))
+    for node_id in ordered:
+        load, index = heapq.heappop(loads)
+        shards[index].append(node_id)
+        heapq.heappush(loads, (load + durations.get(node_id, default), index))
+    return [shard for shard in shards if shard]
+
+
+def merge_exit_codes(codes: Sequence[int]) -> int:
+    """Combine shard exit codes; callers leave out shards cancelled by fail-fast."""
+    benign = (0, TESTS_FAILED, NO_TESTS_COLLECTED)
+    errors = [code for code in codes if code not in benign]
+    if errors:
+        return max(errors)
+    if TESTS_FAILED in codes:
+        return TESTS_FAILED
+    if codes and all(code == NO_TESTS_COLLECTED for code in codes):
+        return NO_TESTS_COLLECTED
+    return 0
+
+
+@traced()
+def combine_coverage(data_files: Sequence[Path], json_report: str) -> str:
+    """Merge shard coverage data into `.coverage` and write the JSON report."""
+    existing = [str(path) for path in data_files if path.exists()]
+    if not existing:
+        return ""
+    coverage = [sys.executable, "-m", "coverage"]
+    try:
+        for args in (["combine", *existing], ["json", "-o", json_report]):
+            subprocess.run(
+                [*coverage, *args],
+                capture_output=True,
+                text=True,
+                timeout=HELPER_TIMEOUT_SECONDS,
+                check=False,
+            )
+        report = subprocess.run(
+            [*coverage, "report"],
+            capture_output=True,
+            text=True,
+            timeout=HELPER_TIMEOUT_SECONDS,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        return ""
+    return report.stdout
+
+
+def run_shards(
+    command: Sequence[str],
+    shards: Sequence[Sequence[str]],
+    spill_dir: Path | None,
+    json_report: str,
+    *,
+    first_file: Path | None = None,
+    fail_fast: bool = False,
+    coverage_core: str | None = None,
+) -> tuple[StreamedProcess, dict[str, dict]]:
+    """Run every shard concurrently and merge outcome, output and coverage.
+
+    With `fail_fast` the first shard to fail interrupts the others, which still
+    report the tests they got through.
+    """
+    SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    run_dir = Path(tempfile.mkdtemp(dir=SHARD_DIR))
+    envs = []
+    for index, shard in enumerate(shards):
+        select_file = (run_dir / f"shard-{index}.txt").resolve()
+        select_file.write_text("\n".join(shard), encoding="utf-8")
+        envs.append(
+            plugin_env(
+                select_file=select_file,
+                report_file=(run_dir / f"shard-{index}.json").resolve(),
+                coverage_file=(run_dir / f"coverage-{index}").resolve(),
+                first_file=first_file,
+                coverage_core=coverage_core,
+            )
+        )
+    cancel = threading.Event() if fail_fast else None
+
+    def run_one(index: int) -> StreamedProcess:
+        result = run_streaming(
+            command,
+            name=f"pytest-shard{index}",
+            echo=False,
+            spill_dir=spill_dir,
+            env=envs[index],
+            slots=1,
+            cancel=cancel,
+            timeout=step_timeout("pytest", PYTEST_TIMEOUT_SECONDS),
+        )
+        if (
+            cancel is not None
+            and not result.cancelled
+            and result.returncode not in (0, NO_TESTS_COLLECTED)
+        ):
+            cancel.set()
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        results = list(executor.map(run_one, range(len(shards))))
+
+    report: dict[str, dict] = {}
+    sections = []
+    for index, result in enumerate(results):
+        report.update(load_report(run_dir / f"shard-{index}.json"))
+        status = "cancelled" if result.cancelled else f"exit {result.returncode}"
+        header = (
+            f"===== shard {index + 1}/{len(shards)}: {len(shards[index])} test(s), "
+            f"{status}, {result.duration_seconds:.2f}s =====\n"
+        )
+        sections.append(header + result.stdout.text)
+        # Passing shards only show their summary; failing ones show everything.
+        shown = result.stdout.text
+        if result.returncode == 0:
+            shown = "\n".join(shown.splitlines()[-SUMMARY_LINES:])
+        print(header + shown)
+        if result.stderr.text:
+            print(result.stderr.text, file=sys.stderr)
+
+    coverage_report = combine_coverage(
+        [run_dir / f"coverage-{index}" for index in range(len(shards))], json_report
+    )
+    shutil.rmtree(run_dir, ignore_errors=True)
+    if coverage_report:
+        print(coverage_report)
+        sections.append(coverage_report)
+
+    stdout = "".join(sections)
+    stderr = "".join(result.stderr.text for result in results)
+    merged = StreamedProcess(
+        returncode=merge_exit_codes(
+            [result.returncode for result in results if not result.cancelled]
+        ),
+        duration_seconds=max(result.duration_seconds for result in results),
+        stdout=CapturedStream(head=stdout, tail="", total_chars=len(stdout)),
+        stderr=CapturedStream(head=stderr, tail="", total_chars=len(stderr)),
+        slot_wait_seconds=max(result.slot_wait_seconds for result in results),
+        cancelled=any(result.cancelled for result in results),
+        resources=ResourceUsage.combine(result.resources for result in results),
+    )
+    return merged, report
@@ -0,0 +1,265 @@
+"""Machine-wide slot scheduler for the tools the quality scripts launch.
+
+Parallel agent sessions each fork ruff, mypy, pytest and formatter workers
+with no idea of each other, so a busy build host thrashes CPU and memory and
+every session slows down together. Before launching a tool, the wrappers take
+slots from a pool shared by every process of the user on the machine:
+
+- The pool is a directory of slot lock files (`slot-0` ... `slot-<n-1>`).
+  Holding a slot means holding an exclusive `flock` on its file, so slots of
+  a crashed process are released by the kernel.
+- The pool size is the smaller of the CPU count and physical memory divided
+  by `LAZY_SCHEDULER_SLOT_MEMORY_MB` (1024 by default); `LAZY_SCHEDULER_SLOTS`
+  overrides it.
+- Waiters register a ticket named after their priority and arrival time and
+  keep it locked while waiting. A waiter only competes for slots when no live
+  ticket ranks ahead of it, so `high` (the pre-commit hook) goes before
+  `normal` (scripts run directly) before `low` (background runs), first come
+  first served within a priority. `LAZY_SCHEDULER_PRIORITY` sets the priority
+  of a process and its children. Tickets are locked under a temporary name
+  and renamed into place, so a peer never mistakes a new one for stale.
+- Tools launched while holding slots get `LAZY_SCHEDULER_HELD=1`; anything
+  they run in turn (a script started by a test, say) skips the scheduler
+  instead of waiting forever for the slot its parent holds.
+- A waiter gives up after `LAZY_SCHEDULER_MAX_WAIT` seconds (600 by default)
+  and runs without a slot rather than hang.
+
+`LAZY_SCHEDULER=off` disables scheduling. On platforms without `fcntl` the
+scheduler is a no-op.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Final
+
+from tracing import span
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+DIR_ENV: Final[str] = "LAZY_SCHEDULER_DIR"
+SLOTS_ENV: Final[str] = "LAZY_SCHEDULER_SLOTS"
+SLOT_MEMORY_ENV: Final[str] = "LAZY_SCHEDULER_SLOT_MEMORY_MB"
+PRIORITY_ENV: Final[str] = "LAZY_SCHEDULER_PRIORITY"
+DISABLE_ENV: Final[str] = "LAZY_SCHEDULER"
+HELD_ENV: Final[str] = "LAZY_SCHEDULER_HELD"
+MAX_WAIT_ENV: Final[str] = "LAZY_SCHEDULER_MAX_WAIT"
+DEFAULT_MAX_WAIT_SECONDS: Final[float] = 600.0
+DEFAULT_SLOT_MEMORY_MB: Final[int] = 1024
+PRIORITIES: Final[dict[str, int]] = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY: Final[str] = "normal"
+POLL_INTERVAL_SECONDS: Final[float] = 0.05
+
+
+def scheduler_dir() -> Path:
+    configured = os.environ.get(DIR_ENV)
+    if configured:
+        return Path(configured)
+    user = os.getuid() if hasattr(os, "getuid") else "user"
+    return Path(tempfile.gettempdir()) / f"lazy-dev-scheduler-{user}"
+
+
+def physical_memory_bytes() -> int | None:
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def pool_size() -> int:
+    configured = os.environ.get(SLOTS_ENV)
+    if configured:
+        return max(1, int(configured))
+    size = os.cpu_count() or 1
+    memory = physical_memory_bytes()
+    if memory:
+        slot_mb = int(os.environ.get(SLOT_MEMORY_ENV, DEFAULT_SLOT_MEMORY_MB))
+        size = min(size, memory // (slot_mb * 1024 * 1024))
+    return max(1, size)
+
+
+def current_priority() -> str:
+    priority = os.environ.get(PRIORITY_ENV, DEFAULT_PRIORITY)
+    return priority if priority in PRIORITIES else DEFAULT_PRIORITY
+
+
+def enabled() -> bool:
+    return (
+        fcntl is not None
+        and os.environ.get(DISABLE_ENV, "").lower() != "off"
+        and not os.environ.get(HELD_ENV)
+    )
+
+
+def max_wait_seconds() -> float:
+    try:
+        return float(os.environ.get(MAX_WAIT_ENV, DEFAULT_MAX_WAIT_SECONDS))
+    except ValueError:
+        return DEFAULT_MAX_WAIT_SECONDS
+
+
+def usable_slots(wanted: int) -> int:
+    """`wanted` parallel workers capped at the pool size while scheduling is on."""
+    return min(wanted, pool_size()) if enabled() else wanted
+
+
+def held_env(env: dict[str, str] | None = None) -> dict[str, str]:
+    """Environment for a tool started while holding slots (see `HELD_ENV`)."""
+    return {**(os.environ if env is None else env), HELD_ENV: "1"}
+
+
+@dataclass
+class SlotGrant:
+    """Slots held by this process; `slots` is 0 when scheduling is disabled."""
+
+    slots: int = 0
+    wait_seconds: float = 0.0
+    handles: list[IO[Any]] = field(default_factory=list)
+    # Gave up after the maximum wait and runs without a slot.
+    timed_out: bool = False
+
+    def release(self) -> None:
+        for handle in self.handles:
+            handle.close()
+        self.handles.clear()
+
+
+def _try_lock(path: Path) -> IO[Any] | None:
+    handle = path.open("a")
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class SlotScheduler:
+    """Token pool of slot lock files shared by all processes of the user."""
+
+    def __init__(self, root: Path | None = None, size: int | None = None) -> None:
+        self.root = root or scheduler_dir()
+        self.size = size or pool_size()
+
+    @property
+    def waiting_dir(self) -> Path:
+        return self.root / "waiting"
+
+    def _ahead_of(self, rank: tuple[int, int], own: Path) -> bool:
+        """Whether a live waiter ranks before `rank`; clears stale tickets."""
+        for ticket in self.waiting_dir.iterdir():
+            if ticket == own:
+                continue
+            try:
+                priority, arrival, _ = ticket.name.split("-", 2)
+                other = (int(priority), int(arrival))
+            except ValueError:
+                continue
+            if other >= rank:
+                continue
+            handle = _try_lock(ticket)
+            if handle is None:
+                return True
+            # Its owner is gone without cleaning up.
+            ticket.unlink(missing_ok=True)
+            handle.close()
+        return False
+
+    def _register(self, rank: tuple[int, int]) -> tuple[Path, IO[Any] | None]:
+        """Create this waiter's ticket, locked before peers can see it."""
+        name = f"{rank[0]}-{rank[1]}-{os.getpid()}"
+        # Peers skip names that do not parse as a rank.
+        pending = self.waiting_dir / f"new-{name}"
+        handle = _try_lock(pending)
+        ticket = self.waiting_dir / name
+        if handle is None:
+            pending.unlink(missing_ok=True)
+            return ticket, None
+        os.replace(pending, ticket)
+        return ticket, handle
+
+    def _grab(self, wanted: int) -> list[IO[Any]]:
+        handles = []
+        for index in range(self.size):
+            handle = _try_lock(self.root / f"slot-{index}")
+            if handle is not None:
+                handles.append(handle)
+                if len(handles) == wanted:
+                    break
+        return handles
+
+    @contextmanager
+    def acquire(
+        self,
+        slots: int = 1,
+        *,
+        max_slots: int | None = None,
+        priority: str | None = None,
+    ) -> Iterator[SlotGrant]:
+        """Hold at least `slots` (and up to `max_slots`) slots for the block."""
+        if not enabled():
+            yield SlotGrant()
+            return
+        minimum = max(1, min(slots, self.size))
+        maximum = max(minimum, min(max_slots or minimum, self.size))
+        rank = (PRIORITIES[priority or current_priority()], time.time_ns())
+
+        self.waiting_dir.mkdir(parents=True, exist_ok=True)
+        ticket, ticket_handle = self._register(rank)
+        start = time.perf_counter()
+        deadline = start + max_wait_seconds()
+        grant = SlotGrant()
+        try:
+            with span("wait_for_slots", slots=minimum, priority=rank[0]):
+                while True:
+                    if not self._ahead_of(rank, ticket):
+                        handles = self._grab(maximum)
+                        if len(handles) >= minimum:
+                            grant.handles = handles
+                            break
+                        for handle in handles:
+                            handle.close()
+                    if time.perf_counter() >= deadline:
+                        grant.timed_out = True
+                        break
+                    time.sleep(POLL_INTERVAL_SECONDS)
+        finally:
+            ticket.unlink(missing_ok=True)
+            if ticket_handle is not None:
+                ticket_handle.close()
+        grant.slots = len(grant.handles)
+        grant.wait_seconds = time.perf_counter() - start
+        if grant.timed_out:
+            print(
+                f"⚠️ No scheduler slot after {grant.wait_seconds:.0f}s, "
+                "running without one",
+                file=sys.stderr,
+            )
+        try:
+            yield grant
+        finally:
+            grant.release()
+
+
+_scheduler: SlotScheduler | None = None
+
+
+def acquire_slots(
+    slots: int = 1, *, max_slots: int | None = None, priority: str | None = None
+) -> AbstractContextManager[SlotGrant]:
+    """`SlotScheduler.acquire` on the machine-wide pool."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SlotScheduler()
+    return _scheduler.acquire(slots, max_slots=max_slots, priority=priority)
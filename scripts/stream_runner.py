@@ -0,0 +1,500 @@
+"""Streaming subprocess runner for the LAZY-DEV-FRAMEWORK quality scripts.
+
+Tool output is relayed to the console line by line while the process runs and
+captured with bounded memory: only the first and last few KiB of each stream
+are kept in memory. When a stream outgrows that budget, its full text is
+spilled to a file (under `logs/<session_id>/output/` when a session is active)
+so session logs can store head/tail plus a pointer instead of everything.
+
+Every process runs in its own process group. A run past its timeout gets
+SIGTERM on the whole group, then SIGKILL after a grace period, so tools that
+fork workers cannot outlive it; once a timed-out or cancelled leader has exited,
+whatever is left of its group is killed too. On POSIX the child is reaped with
+`wait4`, which reports its CPU time and peak memory along with how it exited.
+Timeouts exit with 124 and deaths by signal N with 128 + N, like a shell, so
+exit codes stay positive.
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Final, TextIO
+
+from session_log import LOG_ROOT
+from slot_scheduler import SlotGrant, acquire_slots, held_env
+from tracing import span
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+
+HEAD_CHARS: Final[int] = 16 * 1024
+TAIL_CHARS: Final[int] = 48 * 1024
+OUTPUT_DIR_NAME: Final[str] = "output"
+# How often a cancellable or time-limited run checks on its process.
+CANCEL_POLL_SECONDS: Final[float] = 0.1
+# SIGINT lets tools such as pytest finish their reports before exiting.
+INTERRUPT_SIGNAL: Final[int] = signal.SIGINT if os.name == "posix" else signal.SIGTERM
+KILL_SIGNAL: Final[int] = getattr(signal, "SIGKILL", signal.SIGTERM)
+# Between SIGTERM and SIGKILL once a run has timed out.
+KILL_GRACE_SECONDS: Final[float] = 5.0
+# How long output readers may lag behind an exited process. A detached
+# grandchild can keep the pipes open indefinitely.
+READER_JOIN_SECONDS: Final[float] = 5.0
+# What coreutils `timeout` exits with.
+TIMEOUT_EXIT_CODE: Final[int] = 124
+# `LAZY_TIMEOUT_<STEP>=<seconds>` overrides a step's timeout; 0 disables it.
+TIMEOUT_ENV_PREFIX: Final[str] = "LAZY_TIMEOUT_"
+TRUNCATION_MARKER: Final[str] = (
+    "\n... [{skipped} characters truncated, full output in {path}] ...\n"
+)
+
+LineCallback = Callable[[str], None]
+
+
+def spill_dir_for(session_id: str | None) -> Path:
+    """Where full outputs of oversized streams are written."""
+    if session_id:
+        return LOG_ROOT / session_id / OUTPUT_DIR_NAME
+    return Path(tempfile.gettempdir()) / "lazy-dev-output"
+
+
+@dataclass
+class CapturedStream:
+    """Head and tail of one output stream, plus the spill file if truncated."""
+
+    head: str
+    tail: str
+    total_chars: int
+    spill_path: Path | None = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.spill_path is not None
+
+    @property
+    def log_path(self) -> str | None:
+        return str(self.spill_path) if self.spill_path is not None else None
+
+    @property
+    def text(self) -> str:
+        if not self.truncated:
+            return self.head + self.tail
+        skipped = self.total_chars - len(self.head) - len(self.tail)
+        marker = TRUNCATION_MARKER.format(skipped=skipped, path=self.spill_path)
+        return self.head + marker + self.tail
+
+    def full_text(self) -> str:
+        """Complete output, read back from the spill file when necessary."""
+        if self.spill_path is None:
+            return self.head + self.tail
+        return self.spill_path.read_text(encoding="utf-8", errors="replace")
+
+
+class _BoundedCapture:
+    def __init__(
+        self, name: str, spill_dir: Path, head_chars: int, tail_chars: int
+    ) -> None:
+        self.name = name
+        self.spill_dir = spill_dir
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.head: list[str] = []
+        self.head_size = 0
+        self.tail: deque[str] = deque()
+        self.tail_size = 0
+        self.total = 0
+        self.spill: TextIO | None = None
+        self.spill_path: Path | None = None
+        self.closed = False
+
+    def write(self, chunk: str) -> None:
+        if self.closed:
+            return  # A reader that was given up on is still draining the pipe.
+        self.total += len(chunk)
+        if self.spill is not None:
+            self.spill.write(chunk)
+
+        if self.head_size < self.head_chars:
+            room = self.head_chars - self.head_size
+            self.head.append(chunk[:room])
+            self.head_size += len(chunk[:room])
+            chunk = chunk[room:]
+            if not chunk:
+                return
+
+        self.tail.append(chunk)
+        self.tail_size += len(chunk)
+        if self.tail_size <= self.tail_chars:
+            return
+
+        if self.spill is None:
+            self._open_spill()
+        while self.tail_size > self.tail_chars and len(self.tail) > 1:
+            self.tail_size -= len(self.tail.popleft())
+
+    def _open_spill(self) -> None:
+        # Nothing has been dropped yet, so head + tail is still the full output.
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        # Stays open while output streams in; close() releases it.
+        handle = tempfile.NamedTemporaryFile(  # noqa: SIM115
+            "w",
+            encoding="utf-8",
+            dir=self.spill_dir,
+            prefix=f"{self.name}-",
+            suffix=".log",
+            delete=False,
+        )
+        handle.write("".join(self.head))
+        handle.write("".join(self.tail))
+        self.spill = handle
+        self.spill_path = Path(handle.name)
+
+    def close(self) -> CapturedStream:
+        self.closed = True
+        if self.spill is not None:
+            self.spill.close()
+        return CapturedStream(
+            head="".join(self.head),
+            tail="".join(self.tail),
+            total_chars=self.total,
+            spill_path=self.spill_path,
+        )
+
+
+def full_output(text: str, spill_path: str | None) -> str:
+    """Complete output for a logged stream: the spill file if there is one."""
+    if spill_path is None:
+        return text
+    return Path(spill_path).read_text(encoding="utf-8", errors="replace")
+
+
+def step_timeout(step: str, default: float | None) -> float | None:
+    """Timeout for a step: `LAZY_TIMEOUT_<STEP>` if set, else `default`."""
+    value = os.environ.get(TIMEOUT_ENV_PREFIX + step.upper().replace("-", "_"))
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        return default
+    return seconds if seconds > 0 else None
+
+
+@dataclass
+class ResourceUsage:
+    """CPU time, peak memory and exit signal of a child process."""
+
+    cpu_user_seconds: float = 0.0
+    cpu_system_seconds: float = 0.0
+    max_rss_kb: int = 0
+    exit_signal: str | None = None
+    timed_out: bool = False
+
+    def as_dict(self) -> dict:
+        return {
+            "cpu_user_seconds": self.cpu_user_seconds,
+            "cpu_system_seconds": self.cpu_system_seconds,
+            "max_rss_kb": self.max_rss_kb,
+            "exit_signal": self.exit_signal,
+            "timed_out": self.timed_out,
+        }
+
+    @classmethod
+    def combine(cls, usages: Iterable[ResourceUsage]) -> ResourceUsage:
+        """Totals of processes that ran side by side (CPU adds up, RSS does not)."""
+        combined = cls()
+        for usage in usages:
+            combined.cpu_user_seconds += usage.cpu_user_seconds
+            combined.cpu_system_seconds += usage.cpu_system_seconds
+            combined.max_rss_kb = max(combined.max_rss_kb, usage.max_rss_kb)
+            combined.exit_signal = combined.exit_signal or usage.exit_signal
+            combined.timed_out = combined.timed_out or usage.timed_out
+        return combined
+
+
+def usage_snapshot() -> ResourceUsage | None:
+    """CPU time of this process and its reaped children so far, and peak RSS."""
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    max_rss = max(own.ru_maxrss, children.ru_maxrss)
+    if sys.platform == "darwin":
+        max_rss //= 1024  # bytes there, KiB on Linux
+    return ResourceUsage(
+        cpu_user_seconds=own.ru_utime + children.ru_utime,
+        cpu_system_seconds=own.ru_stime + children.ru_stime,
+        max_rss_kb=max_rss,
+    )
+
+
+def usage_since(before: ResourceUsage | None) -> ResourceUsage | None:
+    """Usage of in-process work since `before`, including reaped children.
+
+    Peak RSS is the process high-water mark, not the peak of that work alone.
+    """
+    after = usage_snapshot()
+    if before is None or after is None:
+        return None
+    return ResourceUsage(
+        cpu_user_seconds=after.cpu_user_seconds - before.cpu_user_seconds,
+        cpu_system_seconds=after.cpu_system_seconds - before.cpu_system_seconds,
+        max_rss_kb=after.max_rss_kb,
+    )
+
+
+@dataclass
+class StreamedProcess:
+    returncode: int
+    duration_seconds: float
+    stdout: CapturedStream
+    stderr: CapturedStream
+    slot_wait_seconds: float = 0.0
+    # Interrupted through the `cancel` event of `run_streaming`.
+    cancelled: bool = False
+    resources: ResourceUsage = field(default_factory=ResourceUsage)
+
+
+def _signal_group(process: subprocess.Popen[str], signum: int) -> None:
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signum)
+        else:
+            process.send_signal(signum)
+    except OSError:
+        pass  # Already gone.
+
+
+class _Watchdog:
+    """Interrupts a process once `cancel` is set and kills it past its deadline."""
+
+    def __init__(
+        self,
+        process: subprocess.Popen[str],
+        cancel: threading.Event | None,
+        timeout: float | None,
+    ) -> None:
+        self.process = process
+        self.cancel = cancel
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.cancelled = False
+        self.timed_out = False
+        self._finished = threading.Event()
+        self._thread: threading.Thread | None = None
+        if cancel is not None or timeout is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._finished.wait(CANCEL_POLL_SECONDS):
+            if self.cancel is not None and self.cancel.is_set() and not self.cancelled:
+                _signal_group(self.process, INTERRUPT_SIGNAL)
+                self.cancelled = True
+            if self.deadline is None or time.monotonic() < self.deadline:
+                continue
+            if not self.timed_out:
+                _signal_group(self.process, signal.SIGTERM)
+                self.timed_out = True
+            elif time.monotonic() >= self.deadline + KILL_GRACE_SECONDS:
+                _signal_group(self.process, KILL_SIGNAL)
+                return
+
+    def stop(self) -> None:
+        self._finished.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def exit_code(returncode: int, timed_out: bool = False) -> int:
+    """Positive exit status: 124 for a timeout, 128 + N for death by signal N."""
+    if timed_out:
+        return TIMEOUT_EXIT_CODE
+    if returncode < 0:
+        return 128 - returncode
+    return returncode
+
+
+def _wait(process: subprocess.Popen[str]) -> tuple[int, ResourceUsage]:
+    """Reap the process, with its resource usage where `wait4` exists."""
+    if not hasattr(os, "wait4"):
+        return process.wait(), ResourceUsage()
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = returncode = os.waitstatus_to_exitcode(status)
+    max_rss = rusage.ru_maxrss
+    if sys.platform == "darwin":
+        max_rss //= 1024  # bytes there, KiB on Linux
+    exit_signal = None
+    if returncode < 0:
+        try:
+            exit_signal = signal.Signals(-returncode).name
+        except ValueError:
+            exit_signal = f"SIG{-returncode}"
+    usage = ResourceUsage(
+        cpu_user_seconds=rusage.ru_utime,
+        cpu_system_seconds=rusage.ru_stime,
+        max_rss_kb=max_rss,
+        exit_signal=exit_signal,
+    )
+    return returncode, usage
+
+
+def _pump(
+    source: IO[str],
+    capture: _BoundedCapture | None,
+    echo_to: TextIO | None,
+    on_line: LineCallback | None,
+) -> None:
+    for line in source:
+        if echo_to is not None:
+            echo_to.write(line)
+            echo_to.flush()
+        if on_line is not None:
+            on_line(line)
+        if capture is not None:
+            capture.write(line)
+    source.close()
+
+
+def run_streaming(
+    command: Iterable[str],
+    *,
+    name: str = "output",
+    echo: bool = True,
+    on_stdout_line: LineCallback | None = None,
+    on_stderr_line: LineCallback | None = None,
+    spill_dir: Path | None = None,
+    env: dict[str, str] | None = None,
+    head_chars: int = HEAD_CHARS,
+    tail_chars: int = TAIL_CHARS,
+    capture_stdout: bool = True,
+    slots: int = 0,
+    cancel: threading.Event | None = None,
+    timeout: float | None = None,
+) -> StreamedProcess:
+    """Run a command, tee its output live and capture it with bounded memory.
+
+    With `capture_stdout=False` stdout only reaches the echo and the line
+    callback, for callers that consume it incrementally. `slots` takes that
+    many slots from the machine-wide scheduler for the lifetime of the process;
+    the time spent waiting is reported separately from `duration_seconds`,
+    and the tool runs with `LAZY_SCHEDULER_HELD` so nothing it starts waits on
+    the slots it holds.
+    Setting `cancel` interrupts the process (SIGINT on POSIX) and marks the
+    result `cancelled`; if it is already set once the slots are granted, the
+    command is not started at all. After `timeout` seconds the process group is killed,
+    `resources.timed_out` is set and the exit code is 124.
+    """
+    directory = spill_dir or spill_dir_for(None)
+    stdout_capture = _BoundedCapture(
+        f"{name}-stdout", directory, head_chars, tail_chars
+    )
+    stderr_capture = _BoundedCapture(
+        f"{name}-stderr", directory, head_chars, tail_chars
+    )
+
+    argv = list(command)
+    scheduling = acquire_slots(slots) if slots else nullcontext(SlotGrant())
+    with scheduling as grant, span(f"subprocess:{name}", command=" ".join(argv[:3])):
+        if cancel is not None and cancel.is_set():
+            # Cancelled while queued for a slot: nothing ran.
+            return StreamedProcess(
+                returncode=exit_code(-INTERRUPT_SIGNAL),
+                duration_seconds=0.0,
+                stdout=stdout_capture.close(),
+                stderr=stderr_capture.close(),
+                slot_wait_seconds=grant.wait_seconds,
+                cancelled=True,
+            )
+        if grant.slots:
+            env = held_env(env)
+        start = time.perf_counter()
+        with span("spawn"):
+            process = subprocess.Popen(
+                argv,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+                env=env,
+                start_new_session=os.name == "posix",
+            )
+        assert process.stdout is not None and process.stderr is not None
+        readers = [
+            threading.Thread(
+                target=_pump,
+                args=(
+                    process.stdout,
+                    stdout_capture if capture_stdout else None,
+                    sys.stdout if echo else None,
+                    on_stdout_line,
+                ),
+                daemon=True,
+            ),
+            threading.Thread(
+                target=_pump,
+                args=(
+                    process.stderr,
+                    stderr_capture,
+                    sys.stderr if echo else None,
+                    on_stderr_line,
+                ),
+                daemon=True,
+            ),
+        ]
+        for reader in readers:
+            reader.start()
+        watchdog = _Watchdog(process, cancel, timeout)
+        try:
+            returncode, usage = _wait(process)
+        except BaseException:
+            _signal_group(process, KILL_SIGNAL)
+            process.wait()
+            raise
+        finally:
+            watchdog.stop()
+            if watchdog.timed_out or watchdog.cancelled:
+                # Members that ignored SIGTERM/SIGINT would keep the pipes open.
+                _signal_group(process, KILL_SIGNAL)
+            deadline = time.monotonic() + READER_JOIN_SECONDS
+            for reader in readers:
+                reader.join(max(0.0, deadline - time.monotonic()))
+            if any(reader.is_alive() for reader in readers):
+                print(
+                    f"⚠️ {name} exited but a process it started still holds its "
+                    "output open; the rest of that output is dropped",
+                    file=sys.stderr,
+                )
+        duration = time.perf_counter() - start
+        usage.timed_out = watchdog.timed_out
+        returncode = exit_code(returncode, usage.timed_out)
+
+    if usage.timed_out:
+        print(
+            f"⏱️ {name} timed out after {timeout:g}s, its process group was killed",
+            file=sys.stderr,
+        )
+    return StreamedProcess(
+        returncode=returncode,
+        duration_seconds=duration,
+        stdout=stdout_capture.close(),
+        stderr=stderr_capture.close(),
+        slot_wait_seconds=grant.wait_seconds,
+        cancelled=watchdog.cancelled,
+        resources=usage,
+    )
@@ -5,34 +5,196 @@ from __future__ import annotations
 
 import argparse
 import json
-import subprocess
+import os
 import sys
+import tempfile
 import time
+from collections.abc import Sequence
 from pathlib import Path
-from typing import Final, Optional
+from typing import Final
 
+from changed_files import GitError
+from coverage_store import CoverageStore
+from diff_coverage import (
+    COVERAGE_MODES,
+    DEFAULT_COVERAGE_MODE,
+    DIFF_COVERAGE_GATE,
+    DiffCoverage,
+    changed_source_lines,
+    compute_diff_coverage,
+    coverage_core,
+    format_diff_coverage,
+    write_rcfile,
+)
+from impact_analysis import CONTEXT_ARGS, build_index, save_index, select_tests
+from session_log import append_entry
+from shard_runner import (
+    CACHE_DIR,
+    FAILURES_FILE,
+    PLUGIN_ARGS,
+    PYTEST_TIMEOUT_SECONDS,
+    TESTS_FAILED,
+    collect_node_ids,
+    failed_tests,
+    load_durations,
+    load_failures,
+    load_report,
+    plan_shards,
+    plugin_env,
+    resolve_workers,
+    run_shards,
+    update_durations,
+    update_failures,
+)
+from stream_runner import StreamedProcess, run_streaming, spill_dir_for, step_timeout
+from tracing import configure as configure_tracing
+from tracing import span, traced
 
-LOG_FILE_NAME: Final[str] = "test_runner.json"
+LOG_FILE_NAME: Final[str] = "test_runner.jsonl"
 DEFAULT_TARGET: Final[str] = "tests/"
 DEFAULT_COV_TARGET: Final[str] = "src"
 PYTEST_COVERAGE_JSON: Final[str] = "coverage.json"
+FAIL_FAST_ARGS: Final[tuple[str, ...]] = ("--exitfirst",)
+FULL_COVERAGE_ARGS: Final[tuple[str, ...]] = (f"--cov={DEFAULT_COV_TARGET}",)
+DIFF_COVERAGE_FAILED: Final[int] = 1
 
 
-def run_pytest(target: str) -> subprocess.CompletedProcess[str]:
-    return subprocess.run(
-        [
-            "pytest",
+def pytest_command(
+    targets: Sequence[str],
+    *,
+    coverage: Sequence[str] = FULL_COVERAGE_ARGS,
+    coverage_reports: bool = True,
+    extra_args: Sequence[str] = (),
+) -> list[str]:
+    if not coverage:
+        reports = []
+    elif coverage_reports:
+        reports = ["--cov-report=term", "--cov-report=json"]
+    else:
+        reports = ["--cov-report="]
+    return [
+        "pytest",
+        *targets,
+        "-v",
+        *coverage,
+        *reports,
+        *PLUGIN_ARGS,
+        *extra_args,
+    ]
+
+
+def coverage_setup(
+    mode: str, since: str | None = None
+) -> tuple[list[str], str | None, dict[Path, set[int]] | None]:
+    """Pytest coverage arguments, coverage core and, in `changed` mode, the diff.
+
+    The changed lines are None unless diff coverage is to be computed.
+    """
+    if mode == "off":
+        return [], None, None
+    if mode == "changed":
+        try:
+            changed = changed_source_lines(Path(DEFAULT_COV_TARGET), since)
+        except GitError as exc:
+            print(
+                f"⚠️ Cannot diff against git ({exc}), measuring full coverage",
+                file=sys.stderr,
+            )
+            return list(FULL_COVERAGE_ARGS), None, None
+        if not changed:
+            print("🔬 No changed source lines, running without coverage")
+            return [], None, changed
+        print(f"🔬 Measuring coverage of {len(changed)} changed file(s) only")
+        rcfile = write_rcfile(list(changed))
+        return ["--cov", f"--cov-config={rcfile}"], coverage_core(), changed
+    return list(FULL_COVERAGE_ARGS), None, None
+
+
+def run_pytest(
+    target: str,
+    spill_dir: Path | None = None,
+    *,
+    node_ids: Sequence[str] = (),
+    extra_args: Sequence[str] = (),
+    first_file: Path | None = None,
+    coverage: Sequence[str] = FULL_COVERAGE_ARGS,
+    core: str | None = None,
+) -> tuple[StreamedProcess, dict[str, dict]]:
+    """Run pytest on the target, or only on `node_ids` when a selection is given.
+
+    Returns the result with the per-test report of the tests that ran.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, report_name = tempfile.mkstemp(dir=CACHE_DIR, prefix="pytest-", suffix=".json")
+    os.close(fd)
+    report_file = Path(report_name).resolve()
+    try:
+        result = run_streaming(
+            pytest_command(
+                node_ids or [target], coverage=coverage, extra_args=extra_args
+            ),
+            name="pytest",
+            spill_dir=spill_dir,
+            env=plugin_env(
+                report_file=report_file, first_file=first_file, coverage_core=core
+            ),
+            slots=1,
+            timeout=step_timeout("pytest", PYTEST_TIMEOUT_SECONDS),
+        )
+        report = load_report(report_file)
+    finally:
+        report_file.unlink(missing_ok=True)
+    update_durations(report)
+    update_failures(report)
+    return result, report
+
+
+def run_pytest_sharded(
+    target: str,
+    workers: int,
+    spill_dir: Path | None = None,
+    *,
+    node_ids: Sequence[str] = (),
+    extra_args: Sequence[str] = (),
+    first_file: Path | None = None,
+    fail_fast: bool = False,
+    coverage: Sequence[str] = FULL_COVERAGE_ARGS,
+    core: str | None = None,
+) -> tuple[StreamedProcess, dict[str, dict]]:
+    """Split the collected tests into duration-balanced shards run in parallel."""
+    args = list(node_ids or [target])
+    collected = collect_node_ids(args)
+    shards = plan_shards(collected, load_durations(), workers)
+    if len(shards) <= 1:
+        return run_pytest(
             target,
-            "-v",
-            f"--cov={DEFAULT_COV_TARGET}",
-            "--cov-report=term",
-            "--cov-report=json",
-        ],
-        capture_output=True,
-        text=True,
+            spill_dir,
+            node_ids=node_ids,
+            extra_args=extra_args,
+            first_file=first_file,
+            coverage=coverage,
+            core=core,
+        )
+
+    print(f"⚡ Running {len(collected)} test(s) across {len(shards)} shard(s)...")
+    command = pytest_command(
+        args, coverage=coverage, coverage_reports=False, extra_args=extra_args
     )
+    result, report = run_shards(
+        command,
+        shards,
+        spill_dir,
+        PYTEST_COVERAGE_JSON,
+        first_file=first_file,
+        fail_fast=fail_fast,
+        coverage_core=core,
+    )
+    update_durations(report)
+    update_failures(report)
+    return result, report
 
 
+@traced()
 def read_coverage() -> dict | None:
     coverage_file = Path(PYTEST_COVERAGE_JSON)
     if not coverage_file.exists():
@@ -43,47 +205,64 @@ def read_coverage() -> dict | None:
         return None
 
 
+@traced()
 def write_log(
-    session_id: Optional[str],
+    session_id: str | None,
     target: str,
-    result: subprocess.CompletedProcess[str],
+    result: StreamedProcess,
     duration: float,
     coverage: dict | None,
+    selected_tests: list[str] | None = None,
+    report: dict[str, dict] | None = None,
+    stopped_early: bool = False,
+    diff_coverage: DiffCoverage | None = None,
 ) -> None:
     if not session_id:
         return
 
-    log_dir = Path("logs") / session_id
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / LOG_FILE_NAME
-
+    passed = result.returncode == 0 and (diff_coverage is None or diff_coverage.passed)
     entry = {
         "path": target,
         "session_id": session_id,
-        "status": "success" if result.returncode == 0 else "failed",
+        "status": "success" if passed else "failed",
         "duration_seconds": duration,
         "exit_code": result.returncode,
-        "stdout": result.stdout,
-        "stderr": result.stderr,
+        "stdout": result.stdout.text,
+        "stderr": result.stderr.text,
+        "stdout_path": result.stdout.log_path,
+        "stderr_path": result.stderr.log_path,
+        "slot_wait_seconds": result.slot_wait_seconds,
+        "resources": result.resources.as_dict(),
     }
+    if selected_tests is not None:
+        entry["selected_tests"] = selected_tests
+    if report is not None:
+        entry["executed_tests"] = len(report)
+        entry["failed_tests"] = failed_tests(report)
+    if stopped_early:
+        # Fail-fast stop: only `executed_tests` ran, coverage is left out.
+        entry["stopped_early"] = True
+    if diff_coverage is not None:
+        entry["diff_coverage"] = diff_coverage.as_dict()
     if coverage:
-        entry["coverage"] = {
-            "total_coverage": coverage.get("totals", {}).get("percent_covered"),
-            "files": coverage.get("files"),
-        }
+        # Per-line data lives in the coverage store; the log only keeps deltas.
+        entry["coverage"] = CoverageStore(session_id).save_run(coverage)
 
-    existing: list[dict] = []
-    if log_file.exists():
-        try:
-            existing = json.loads(log_file.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            existing = []
-
-    existing.append(entry)
-    log_file.write_text(json.dumps(existing, indent=2), encoding="utf-8")
+    append_entry(session_id, LOG_FILE_NAME, entry)
 
 
-def run_tests(target: str, session_id: Optional[str]) -> int:
+def run_tests(
+    target: str,
+    session_id: str | None,
+    *,
+    impacted: bool = False,
+    workers: int = 1,
+    failed_first: bool = True,
+    fail_fast: bool = False,
+    coverage_mode: str = DEFAULT_COVERAGE_MODE,
+    since: str | None = None,
+    fail_under: float = DIFF_COVERAGE_GATE,
+) -> int:
     path_obj = Path(target)
     if not path_obj.exists():
         print(
@@ -91,26 +270,130 @@ def run_tests(target: str, session_id: Optional[str]) -> int:
             file=sys.stderr,
         )
 
+    selected: list[str] | None = None
+    extra_args: tuple[str, ...] = ()
+    rebuild_index = False
+    if impacted:
+        with span("select_tests"):
+            selected = select_tests(target, Path(DEFAULT_COV_TARGET))
+        if selected is None:
+            print("🗂️  Test impact index missing or stale, running the full suite")
+            extra_args = CONTEXT_ARGS
+            rebuild_index = True
+        elif not selected:
+            print("✅ No tests affected by the current changes")
+            return 0
+        else:
+            print(f"🎯 Running {len(selected)} impacted test(s)")
+
+    first_file: Path | None = None
+    if failed_first:
+        failures = load_failures()
+        if failures:
+            first_file = FAILURES_FILE.resolve()
+            print(f"🔁 Running {len(failures)} previously failed test(s) first")
+    if fail_fast:
+        extra_args = (*extra_args, *FAIL_FAST_ARGS)
+    if rebuild_index and coverage_mode != "full":
+        print("🗂️  Rebuilding the impact index needs full coverage")
+        coverage_mode = "full"
+    coverage_args, core, changed_lines = coverage_setup(coverage_mode, since)
+    if coverage_args:
+        # Never mistake the report of an earlier run for this one's.
+        Path(PYTEST_COVERAGE_JSON).unlink(missing_ok=True)
+
     print(f"🧪 Running Pytest on {target}...")
     start = time.perf_counter()
-    result = run_pytest(target)
+    # Output is relayed live while pytest runs for investigator visibility
+    if workers > 1:
+        result, report = run_pytest_sharded(
+            target,
+            workers,
+            spill_dir_for(session_id),
+            node_ids=selected or (),
+            extra_args=extra_args,
+            first_file=first_file,
+            fail_fast=fail_fast,
+            coverage=coverage_args,
+            core=core,
+        )
+    else:
+        result, report = run_pytest(
+            target,
+            spill_dir_for(session_id),
+            node_ids=selected or (),
+            extra_args=extra_args,
+            first_file=first_file,
+            coverage=coverage_args,
+            core=core,
+        )
     duration = time.perf_counter() - start
 
-    # Always relay stdout/stderr for investigator visibility
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr:
-        print(result.stderr, file=sys.stderr)
+    stopped_early = fail_fast and result.returncode == TESTS_FAILED
+    if stopped_early:
+        print(
+            f"⏹️ Stopped at the first failure after {len(report)} test(s)",
+            file=sys.stderr,
+        )
+    # A fail-fast stop leaves coverage of a partial run, which says nothing.
+    coverage = None if stopped_early or not coverage_args else read_coverage()
+    diff: DiffCoverage | None = None
+    # Collection and usage errors leave nothing meaningful to measure.
+    measured = not stopped_early and result.returncode in (0, TESTS_FAILED)
+    if changed_lines is not None and measured:
+        diff = compute_diff_coverage(coverage, changed_lines, fail_under)
+        print(f"📐 Diff coverage: {format_diff_coverage(diff)}")
+    # Only full runs of every test go to the coverage store; a diff-scoped or
+    # impacted-subset report would read as every other line losing coverage.
+    stored = coverage if coverage_mode == "full" and selected is None else None
 
-    coverage = read_coverage()
+    if rebuild_index and not stopped_early and result.returncode in (0, 1):
+        with span("build_index"):
+            index = build_index(target)
+            if index is not None:
+                save_index(index)
 
     if result.returncode != 0:
         print("❌ Tests failed", file=sys.stderr)
-        write_log(session_id, target, result, duration, coverage)
+        write_log(
+            session_id,
+            target,
+            result,
+            duration,
+            stored,
+            selected,
+            report,
+            stopped_early,
+            diff,
+        )
         return result.returncode
 
+    if diff is not None and not diff.passed:
+        print("✅ All tests passed")
+        print(f"❌ Diff coverage is below the {fail_under:g}% gate", file=sys.stderr)
+        write_log(
+            session_id,
+            target,
+            result,
+            duration,
+            stored,
+            selected,
+            report,
+            diff_coverage=diff,
+        )
+        return DIFF_COVERAGE_FAILED
+
     print("✅ All tests passed")
-    write_log(session_id, target, result, duration, coverage)
+    write_log(
+        session_id,
+        target,
+        result,
+        duration,
+        stored,
+        selected,
+        report,
+        diff_coverage=diff,
+    )
     return 0
 
 
@@ -127,13 +410,83 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         dest="session_id",
         help="Optional session identifier for logging",
     )
+    parser.add_argument(
+        "--impacted",
+        action="store_true",
+        help=(
+            "Only run tests whose covered files changed since the last full run "
+            "(falls back to the full suite when the impact index is stale)"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        default="1",
+        help=(
+            "Run tests in N duration-balanced parallel shards, or 'auto' for one "
+            "per CPU (default: 1)"
+        ),
+    )
+    parser.add_argument(
+        "--coverage",
+        choices=COVERAGE_MODES,
+        default=DEFAULT_COVERAGE_MODE,
+        help=(
+            "off: no tracer; full: measure the whole coverage target; changed: "
+            "only measure files changed against HEAD (or --since) and gate the "
+            f"changed lines on --fail-under (default: {DEFAULT_COVERAGE_MODE})"
+        ),
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REF",
+        help="With --coverage changed, diff against the merge base with REF",
+    )
+    parser.add_argument(
+        "--fail-under",
+        type=float,
+        default=DIFF_COVERAGE_GATE,
+        help=(
+            "Minimum percentage of changed lines that must be covered "
+            f"(default: {DIFF_COVERAGE_GATE:g})"
+        ),
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help=(
+            "Stop at the first failing test (interrupting the other shards) and "
+            "log what ran so far"
+        ),
+    )
+    parser.add_argument(
+        "--no-failed-first",
+        dest="failed_first",
+        action="store_false",
+        help="Keep collection order instead of running last run's failures first",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
+    configure_tracing(args.session_id, "test_runner.py")
+    try:
+        workers = resolve_workers(args.workers)
+    except ValueError as exc:
+        print(f"❌ Invalid --workers value: {exc}", file=sys.stderr)
+        return 2
     try:
-        return run_tests(args.path, args.session_id)
+        return run_tests(
+            args.path,
+            args.session_id,
+            impacted=args.impacted,
+            workers=workers,
+            failed_first=args.failed_first,
+            fail_fast=args.fail_fast,
+            coverage_mode=args.coverage,
+            since=args.since,
+            fail_under=args.fail_under,
+        )
     except KeyboardInterrupt:
         print("⚠️ Test run interrupted", file=sys.stderr)
         return 130
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Lightweight span tracing for the LAZY-DEV-FRAMEWORK quality scripts.
+
+Scripts call `configure(session_id, name)` once; from then on `span(...)`
+blocks and `@traced` functions record Chrome Trace Event "complete" events
+(`"ph": "X"`, microsecond timestamps on the wall clock, so events from
+different processes line up). Events are buffered in memory and appended to
+`logs/<session_id>/trace.jsonl` in one locked write when the process exits.
+
+`export_trace(session_id)` (or `python scripts/tracing.py <session_id>`)
+turns the session's events into `logs/<session_id>/trace.json`, which opens
+directly in chrome://tracing or https://ui.perfetto.dev. Without a session,
+spans cost a single attribute check.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Final, TypeVar
+
+from session_log import append_entries, iter_log_file, log_path
+
+TRACE_FILE_NAME: Final[str] = "trace.jsonl"
+EXPORT_FILE_NAME: Final[str] = "trace.json"
+CATEGORY: Final[str] = "lazy"
+# perf_counter is monotonic but has no epoch; shift it onto the wall clock once.
+_EPOCH_OFFSET_NS: Final[int] = time.time_ns() - time.perf_counter_ns()
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _now_us() -> float:
+    return (time.perf_counter_ns() + _EPOCH_OFFSET_NS) / 1000
+
+
+class _Tracer:
+    def __init__(self) -> None:
+        self.session_id: str | None = None
+        self.process_name = ""
+        self.started_us: float | None = None
+        self.events: list[dict] = []
+        self.lock = threading.Lock()
+
+    def record(self, event: dict) -> None:
+        with self.lock:
+            self.events.append(event)
+
+
+_tracer = _Tracer()
+
+
+def configure(session_id: str | None, process_name: str) -> None:
+    """Start recording spans for this process (no-op without a session)."""
+    if not session_id or _tracer.session_id is not None:
+        return
+    _tracer.session_id = session_id
+    _tracer.process_name = process_name
+    _tracer.started_us = _now_us()
+    _tracer.record(
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": {"name": f"{process_name} ({os.getpid()})"},
+        }
+    )
+    atexit.register(flush)
+
+
+def enabled() -> bool:
+    return _tracer.session_id is not None
+
+
+def _json_safe(args: dict[str, Any]) -> dict[str, Any]:
+    return {
+        key: value if isinstance(value, (str, int, float, bool)) else str(value)
+        for key, value in args.items()
+    }
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """Record the enclosed block as one complete event."""
+    if _tracer.session_id is None:
+        yield
+        return
+    start = _now_us()
+    try:
+        yield
+    finally:
+        _tracer.record(
+            {
+                "name": name,
+                "cat": CATEGORY,
+                "ph": "X",
+                "ts": start,
+                "dur": _now_us() - start,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": _json_safe(args),
+            }
+        )
+
+
+def traced(name: str | None = None) -> Callable[[F], F]:
+    """Decorator form of `span`, named after the function by default."""
+
+    def decorate(func: F) -> F:
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(label):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def flush() -> None:
+    """Append buffered events to the session trace.
+
+    The first flush also closes the span covering the whole process, so a
+    script can flush and export early while later events still get written
+    at exit.
+    """
+    session_id = _tracer.session_id
+    if session_id is None:
+        return
+    with _tracer.lock:
+        events, _tracer.events = _tracer.events, []
+        started_us, _tracer.started_us = _tracer.started_us, None
+    if started_us is not None:
+        events.append(
+            {
+                "name": _tracer.process_name,
+                "cat": CATEGORY,
+                "ph": "X",
+                "ts": started_us,
+                "dur": _now_us() - started_us,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": {"argv": " ".join(sys.argv[1:])},
+            }
+        )
+    if events:
+        append_entries(session_id, TRACE_FILE_NAME, events)
+
+
+def export_trace(session_id: str) -> Path:
+    """Write every recorded event of a session as Chrome Trace Event JSON."""
+    events = list(iter_log_file(log_path(session_id, TRACE_FILE_NAME)))
+    target = log_path(session_id, EXPORT_FILE_NAME)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, handle)
+    os.replace(tmp_name, target)
+    return target
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Export a session's spans as Chrome Trace Event JSON."
+    )
+    parser.add_argument("session_id", help="Session identifier")
+    args = parser.parse_args(argv or sys.argv[1:])
+    if not log_path(args.session_id, TRACE_FILE_NAME).exists():
+        print(f"❌ No trace recorded for session '{args.session_id}'")
+        return 1
+    target = export_trace(args.session_id)
+    print(f"✅ Trace written to {target} (open in chrome://tracing or Perfetto)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,16 +4,52 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import subprocess
 import sys
 import time
+from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Final, Optional
+from typing import Final
 
+from changed_files import (
+    GitError,
+    ImportIndex,
+    add_changed_arguments,
+    describe_targets,
+    import_closure,
+    resolve_targets,
+)
+from mypy_cache_store import LOCAL_CACHE_DIR, SharedMypyCache, shared_cache, store_key
+from result_cache import (
+    ResultCache,
+    compute_key,
+    find_config_files,
+    tool_fingerprint,
+)
+from session_log import append_entry
+from stream_runner import (
+    LineCallback,
+    ResourceUsage,
+    run_streaming,
+    spill_dir_for,
+    step_timeout,
+)
+from tracing import configure as configure_tracing
+from tracing import span, traced
 
-LOG_FILE_NAME: Final[str] = "type_check.json"
+LOG_FILE_NAME: Final[str] = "type_check.jsonl"
+MYPY_ARGS: Final[tuple[str, ...]] = ("--strict",)
+CACHEABLE_EXIT_CODES: Final[frozenset[int]] = frozenset({0, 1})
+# Override with LAZY_TIMEOUT_MYPY (seconds, 0 disables).
+MYPY_TIMEOUT_SECONDS: Final[float] = 1200.0
+DAEMON_DIR: Final[Path] = Path(".lazy_cache") / "dmypy"
+DAEMON_STATUS_FILE: Final[Path] = DAEMON_DIR / "status.json"
+DAEMON_FINGERPRINT_FILE: Final[Path] = DAEMON_DIR / "fingerprint.json"
+DEFAULT_DAEMON_IDLE_TIMEOUT: Final[int] = 15 * 60
+DAEMON_CONTROL_TIMEOUT_SECONDS: Final[float] = 60.0
 
 
 @dataclass
@@ -22,6 +58,11 @@ class TypeCheckResult:
     duration_seconds: float
     stdout: str
     stderr: str
+    stdout_path: str | None = None
+    stderr_path: str | None = None
+    cached: bool = False
+    slot_wait_seconds: float = 0.0
+    resources: ResourceUsage | None = None
 
     def as_dict(self) -> dict:
         return {
@@ -29,25 +70,140 @@ class TypeCheckResult:
             "exit_code": self.exit_code,
             "stdout": self.stdout,
             "stderr": self.stderr,
+            "stdout_path": self.stdout_path,
+            "stderr_path": self.stderr_path,
+            "cached": self.cached,
+            "slot_wait_seconds": self.slot_wait_seconds,
+            "resources": self.resources.as_dict() if self.resources else None,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> TypeCheckResult:
+        return cls(
+            exit_code=data["exit_code"],
+            duration_seconds=data["duration_seconds"],
+            stdout=data["stdout"],
+            stderr=data["stderr"],
+            stdout_path=data.get("stdout_path"),
+            stderr_path=data.get("stderr_path"),
+        )
 
-def run_mypy(target: Path) -> TypeCheckResult:
-    start = time.perf_counter()
-    result = subprocess.run(
-        ["mypy", str(target), "--strict"],
-        capture_output=True,
-        text=True,
+
+def daemon_fingerprint(targets: Sequence[Path]) -> str:
+    """Identify the interpreter, dmypy build and mypy config the daemon runs with."""
+    digest = hashlib.sha256()
+    digest.update(sys.executable.encode())
+    digest.update(tool_fingerprint("dmypy", "mypy").encode())
+    for config in find_config_files(targets):
+        digest.update(str(config).encode())
+        digest.update(config.read_bytes())
+    return digest.hexdigest()
+
+
+def stop_daemon() -> None:
+    if not DAEMON_STATUS_FILE.exists():
+        return
+    dmypy = ["dmypy", "--status-file", str(DAEMON_STATUS_FILE)]
+    try:
+        result = subprocess.run(
+            [*dmypy, "stop"],
+            capture_output=True,
+            text=True,
+            timeout=DAEMON_CONTROL_TIMEOUT_SECONDS,
+            check=False,
+        )
+        stopped = result.returncode == 0
+    except subprocess.TimeoutExpired:
+        stopped = False
+    if not stopped:
+        try:
+            subprocess.run(
+                [*dmypy, "kill"],
+                capture_output=True,
+                text=True,
+                timeout=DAEMON_CONTROL_TIMEOUT_SECONDS,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            pass
+    DAEMON_STATUS_FILE.unlink(missing_ok=True)
+    DAEMON_FINGERPRINT_FILE.unlink(missing_ok=True)
+
+
+@traced()
+def ensure_daemon_current(targets: Sequence[Path]) -> None:
+    """Restart the daemon when the mypy config or interpreter changed."""
+    fingerprint = daemon_fingerprint(targets)
+    try:
+        recorded = json.loads(DAEMON_FINGERPRINT_FILE.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        recorded = {}
+    if recorded.get("fingerprint") == fingerprint:
+        return
+
+    if DAEMON_STATUS_FILE.exists():
+        print("♻️  Mypy configuration or interpreter changed, restarting dmypy")
+        stop_daemon()
+    DAEMON_DIR.mkdir(parents=True, exist_ok=True)
+    DAEMON_FINGERPRINT_FILE.write_text(
+        json.dumps({"fingerprint": fingerprint, "python": sys.executable}),
+        encoding="utf-8",
+    )
+
+
+def mypy_command(
+    targets: Sequence[Path], daemon_timeout: int | None = None
+) -> list[str]:
+    """Cold `mypy` invocation, or `dmypy run` when a daemon timeout is given.
+
+    `dmypy run` starts the per-worktree server on demand, reuses it across
+    calls and lets it exit after `daemon_timeout` idle seconds.
+    """
+    paths = [str(target) for target in targets]
+    if daemon_timeout is None:
+        return ["mypy", *paths, *MYPY_ARGS]
+    return [
+        "dmypy",
+        "--status-file",
+        str(DAEMON_STATUS_FILE),
+        "run",
+        "--timeout",
+        str(daemon_timeout),
+        "--",
+        *MYPY_ARGS,
+        *paths,
+    ]
+
+
+def run_mypy(
+    targets: Sequence[Path],
+    spill_dir: Path | None = None,
+    on_line: LineCallback | None = None,
+    daemon_timeout: int | None = None,
+) -> TypeCheckResult:
+    if daemon_timeout is not None:
+        ensure_daemon_current(targets)
+    result = run_streaming(
+        mypy_command(targets, daemon_timeout),
+        name="mypy",
+        on_stdout_line=on_line,
+        spill_dir=spill_dir,
+        slots=1,
+        timeout=step_timeout("mypy", MYPY_TIMEOUT_SECONDS),
     )
-    duration = time.perf_counter() - start
     return TypeCheckResult(
         exit_code=result.returncode,
-        duration_seconds=duration,
-        stdout=result.stdout,
-        stderr=result.stderr,
+        duration_seconds=result.duration_seconds,
+        stdout=result.stdout.text,
+        stderr=result.stderr.text,
+        stdout_path=result.stdout.log_path,
+        stderr_path=result.stderr.log_path,
+        slot_wait_seconds=result.slot_wait_seconds,
+        resources=result.resources,
     )
 
 
+@traced()
 def parse_mypy_stdout(stdout: str) -> list[dict]:
     errors: list[dict] = []
     for line in stdout.splitlines():
@@ -68,79 +224,252 @@ def parse_mypy_stdout(stdout: str) -> list[dict]:
     return errors
 
 
+def run_mypy_collecting_errors(
+    targets: Sequence[Path],
+    spill_dir: Path | None = None,
+    daemon_timeout: int | None = None,
+) -> tuple[TypeCheckResult, list[dict]]:
+    """Run mypy and parse error lines as they stream, even if output is truncated."""
+    error_lines: list[str] = []
+
+    def collect(line: str) -> None:
+        if "error:" in line:
+            error_lines.append(line)
+
+    result = run_mypy(
+        targets, spill_dir, on_line=collect, daemon_timeout=daemon_timeout
+    )
+    errors = parse_mypy_stdout("".join(error_lines)) if result.exit_code != 0 else []
+    return result, errors
+
+
+def run_mypy_cached(
+    targets: Sequence[Path],
+    cache: ResultCache | None,
+    spill_dir: Path | None = None,
+    daemon_timeout: int | None = None,
+    import_index: ImportIndex | None = None,
+) -> tuple[TypeCheckResult, list[dict]]:
+    """Replay a stored result when sources, config and mypy are unchanged.
+
+    Mypy follows imports outside the target, so the key also covers every
+    file under the working directory that the targets import, transitively,
+    and whether the daemon ran the check.
+    """
+    if cache is None:
+        return run_mypy_collecting_errors(targets, spill_dir, daemon_timeout)
+
+    start = time.perf_counter()
+    # dmypy and cold mypy differ in flags and output; neither replays the other.
+    mode = "dmypy" if daemon_timeout is not None else "mypy"
+    with span("cache_lookup"):
+        key = compute_key(
+            tool_fingerprint("mypy", "mypy"),
+            [*MYPY_ARGS, f"mode={mode}"],
+            targets,
+            extra_roots=import_closure(targets, index=import_index),
+        )
+        cached = cache.get(key)
+    if cached is not None:
+        result = TypeCheckResult.from_dict(cached["result"])
+        result.cached = True
+        result.duration_seconds = time.perf_counter() - start
+        return result, cached["errors"]
+
+    result, errors = run_mypy_collecting_errors(targets, spill_dir, daemon_timeout)
+    if result.exit_code in CACHEABLE_EXIT_CODES:
+        cache.put(key, {"result": result.as_dict(), "errors": errors})
+    return result, errors
+
+
+@traced()
 def write_log(
-    target: Path,
-    session_id: Optional[str],
+    targets: Sequence[Path],
+    session_id: str | None,
     result: TypeCheckResult,
     errors: list[dict] | None,
 ) -> None:
     if not session_id:
         return
 
-    log_dir = Path("logs") / session_id
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / LOG_FILE_NAME
-
     entry = {
-        "path": str(target),
+        "path": describe_targets(targets),
         "session_id": session_id,
         "status": "success" if result.exit_code == 0 else "failed",
         "result": result.as_dict(),
     }
+    if len(targets) > 1:
+        entry["files"] = [str(target) for target in targets]
     if errors:
         entry["errors"] = errors
 
-    existing: list[dict] = []
-    if log_file.exists():
-        try:
-            existing = json.loads(log_file.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            existing = []
+    append_entry(session_id, LOG_FILE_NAME, entry)
 
-    existing.append(entry)
-    log_file.write_text(json.dumps(existing, indent=2), encoding="utf-8")
 
+def seed_shared_cache(
+    targets: Sequence[Path],
+) -> tuple[SharedMypyCache | None, str | None]:
+    """Open the worktree-shared cache store and seed a missing local cache."""
+    store = shared_cache()
+    if store is None:
+        return None, None
+    key = store_key(MYPY_ARGS, targets)
+    try:
+        with span("seed_shared_cache"):
+            seeded = store.seed(key)
+    except OSError as exc:
+        print(f"⚠️ Shared mypy cache unavailable: {exc}", file=sys.stderr)
+        return None, None
+    if seeded:
+        print(f"📦 Seeded {LOCAL_CACHE_DIR} from the shared cache ({seeded} files)")
+    return store, key
 
-def type_check_path(target: Path, session_id: Optional[str]) -> int:
-    if not target.exists():
-        raise FileNotFoundError(f"Path does not exist: {target}")
 
-    print(f"🔎 Running Mypy on {target}...")
-    result = run_mypy(target)
+def publish_shared_cache(store: SharedMypyCache, key: str) -> None:
+    try:
+        with span("publish_shared_cache"):
+            store.publish(key)
+    except OSError as exc:
+        print(f"⚠️ Could not publish the shared mypy cache: {exc}", file=sys.stderr)
 
-    if result.stdout:
-        print(result.stdout)
 
-    errors = parse_mypy_stdout(result.stdout) if result.exit_code != 0 else []
+def type_check_path(
+    target: Path,
+    session_id: str | None,
+    *,
+    use_cache: bool = True,
+    daemon_timeout: int | None = None,
+) -> int:
+    return type_check_paths(
+        [target], session_id, use_cache=use_cache, daemon_timeout=daemon_timeout
+    )
+
+
+def type_check_paths(
+    targets: Sequence[Path],
+    session_id: str | None,
+    *,
+    use_cache: bool = True,
+    daemon_timeout: int | None = None,
+    use_shared_cache: bool = True,
+    import_index: ImportIndex | None = None,
+) -> int:
+    for target in targets:
+        if not target.exists():
+            raise FileNotFoundError(f"Path does not exist: {target}")
+
+    mode = " (daemon)" if daemon_timeout is not None else ""
+    print(f"🔎 Running Mypy{mode} on {describe_targets(targets)}...")
+    cache = ResultCache() if use_cache else None
+    store, key = seed_shared_cache(targets) if use_shared_cache else (None, None)
+    result, errors = run_mypy_cached(
+        targets, cache, spill_dir_for(session_id), daemon_timeout, import_index
+    )
+    # dmypy keeps its state in memory and does not update .mypy_cache.
+    if (
+        store is not None
+        and key is not None
+        and daemon_timeout is None
+        and not result.cached
+        and result.exit_code in CACHEABLE_EXIT_CODES
+    ):
+        publish_shared_cache(store, key)
+    if result.cached:
+        # Live runs stream their output; replays print the stored copy.
+        print("♻️  No changes since the last run, replaying cached result")
+        if result.stdout:
+            print(result.stdout)
 
     if result.exit_code != 0:
         print("\n❌ Type checking failed", file=sys.stderr)
-        if result.stderr:
+        if result.cached and result.stderr:
             print(result.stderr, file=sys.stderr)
-        write_log(target, session_id, result, errors)
+        write_log(targets, session_id, result, errors)
         return result.exit_code
 
     print("✅ Type checking complete")
-    write_log(target, session_id, result, errors)
+    write_log(targets, session_id, result, errors)
     return 0
 
 
 def parse_args(argv: list[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run Mypy type checks.")
-    parser.add_argument("path", help="File or directory to type check")
+    parser.add_argument(
+        "path",
+        nargs="?",
+        help="File or directory to type check (scopes --changed when both are given)",
+    )
     parser.add_argument(
         "--session",
         dest="session_id",
         help="Optional session identifier for logging",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Always run mypy instead of replaying a cached result",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Use a persistent dmypy server for fast incremental re-checks",
+    )
+    parser.add_argument(
+        "--daemon-timeout",
+        type=int,
+        default=DEFAULT_DAEMON_IDLE_TIMEOUT,
+        help=(
+            "Seconds of inactivity before the dmypy server shuts down "
+            f"(default: {DEFAULT_DAEMON_IDLE_TIMEOUT})"
+        ),
+    )
+    parser.add_argument(
+        "--no-shared-cache",
+        dest="use_shared_cache",
+        action="store_false",
+        help="Do not seed from or publish to the cache shared between worktrees",
+    )
+    parser.add_argument(
+        "--stop-daemon",
+        action="store_true",
+        help="Stop this worktree's dmypy server and exit",
+    )
+    add_changed_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.stop_daemon:
+        return args
+    if args.path is None and not (args.changed or args.since):
+        parser.error("a path is required unless --changed is given")
+    return args
 
 
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
-    target = Path(args.path)
+    configure_tracing(args.session_id, "type_check.py")
+    if args.stop_daemon:
+        stop_daemon()
+        print("✅ Mypy daemon stopped")
+        return 0
+    daemon_timeout = args.daemon_timeout if args.daemon else None
     try:
-        return type_check_path(target, args.session_id)
+        # Direct importers of a changed module can break too, so check them.
+        targets = resolve_targets(
+            args.path, args.changed, args.since, include_dependents=True
+        )
+        if not targets:
+            print("✅ No changed Python files to type check")
+            return 0
+        return type_check_paths(
+            targets,
+            args.session_id,
+            use_cache=args.use_cache,
+            daemon_timeout=daemon_timeout,
+            use_shared_cache=args.use_shared_cache,
+        )
+    except GitError as exc:
+        print(f"❌ {exc}", file=sys.stderr)
+        return 1
     except FileNotFoundError as exc:
         print(f"❌ {exc}", file=sys.stderr)
         return 1
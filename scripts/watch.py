@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""Watch mode for the LAZY-DEV-FRAMEWORK quality scripts.
+
+Watches the source and test trees and, after each burst of saves settles,
+re-runs only what the changed files affect:
+
+- `lint`: Ruff on the changed Python files only, reporting without `--fix`.
+- `type_check`: the persistent dmypy daemon over the source target (an
+  incremental re-check), or with `--no-daemon` mypy on the changed source files
+  plus their direct importers.
+- `test`: `test_runner.py --impacted`, i.e. only the tests that covered a
+  changed file; a changed config file runs the full suite.
+
+Stages run in this process through the same functions the standalone scripts
+use, so imports stay warm, caches are shared and every run is still logged to
+`logs/<session_id>/`. On Linux the trees are watched with inotify (through
+libc, no extra dependency); elsewhere, or when inotify is unavailable, the
+trees are polled for mtime/size changes.
+"""
+
+from __future__ import annotations
+
+import abc
+import argparse
+import ctypes
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Final
+
+from changed_files import PYTHON_SUFFIXES, ImportIndex, find_reverse_dependents
+from impact_analysis import file_hash
+from lint import lint_paths
+from result_cache import CONFIG_FILES, SKIP_DIRS, iter_python_files
+from test_runner import run_tests
+from tracing import configure as configure_tracing
+from tracing import flush, span
+from type_check import DEFAULT_DAEMON_IDLE_TIMEOUT, type_check_paths
+
+DEFAULT_TARGET: Final[str] = "src"
+DEFAULT_TESTS: Final[str] = "tests"
+DEFAULT_DEBOUNCE_SECONDS: Final[float] = 0.15
+DEFAULT_POLL_INTERVAL_SECONDS: Final[float] = 0.5
+STAGE_NAMES: Final[tuple[str, ...]] = ("lint", "type_check", "test")
+
+# inotify(7) constants.
+IN_CLOSE_WRITE: Final[int] = 0x00000008
+IN_MOVED_FROM: Final[int] = 0x00000040
+IN_MOVED_TO: Final[int] = 0x00000080
+IN_CREATE: Final[int] = 0x00000100
+IN_DELETE: Final[int] = 0x00000200
+IN_Q_OVERFLOW: Final[int] = 0x00004000
+IN_IGNORED: Final[int] = 0x00008000
+IN_ISDIR: Final[int] = 0x40000000
+# Editors either rewrite in place (close after write) or rename a temp file
+# over the original; IN_MODIFY would fire once per write() call.
+WATCH_MASK: Final[int] = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT_HEADER: Final[struct.Struct] = struct.Struct("iIII")
+READ_SIZE: Final[int] = 64 * 1024
+
+
+def skipped_dir(name: str) -> bool:
+    return name in SKIP_DIRS or (name.startswith(".") and name not in (".", ".."))
+
+
+class Watcher(abc.ABC):
+    """Base class: relevance filtering and debouncing of raw change events."""
+
+    def __init__(self, roots: Sequence[Path]) -> None:
+        self.roots = [Path(os.path.normpath(root)) for root in roots]
+
+    def relevant(self, path: Path) -> bool:
+        if path.name in CONFIG_FILES:
+            return path.parent == Path(".")
+        if path.suffix not in PYTHON_SUFFIXES:
+            return False
+        if any(skipped_dir(part) for part in path.parts[:-1]):
+            return False
+        return any(root == path or root in path.parents for root in self.roots)
+
+    @abc.abstractmethod
+    def poll_events(self, timeout: float | None) -> set[Path] | None:
+        """Changed paths, or None when `timeout` passed without any event."""
+
+    def next_batch(self, debounce: float) -> set[Path]:
+        """Block until relevant files change and the burst has been quiet."""
+        changed: set[Path] = set()
+        while not changed:
+            changed = {
+                path for path in self.poll_events(None) or () if self.relevant(path)
+            }
+        while True:
+            events = self.poll_events(debounce)
+            if events is None:
+                return changed
+            changed.update(path for path in events if self.relevant(path))
+
+    def close(self) -> None:
+        """Release OS resources; watchers that hold none keep this no-op."""
+        return
+
+
+class InotifyWatcher(Watcher):
+    """Recursive inotify watches on every directory below the roots."""
+
+    def __init__(self, roots: Sequence[Path]) -> None:
+        super().__init__(roots)
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f"inotify_init1 failed: {os.strerror(code)}")
+        self.directories: dict[int, Path] = {}
+        try:
+            # Config files live in the working directory, which is not
+            # necessarily below a root.
+            self._add_watch(Path("."))
+            for root in self.roots:
+                if root.is_dir():
+                    self._watch_tree(root)
+                elif root.parent.is_dir():
+                    self._add_watch(root.parent)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(code, f"Cannot watch {directory}: {os.strerror(code)}")
+        self.directories[wd] = directory
+
+    def _watch_tree(self, root: Path) -> set[Path]:
+        """Watch a directory tree; return the files already inside it."""
+        found: set[Path] = set()
+        for directory, dirs, files in os.walk(root):
+            dirs[:] = [name for name in dirs if not skipped_dir(name)]
+            self._add_watch(Path(directory))
+            found.update(Path(directory) / name for name in files)
+        return found
+
+    def poll_events(self, timeout: float | None) -> set[Path] | None:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return None
+        data = os.read(self.fd, READ_SIZE)
+        changed: set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; treat every file as changed.
+                changed.update(iter_python_files(self.roots))
+                continue
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not skipped_dir(path.name):
+                    # Files can land in a new directory before it is watched.
+                    changed.update(self._watch_tree(path))
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher(Watcher):
+    """Portable fallback: compare mtime and size snapshots of the trees."""
+
+    def __init__(self, roots: Sequence[Path], interval: float) -> None:
+        super().__init__(roots)
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        candidates = [
+            *iter_python_files([root for root in self.roots if root.exists()]),
+            *(Path(name) for name in CONFIG_FILES),
+        ]
+        snapshot = {}
+        for path in candidates:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[Path(os.path.normpath(path))] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll_events(self, timeout: float | None) -> set[Path] | None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pause = self.interval
+            if deadline is not None:
+                pause = min(pause, max(0.0, deadline - time.monotonic()))
+            time.sleep(pause)
+            current = self._scan()
+            changed = {
+                path
+                for path in current.keys() | self.snapshot.keys()
+                if current.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+
+def create_watcher(
+    roots: Sequence[Path], *, poll: bool, poll_interval: float
+) -> Watcher:
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as exc:
+            print(f"⚠️ inotify unavailable ({exc}), falling back to polling")
+    return PollingWatcher(roots, poll_interval)
+
+
+def content_hash(path: Path) -> str | None:
+    try:
+        return file_hash(path)
+    except OSError:
+        return None
+
+
+class WatchSession:
+    """Runs the affected stages for each batch of changed files."""
+
+    def __init__(
+        self,
+        target: Path,
+        tests: Path,
+        session_id: str | None,
+        *,
+        stages: frozenset[str],
+        daemon_timeout: int | None,
+    ) -> None:
+        self.target = Path(os.path.normpath(target))
+        self.tests = Path(os.path.normpath(tests))
+        self.session_id = session_id
+        self.stages = stages
+        self.daemon_timeout = daemon_timeout
+        # Content each file had when it was last handled, so saves that did
+        # not change anything do not trigger re-runs.
+        self.handled: dict[Path, str | None] = {}
+        # Import scans behind the type-check cache key, refreshed per change.
+        self.import_index = ImportIndex()
+
+    def under_target(self, path: Path) -> bool:
+        return path == self.target or self.target in path.parents
+
+    def unhandled(self, changed: Iterable[Path]) -> list[Path]:
+        return sorted(
+            path
+            for path in changed
+            if path not in self.handled or self.handled[path] != content_hash(path)
+        )
+
+    def remember(self, paths: Iterable[Path]) -> None:
+        self.handled.update((path, content_hash(path)) for path in paths)
+
+    def run_full(self) -> dict[str, int]:
+        """Run every enabled stage over the whole target (startup run)."""
+        print(f"👀 Initial run on {self.target} and {self.tests}")
+        roots = [root for root in (self.target, self.tests) if root.exists()]
+        self.remember(iter_python_files(roots))
+        # A stale or missing impact index runs the full suite and rebuilds it.
+        return self.run_stages(roots, [self.target], impacted=True)
+
+    def run_changes(self, changed: list[Path]) -> dict[str, int]:
+        config_changed = any(path.name in CONFIG_FILES for path in changed)
+        existing = [
+            path for path in changed if path.suffix in PYTHON_SUFFIXES and path.exists()
+        ]
+        self.remember(changed)
+        self.import_index.invalidate(changed)
+        if config_changed:
+            print("⚙️  Configuration changed, re-running every stage in full")
+            roots = [root for root in (self.target, self.tests) if root.exists()]
+            return self.run_stages(roots, [self.target], impacted=False)
+
+        sources = [path for path in changed if self.under_target(path)]
+        if self.daemon_timeout is not None:
+            # dmypy re-checks the whole target incrementally; dependents included.
+            type_targets = [self.target] if sources else []
+        else:
+            existing_sources = [path for path in sources if path.exists()]
+            type_targets = existing_sources + find_reverse_dependents(
+                sources, self.target
+            )
+        return self.run_stages(existing, type_targets, impacted=True)
+
+    def run_stages(
+        self,
+        lint_targets: Sequence[Path],
+        type_targets: Sequence[Path],
+        *,
+        impacted: bool,
+    ) -> dict[str, int]:
+        results: dict[str, int] = {}
+        try:
+            if "lint" in self.stages and lint_targets:
+                # Never rewrite files the user is editing.
+                results["lint"] = lint_paths(lint_targets, self.session_id, fix=False)
+            if "type_check" in self.stages and type_targets:
+                results["type_check"] = type_check_paths(
+                    type_targets,
+                    self.session_id,
+                    daemon_timeout=self.daemon_timeout,
+                    import_index=self.import_index,
+                )
+            if "test" in self.stages:
+                results["test"] = run_tests(
+                    str(self.tests), self.session_id, impacted=impacted
+                )
+        except FileNotFoundError as exc:
+            # A file vanished between the event and the run; the next batch
+            # reports the deletion.
+            print(f"⚠️ {exc}", file=sys.stderr)
+        return results
+
+
+def report_cycle(results: dict[str, int], duration: float) -> None:
+    failed = [name for name, code in results.items() if code != 0]
+    if failed:
+        print(f"❌ {', '.join(failed)} failed ({duration:.2f}s)")
+    elif results:
+        print(f"✅ {', '.join(results)} passed ({duration:.2f}s)")
+    print("👀 Waiting for changes...")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-run lint, type checks and impacted tests on every save."
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default=DEFAULT_TARGET,
+        help=f"Source file or directory to watch (default: {DEFAULT_TARGET})",
+    )
+    parser.add_argument(
+        "--tests",
+        default=DEFAULT_TESTS,
+        help=f"Path to tests (default: {DEFAULT_TESTS})",
+    )
+    parser.add_argument(
+        "--session",
+        dest="session_id",
+        help="Optional session identifier for logging",
+    )
+    parser.add_argument(
+        "--skip",
+        action="append",
+        choices=STAGE_NAMES,
+        default=[],
+        help="Stage to leave out (repeatable)",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        dest="daemon",
+        action="store_false",
+        help="Type check changed files with plain mypy instead of dmypy",
+    )
+    parser.add_argument(
+        "--daemon-timeout",
+        type=int,
+        default=DEFAULT_DAEMON_IDLE_TIMEOUT,
+        help=(
+            "Seconds of inactivity before the dmypy server shuts down "
+            f"(default: {DEFAULT_DAEMON_IDLE_TIMEOUT})"
+        ),
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE_SECONDS,
+        help=(
+            "Quiet period that ends a burst of writes, in seconds "
+            f"(default: {DEFAULT_DEBOUNCE_SECONDS})"
+        ),
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Poll for changes instead of using inotify",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL_SECONDS,
+        help=(
+            "Seconds between scans when polling "
+            f"(default: {DEFAULT_POLL_INTERVAL_SECONDS})"
+        ),
+    )
+    parser.add_argument(
+        "--no-initial",
+        dest="initial",
+        action="store_false",
+        help="Skip the full run at startup and only react to changes",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or sys.argv[1:])
+    configure_tracing(args.session_id, "watch.py")
+    target = Path(args.path)
+    if not target.exists():
+        print(f"❌ Path does not exist: {target}", file=sys.stderr)
+        return 1
+
+    session = WatchSession(
+        target,
+        Path(args.tests),
+        args.session_id,
+        stages=frozenset(STAGE_NAMES) - set(args.skip),
+        daemon_timeout=args.daemon_timeout if args.daemon else None,
+    )
+    watcher = create_watcher(
+        [session.target, session.tests],
+        poll=args.poll,
+        poll_interval=args.poll_interval,
+    )
+    mode = "polling" if isinstance(watcher, PollingWatcher) else "inotify"
+    print(f"👀 Watching {session.target} and {session.tests} ({mode})")
+    try:
+        if args.initial:
+            start = time.perf_counter()
+            with span("watch_cycle", initial=True):
+                results = session.run_full()
+            flush()
+            report_cycle(results, time.perf_counter() - start)
+        while True:
+            changed = session.unhandled(watcher.next_batch(args.debounce))
+            if not changed:
+                continue
+            shown = ", ".join(str(path) for path in changed[:5])
+            more = f" and {len(changed) - 5} more" if len(changed) > 5 else ""
+            print(f"\n🔁 Changed: {shown}{more}")
+            start = time.perf_counter()
+            with span("watch_cycle", files=len(changed)):
+                results = session.run_changes(changed)
+            # Keep the session trace current while the watcher keeps running.
+            flush()
+            report_cycle(results, time.perf_counter() - start)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+        return 0
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+"""Shared setup for the tests of the quality scripts.
+
+The scripts in `scripts/` import each other as top-level modules, the way
+they run from the command line, so that directory goes on `sys.path`.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / "scripts"
+
+sys.path.insert(0, str(SCRIPTS_DIR))
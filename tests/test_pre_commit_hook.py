@@ -0,0 +1,121 @@
+"""Tests for the clean blob cache of `.githooks/pre-commit`."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HOOK = REPO_ROOT / ".githooks" / "pre-commit"
+UNFORMATTED = "def f(first_argument, second_argument):  return {'k':1}\n"
+
+
+def load_hook() -> ModuleType:
+    loader = SourceFileLoader("pre_commit_hook", str(HOOK))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    assert spec is not None
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def hook(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    module = load_hook()
+    monkeypatch.setattr(module, "REPO_ROOT", tmp_path)
+    monkeypatch.setattr(module, "OID_CACHE_FILE", tmp_path / "clean_oids.json")
+    return module
+
+
+def test_nested_config_change_only_invalidates_files_below_it(
+    hook: ModuleType, tmp_path: Path
+) -> None:
+    files = ["a/x.py", "b/y.py"]
+    for name in files:
+        (tmp_path / name).parent.mkdir()
+    (tmp_path / "pyproject.toml").write_text("[tool.black]\n", encoding="utf-8")
+    before = hook.config_digests(files)
+    assert before["a/x.py"] == before["b/y.py"]
+
+    (tmp_path / "a" / "ruff.toml").write_text("line-length = 20\n", encoding="utf-8")
+    nested = hook.config_digests(files)
+    assert nested["a/x.py"] != before["a/x.py"]
+    assert nested["b/y.py"] == before["b/y.py"]
+    assert hook.clean_key("oid", nested["a/x.py"]) != hook.clean_key(
+        "oid", before["a/x.py"]
+    )
+
+    (tmp_path / "pyproject.toml").write_text("[tool.ruff]\n", encoding="utf-8")
+    root = hook.config_digests(files)
+    assert root["a/x.py"] != nested["a/x.py"]
+    assert root["b/y.py"] != nested["b/y.py"]
+
+
+def test_cache_is_dropped_when_the_fingerprint_changes(hook: ModuleType) -> None:
+    hook.save_clean_oids("formatters-1", dict.fromkeys(["k1", "k2"]))
+
+    assert list(hook.load_clean_oids("formatters-1")) == ["k1", "k2"]
+    assert hook.load_clean_oids("formatters-2") == {}
+
+
+def git(repo: Path, *args: str) -> str:
+    result = subprocess.run(
+        ["git", *args], cwd=repo, capture_output=True, text=True, check=True
+    )
+    return result.stdout
+
+
+def run_hook(repo: Path) -> str:
+    env = {key: value for key, value in os.environ.items() if key != "GIT_DIR"}
+    result = subprocess.run(
+        [sys.executable, str(repo / ".githooks" / "pre-commit")],
+        cwd=repo,
+        env={**env, "LAZY_SCHEDULER": "off"},
+        capture_output=True,
+        text=True,
+        timeout=120,
+        check=False,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_staged_blobs_are_skipped_until_a_config_changes(tmp_path: Path) -> None:
+    pytest.importorskip("black")
+    pytest.importorskip("ruff")
+    repo = tmp_path / "repo"
+    (repo / ".githooks").mkdir(parents=True)
+    shutil.copy2(HOOK, repo / ".githooks" / "pre-commit")
+    # The hook imports the format engine from the repository's scripts/.
+    shutil.copytree(
+        REPO_ROOT / "scripts",
+        repo / "scripts",
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    (repo / "pkg").mkdir()
+    source = repo / "pkg" / "mod.py"
+    source.write_text(UNFORMATTED, encoding="utf-8")
+    git(repo, "init", "-q")
+    git(repo, "add", "pkg/mod.py")
+
+    first = run_hook(repo)
+    assert "1 reformatted" in first
+    staged = git(repo, "show", ":pkg/mod.py")
+    assert staged == source.read_text(encoding="utf-8") != UNFORMATTED
+
+    assert "Skipping 1 already formatted file(s)" in run_hook(repo)
+
+    (repo / "pkg" / "ruff.toml").write_text("line-length = 30\n", encoding="utf-8")
+    after_config = run_hook(repo)
+    assert "Skipping" not in after_config
+    assert "1 reformatted" in after_config
+    assert git(repo, "show", ":pkg/mod.py") != staged
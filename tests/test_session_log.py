@@ -0,0 +1,94 @@
+"""Tests for the locked JSON Lines session logs in `scripts/session_log.py`."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import session_log
+
+SCRIPTS_DIR = Path(session_log.__file__).resolve().parent
+
+WRITERS = 4
+ENTRIES_PER_WRITER = 50
+PAYLOAD_CHARS = 256 * 1024
+# How long a blocked writer is given to (wrongly) get past the lock.
+BLOCKED_SECONDS = 0.5
+
+WRITER_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from session_log import append_entry
+writer = int(sys.argv[2])
+payload = str(writer) * int(sys.argv[4])
+for index in range(int(sys.argv[3])):
+    entry = {"writer": writer, "index": index, "payload": payload}
+    append_entry("session", "run.jsonl", entry)
+"""
+
+
+@pytest.fixture
+def log_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / session_log.LOG_ROOT
+
+
+def test_concurrent_appends_do_not_interleave(log_dir: Path) -> None:
+    writers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                WRITER_SCRIPT,
+                str(SCRIPTS_DIR),
+                str(writer),
+                str(ENTRIES_PER_WRITER),
+                str(PAYLOAD_CHARS),
+            ]
+        )
+        for writer in range(WRITERS)
+    ]
+    assert [process.wait(timeout=120) for process in writers] == [0] * WRITERS
+
+    lines = (log_dir / "session" / "run.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == WRITERS * ENTRIES_PER_WRITER
+    seen: dict[int, list[int]] = {writer: [] for writer in range(WRITERS)}
+    for line in lines:
+        entry = json.loads(line)
+        assert entry["payload"] == str(entry["writer"]) * PAYLOAD_CHARS
+        seen[entry["writer"]].append(entry["index"])
+    # Each writer's records arrive whole and in the order it wrote them.
+    assert all(indices == list(range(ENTRIES_PER_WRITER)) for indices in seen.values())
+
+
+def test_append_waits_for_the_lock_holder(log_dir: Path) -> None:
+    path = session_log.log_path("session", "run.jsonl")
+    path.parent.mkdir(parents=True)
+    with path.open("a", encoding="utf-8") as handle, session_log.locked(handle):
+        writer = subprocess.Popen(
+            [sys.executable, "-c", WRITER_SCRIPT, str(SCRIPTS_DIR), "0", "1", "1"]
+        )
+        time.sleep(BLOCKED_SECONDS)
+        assert writer.poll() is None
+        assert path.stat().st_size == 0
+    assert writer.wait(timeout=60) == 0
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_read_entries_skips_torn_lines_after_legacy_entries(log_dir: Path) -> None:
+    session = log_dir / "session"
+    session.mkdir(parents=True)
+    (session / "run.json").write_text(json.dumps([{"n": 0}]), encoding="utf-8")
+    session_log.append_entry("session", "run.jsonl", {"n": 1})
+    with (session / "run.jsonl").open("a", encoding="utf-8") as handle:
+        handle.write('{"n": 2, "trunc')
+
+    entries = list(session_log.read_entries("session", "run.jsonl"))
+
+    assert [entry["n"] for entry in entries] == [0, 1]
+    assert "timestamp" in entries[1]
+    assert session_log.last_entry("session", "run.jsonl") == entries[1]
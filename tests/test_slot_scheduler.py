@@ -0,0 +1,145 @@
+"""Tests for the machine-wide slot scheduler in `scripts/slot_scheduler.py`."""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import slot_scheduler
+from slot_scheduler import SlotScheduler
+
+pytestmark = pytest.mark.skipif(
+    slot_scheduler.fcntl is None, reason="the scheduler is a no-op without fcntl"
+)
+
+# Long enough for a waiter that wrongly got past the queue to record a grant.
+SETTLE_SECONDS = 0.3
+JOIN_TIMEOUT_SECONDS = 30.0
+
+
+@pytest.fixture(autouse=True)
+def scheduling_on(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name in (
+        slot_scheduler.DISABLE_ENV,
+        slot_scheduler.HELD_ENV,
+        slot_scheduler.PRIORITY_ENV,
+        slot_scheduler.MAX_WAIT_ENV,
+    ):
+        monkeypatch.delenv(name, raising=False)
+
+
+class Waiters:
+    """Threads that each take a slot, record the grant and release it."""
+
+    def __init__(self, scheduler: SlotScheduler) -> None:
+        self.scheduler = scheduler
+        self.granted: list[str] = []
+        self.threads: list[threading.Thread] = []
+
+    def tickets(self) -> int:
+        waiting = self.scheduler.waiting_dir
+        if not waiting.exists():
+            return 0
+        return sum(not ticket.name.startswith("new-") for ticket in waiting.iterdir())
+
+    def start(self, name: str, priority: str | None = None) -> None:
+        def wait() -> None:
+            with self.scheduler.acquire(1, priority=priority) as grant:
+                assert grant.slots == 1
+                self.granted.append(name)
+
+        queued = self.tickets()
+        thread = threading.Thread(target=wait, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        # Wait until it queued, so arrival order is the start order.
+        deadline = time.monotonic() + JOIN_TIMEOUT_SECONDS
+        while self.tickets() <= queued:
+            assert time.monotonic() < deadline, f"{name} never queued"
+            time.sleep(0.01)
+
+    def join(self) -> None:
+        for thread in self.threads:
+            thread.join(JOIN_TIMEOUT_SECONDS)
+            assert not thread.is_alive()
+
+
+def test_slots_are_exclusive_until_released(tmp_path: Path) -> None:
+    scheduler = SlotScheduler(tmp_path, size=2)
+    waiters = Waiters(scheduler)
+
+    with scheduler.acquire(1, max_slots=2) as held:
+        assert held.slots == 2
+        waiters.start("waiter")
+        time.sleep(SETTLE_SECONDS)
+        assert waiters.granted == []
+    waiters.join()
+
+    assert waiters.granted == ["waiter"]
+    with scheduler.acquire(2) as again:
+        assert again.slots == 2
+    assert not list(scheduler.waiting_dir.iterdir())
+
+
+def test_waiters_are_granted_in_arrival_order(tmp_path: Path) -> None:
+    scheduler = SlotScheduler(tmp_path, size=1)
+    waiters = Waiters(scheduler)
+
+    with scheduler.acquire(1):
+        for name in ("first", "second", "third"):
+            waiters.start(name)
+    waiters.join()
+
+    assert waiters.granted == ["first", "second", "third"]
+
+
+def test_higher_priority_goes_before_earlier_arrivals(tmp_path: Path) -> None:
+    scheduler = SlotScheduler(tmp_path, size=1)
+    waiters = Waiters(scheduler)
+
+    with scheduler.acquire(1):
+        waiters.start("background", priority="low")
+        waiters.start("script", priority="normal")
+        waiters.start("hook", priority="high")
+    waiters.join()
+
+    assert waiters.granted == ["hook", "script", "background"]
+
+
+def test_stale_ticket_of_a_dead_waiter_is_cleared(tmp_path: Path) -> None:
+    scheduler = SlotScheduler(tmp_path, size=1)
+    scheduler.waiting_dir.mkdir(parents=True)
+    # Ranks ahead of everyone, but nobody holds its lock any more.
+    stale = scheduler.waiting_dir / "0-1-99999"
+    stale.touch()
+
+    with scheduler.acquire(1) as grant:
+        assert grant.slots == 1
+    assert not stale.exists()
+
+
+def test_waiter_runs_without_a_slot_after_the_maximum_wait(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv(slot_scheduler.MAX_WAIT_ENV, "0.2")
+    scheduler = SlotScheduler(tmp_path, size=1)
+
+    with scheduler.acquire(1), scheduler.acquire(1) as grant:
+        assert grant.timed_out
+        assert grant.slots == 0
+    assert not list(scheduler.waiting_dir.iterdir())
+
+
+def test_tools_started_by_a_slot_holder_skip_the_queue(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    scheduler = SlotScheduler(tmp_path, size=1)
+
+    with scheduler.acquire(1) as held:
+        monkeypatch.setenv(slot_scheduler.HELD_ENV, "1")
+        with scheduler.acquire(1) as nested:
+            assert held.slots == 1
+            assert nested.slots == 0
+            assert not nested.timed_out